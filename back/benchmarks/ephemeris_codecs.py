@@ -0,0 +1,109 @@
+"""
+Benchmark of the ephemeris codecs (see tas.dcc.smartlink.database.codecs).
+
+Ephemeris for a system of N satellites are generated using a simple two-body model
+(rotated to an Earth-fixed frame), split in segments as done by the EphemerisManager,
+then encoded and decoded with each codec.
+
+    python benchmarks/ephemeris_codecs.py --satellites 298 --hours 24 --step 30
+"""
+
+import argparse
+import time
+from typing import Any
+
+import numpy as np
+
+from tas.dcc.smartlink.database.codecs import (
+    QUANTIZED_DELTA_ZLIB,
+    RAW,
+    SHUFFLE_LZMA,
+    SHUFFLE_ZLIB,
+)
+from tas.dcc.smartlink.database.managers.ephemeris import _SEGMENT_SIZE
+
+_MU = 398600.4418
+_EARTH_ROTATION = 7.2921150e-5
+
+
+def _ephemeris(
+    rng: np.random.Generator, n_steps: int, step: float
+) -> np.ndarray[tuple[int, int], Any]:
+    a = rng.uniform(6900, 7800)
+    e = rng.uniform(0, 1e-3)
+    inc, raan, argp, m0 = rng.uniform(0, np.pi, 4) * [1, 2, 2, 2]
+
+    t = np.arange(n_steps) * step
+    m = m0 + np.sqrt(_MU / a**3) * t
+    ea = m.copy()
+    for _ in range(8):
+        ea -= (ea - e * np.sin(ea) - m) / (1 - e * np.cos(ea))
+    nu = 2 * np.arctan2(
+        np.sqrt(1 + e) * np.sin(ea / 2), np.sqrt(1 - e) * np.cos(ea / 2)
+    )
+    r = a * (1 - e**2) / (1 + e * np.cos(nu))
+    u = argp + nu
+
+    x = r * (np.cos(raan) * np.cos(u) - np.sin(raan) * np.sin(u) * np.cos(inc))
+    y = r * (np.sin(raan) * np.cos(u) + np.cos(raan) * np.sin(u) * np.cos(inc))
+    z = r * np.sin(u) * np.sin(inc)
+
+    theta = _EARTH_ROTATION * t
+    position = np.stack(
+        [
+            np.cos(theta) * x + np.sin(theta) * y,
+            -np.sin(theta) * x + np.cos(theta) * y,
+            z,
+        ],
+        axis=1,
+    )
+    return np.concatenate([position, np.gradient(position, step, axis=0)], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--satellites", type=int, default=298)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--step", type=float, default=30, help="step in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    n_steps = int(args.hours * 3600 / args.step) + 1
+    segments = [
+        data[offset : offset + _SEGMENT_SIZE]
+        for data in (
+            _ephemeris(rng, n_steps, args.step) for _ in range(args.satellites)
+        )
+        for offset in range(0, n_steps, _SEGMENT_SIZE)
+    ]
+    n_bytes = sum(segment.nbytes for segment in segments)
+
+    print(
+        f"{args.satellites} satellites, {n_steps} steps, {len(segments)} segments, "
+        f"{n_bytes / 2**20:.1f} MiB of raw data"
+    )
+    print(
+        f"{'codec':<24}{'size (MiB)':>12}{'ratio':>8}{'max error':>12}"
+        f"{'encode (MiB/s)':>16}{'decode (MiB/s)':>16}"
+    )
+    for codec in (RAW, SHUFFLE_ZLIB, SHUFFLE_LZMA, QUANTIZED_DELTA_ZLIB):
+        t0 = time.perf_counter()
+        blobs = [codec.encode(segment) for segment in segments]
+        t1 = time.perf_counter()
+        decoded = [codec.decode(blob) for blob in blobs]
+        t2 = time.perf_counter()
+
+        size = sum(len(blob) for blob in blobs)
+        error = max(
+            np.abs(segment - values).max() for segment, values in zip(segments, decoded)
+        )
+        print(
+            f"{codec.name:<24}{size / 2**20:>12.2f}{n_bytes / size:>8.2f}"
+            f"{error:>12.1e}{n_bytes / 2**20 / (t1 - t0):>16.1f}"
+            f"{n_bytes / 2**20 / (t2 - t1):>16.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
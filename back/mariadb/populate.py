@@ -8,11 +8,10 @@ from sqlalchemy.orm import Session
 from tqdm import tqdm
 
 from tas.dcc.orbits.compute.eligibilities import EligibilityComputation
-from tas.dcc.orbits.compute.ephemeris import PoliastroPropagator
 from tas.dcc.orbits.models import GroundLocation
-from tas.dcc.orbits.utils.coordinates import celest_gcrs_to_itrs
 from tas.dcc.orbits.utils.eligibilities import make_constant_mask
 from tas.dcc.smartlink import models
+from tas.dcc.smartlink.compute import ephemeris_model, propagate_parallel
 from tas.dcc.smartlink.database.managers import (
     EligibilityManager,
     EphemerisManager,
@@ -22,7 +21,13 @@ from tas.dcc.smartlink.database.managers import (
 )
 from tas.dcc.smartlink.database.models.base import Base
 from tas.dcc.smartlink.database.models.eligibility import EligibilityGroup
-from tas.dcc.smartlink.models import Ephemeris, GroundSegment, Horizon, Station
+from tas.dcc.smartlink.models import (
+    Ephemeris,
+    GroundSegment,
+    Horizon,
+    LazyITRS,
+    Station,
+)
 from tas.dcc.smartlink.utils.builder.constellation import (
     TelesatOrbitParameters,
     make_constellation,
@@ -128,36 +133,37 @@ with Session(engine) as db:
     group_segment_db = GroundSegmentManager(db).store(ground_segment)
     ground_segment = GroundSegmentManager(db).convert_from_database(group_segment_db)
 
+# computed like the ephemeris of the server, so that they can be reused by requests
+# (see compute.ephemeris_model)
+BACKEND = "kepler"
+
 ephemeris: list[Ephemeris] = []
-propagator = PoliastroPropagator(timedelta(seconds=30))
+horizon = Horizon(
+    start=EPOCH, end=EPOCH + timedelta(seconds=7200), step=timedelta(seconds=30)
+)
 for constellation in system_example.constellations:
-    for satellite in tqdm([s for p in constellation.planes for s in p.satellites]):
-        horizon = Horizon(
-            start=EPOCH, end=EPOCH + timedelta(seconds=7200), step=timedelta(seconds=30)
-        )
+    # all the satellites of the constellation are propagated at once (see
+    # KeplerPropagator.propagate_many) and rotated to ITRS together
+    satellites = [s for p in constellation.planes for s in p.satellites]
+    for satellite, itrs in zip(
+        satellites, propagate_parallel(BACKEND, satellites, horizon)
+    ):
         ephemeris.append(
-            Ephemeris(
-                id=None,
-                satellite=satellite,
-                horizon=horizon,
-                itrs=celest_gcrs_to_itrs(
-                    propagator.propagate(
-                        satellite, start=EPOCH, end=EPOCH + timedelta(seconds=7200)
-                    )
-                ),
-            )
+            Ephemeris(id=None, satellite=satellite, horizon=horizon, itrs=itrs)
         )
 
 with Session(engine) as db:
     ems: list[EligibilityGroup] = []
     for ephem in tqdm(ephemeris):
-        db_ephem = EphemerisManager(db).convert_to_database(ephem)
+        db_ephem = EphemerisManager(
+            db, dynamics=ephemeris_model(BACKEND)
+        ).convert_to_database(ephem)
 
         interpolation_step = timedelta(seconds=10)
 
         eligibility_compute = EligibilityComputation(
             ephem.satellite,
-            ephem.itrs,
+            ephem.itrs.to_itrs() if isinstance(ephem.itrs, LazyITRS) else ephem.itrs,
             interpolation="cubic",
             interpolation_step=interpolation_step,
         )
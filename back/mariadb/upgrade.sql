@@ -0,0 +1,62 @@
+-- Upgrade a database created by a previous version of the backend, tables created
+-- by populate.py (Base.metadata.create_all) are not altered when the models change.
+-- Statements can be run again on an up-to-date database:
+--
+--   docker exec -i mariadb-db-1 sh -c 'mariadb -usmartlink -psmartlink smartlink' \
+--       < upgrade.sql
+
+-- ephemeris stored in segments with versioned formats, existing ephemeris are kept
+-- as single blobs of raw floats (format 0, no segment_size)
+ALTER TABLE ephemeris
+    ADD COLUMN IF NOT EXISTS format INTEGER NOT NULL DEFAULT '0',
+    ADD COLUMN IF NOT EXISTS segment_size INTEGER;
+
+CREATE TABLE IF NOT EXISTS ephemeris_segments (
+    id INTEGER NOT NULL AUTO_INCREMENT,
+    ephemeris_id INTEGER NOT NULL,
+    `index` INTEGER NOT NULL,
+    start DATETIME NOT NULL,
+    data LONGBLOB NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (ephemeris_id, `index`),
+    FOREIGN KEY (ephemeris_id) REFERENCES ephemeris (id) ON DELETE CASCADE
+);
+
+-- ephemeris data optionally kept in files on the local disk (see
+-- SMARTLINK_EPHEMERIS_DIRECTORY), in which case data is NULL
+ALTER TABLE ephemeris
+    ADD COLUMN IF NOT EXISTS path VARCHAR(256),
+    MODIFY data LONGBLOB NULL;
+
+-- segments are deleted by the database with their ephemeris (Ephemeris.segments
+-- relies on it), make sure the foreign key cascades whatever the version the table
+-- was created with
+ALTER TABLE ephemeris_segments DROP FOREIGN KEY IF EXISTS ephemeris_segments_ibfk_1;
+ALTER TABLE ephemeris_segments
+    ADD CONSTRAINT ephemeris_segments_ibfk_1 FOREIGN KEY (ephemeris_id)
+        REFERENCES ephemeris (id) ON DELETE CASCADE;
+
+-- ephemeris cached per dynamical model, existing ephemeris were computed with
+-- two-body backends (see also the conversion to ITRS below)
+ALTER TABLE ephemeris
+    ADD COLUMN IF NOT EXISTS dynamics VARCHAR(16) NOT NULL DEFAULT 'two-body',
+    DROP INDEX IF EXISTS satellite_id,
+    ADD UNIQUE KEY satellite_id (satellite_id, start, end, step, dynamics);
+
+-- eligibility groups computed over part of their ephemeris (after compaction), the
+-- horizon of the ephemeris is used for existing groups (NULL columns)
+ALTER TABLE eligibility_groups
+    ADD COLUMN IF NOT EXISTS start DATETIME,
+    ADD COLUMN IF NOT EXISTS end DATETIME,
+    ADD COLUMN IF NOT EXISTS horizon_step INTEGER,
+    DROP INDEX IF EXISTS ephemeris_id,
+    ADD UNIQUE KEY ephemeris_id (
+        ephemeris_id, station_id, mask, step, backend, start, end, horizon_step
+    );
+
+-- ephemeris are now tagged with the model of the conversion to ITRS as well (see
+-- compute.ephemeris_model, e.g. 'two-body+iau06a'). Existing ephemeris were converted
+-- with another model, they keep their tag and are not used anymore, so they can be
+-- removed (with their eligibility groups):
+--
+--   DELETE FROM ephemeris WHERE dynamics IN ('two-body', 'j2');
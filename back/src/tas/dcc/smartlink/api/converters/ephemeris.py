@@ -0,0 +1,251 @@
+import struct
+from datetime import datetime
+from typing import Any, Mapping
+
+import numpy as np
+from astropy.units import km
+
+from tas.dcc.orbits.utils.units import km_per_s
+
+from ... import models
+from ...utils.decimation import decimate
+from ...utils.time import ensure_utc
+from .. import schemas
+from ..schemas.utils import FloatDataFormat, IntDataFormat
+from .utils import numpy_to_bytes, numpy_to_schema, quantize
+
+_ALIGNMENT = 8
+"""Alignment of the blocks of binary ephemeris, in bytes (size of a float64)."""
+
+_POSITION_COLUMNS = ["xKm", "yKm", "zKm"]
+_VELOCITY_COLUMNS = ["dxKmPerS", "dyKmPerS", "dzKmPerS"]
+
+
+def _padding(size: int) -> int:
+    return -size % _ALIGNMENT
+
+
+def _ephemeris_to_array(
+    ephemeris: models.Ephemeris, with_velocity: bool
+) -> np.ndarray[tuple[int, int], Any]:
+    itrs = ephemeris.itrs
+    columns = [itrs.x.to_value(km), itrs.y.to_value(km), itrs.z.to_value(km)]
+    if with_velocity:
+        columns += [
+            itrs.d_x.to_value(km_per_s),
+            itrs.d_y.to_value(km_per_s),
+            itrs.d_z.to_value(km_per_s),
+        ]
+    return np.stack(columns, axis=1)
+
+
+def ephemeris_to_schema(
+    ephemeris: models.Ephemeris,
+    with_velocity: bool,
+    format: FloatDataFormat,
+    lod_tolerance: float | None = None,
+) -> schemas.Ephemeris:
+    """
+    Convert ephemeris to an API model.
+
+    Args:
+        ephemeris: Ephemeris to convert.
+        with_velocity: Whether to include velocities.
+        format: Format of the ephemeris data.
+        lod_tolerance: Tolerance (in km) to decimate the ephemeris with (see
+            decimate), or None to keep all the time steps.
+
+    Returns:
+        The converted ephemeris.
+    """
+    data = _ephemeris_to_array(ephemeris, with_velocity)
+
+    steps: bytes | None = None
+    if lod_tolerance is not None:
+        indices = decimate(data[:, :3], lod_tolerance)
+        data = data[indices]
+        steps = numpy_to_schema(
+            indices,
+            IntDataFormat(
+                type="int32", endianess=format.endianess, compress=format.compress
+            ),
+        )
+
+    data, quantization = quantize(data, format)
+    columns = [
+        numpy_to_schema(data[:, index], format) for index in range(data.shape[1])
+    ]
+
+    position = schemas.EphemerisPosition(
+        x_km=columns[0], y_km=columns[1], z_km=columns[2]
+    )
+
+    velocity: schemas.EphemerisVelocity | None = None
+    if with_velocity:
+        velocity = schemas.EphemerisVelocity(
+            dx_km_per_s=columns[3], dy_km_per_s=columns[4], dz_km_per_s=columns[5]
+        )
+
+    return schemas.Ephemeris(
+        position=position,
+        velocity=velocity,
+        steps=steps,
+        quantization=dict(zip(_POSITION_COLUMNS + _VELOCITY_COLUMNS, quantization))
+        if quantization is not None
+        else None,
+    )
+
+
+def ephemeris_to_binary(
+    ephemeris: Mapping[int, models.Ephemeris],
+    horizon: schemas.Horizon,
+    with_velocity: bool,
+    format: FloatDataFormat,
+    next_cursor: datetime | None = None,
+) -> bytes:
+    """
+    Encode ephemeris in a binary layout, without base64 or JSON encoding of the data:
+
+      - the size N of the header, as a little-endian uint32;
+      - the header (see EphemerisBinaryHeader), as N bytes of UTF-8 JSON, padded with
+        spaces so that the data start on a multiple of 8 bytes;
+      - the ephemeris of each satellite, as an array of shape (samples, columns)
+        encoded according to the format (type, endianess, order and compression),
+        each block being padded with zeros to a multiple of 8 bytes.
+
+    Args:
+        ephemeris: Mapping between satellite ID and ephemeris (over the horizon).
+        horizon: Horizon of the ephemeris.
+        with_velocity: Whether to include velocities.
+        format: Format of the ephemeris data.
+        next_cursor: Start of the next page, if any.
+
+    Returns:
+        The encoded ephemeris.
+    """
+    blocks: list[schemas.EphemerisBinaryBlock] = []
+    data: list[bytes] = []
+    offset = 0
+    for satellite_id, s_ephemeris in ephemeris.items():
+        array, quantization = quantize(
+            _ephemeris_to_array(s_ephemeris, with_velocity), format
+        )
+        block = numpy_to_bytes(array, format)
+        blocks.append(
+            schemas.EphemerisBinaryBlock(
+                satellite_id=satellite_id,
+                offset=offset,
+                size=len(block),
+                quantization=quantization,
+            )
+        )
+        data += [block, bytes(_padding(len(block)))]
+        offset += len(block) + _padding(len(block))
+
+    header = (
+        schemas.EphemerisBinaryHeader(
+            horizon=horizon,
+            velocity=with_velocity,
+            format=format,
+            samples=(horizon.end - horizon.start) // horizon.step + 1,
+            columns=_POSITION_COLUMNS + (_VELOCITY_COLUMNS if with_velocity else []),
+            blocks=blocks,
+            next_cursor=next_cursor,
+        )
+        .model_dump_json(by_alias=True)
+        .encode()
+    )
+    header += b" " * _padding(4 + len(header))
+
+    return b"".join([struct.pack("<I", len(header)), header, *data])
+
+
+def _czml_time(time: datetime) -> str:
+    return ensure_utc(time).isoformat().replace("+00:00", "Z")
+
+
+def _czml_interval(horizon: models.Horizon) -> str:
+    return f"{_czml_time(horizon.start)}/{_czml_time(horizon.end)}"
+
+
+def czml_document_packet(horizon: models.Horizon) -> dict[str, Any]:
+    """
+    Create the first packet of a CZML document, with a clock over the given horizon.
+
+    Args:
+        horizon: Horizon of the ephemeris in the document.
+
+    Returns:
+        The document packet, to be serialized to JSON.
+    """
+    return {
+        "id": "document",
+        "name": "ephemeris",
+        "version": "1.0",
+        "clock": {
+            "interval": _czml_interval(horizon),
+            "currentTime": _czml_time(horizon.start),
+            "range": "LOOP_STOP",
+        },
+    }
+
+
+def ephemeris_to_czml_packet(
+    satellite: models.Satellite,
+    ephemeris: models.Ephemeris,
+    with_velocity: bool,
+    lod_tolerance: float | None = None,
+) -> dict[str, Any]:
+    """
+    Convert ephemeris to a CZML packet, with sampled positions (in meters) in the
+    Earth-fixed frame, in seconds from the start of the horizon.
+
+    Args:
+        satellite: Satellite of the ephemeris.
+        ephemeris: Ephemeris to convert.
+        with_velocity: Whether to include velocities (then interpolated with Hermite
+            polynomials by Cesium).
+        lod_tolerance: Tolerance (in km) to decimate the ephemeris with (see
+            decimate), the positions being then interpolated linearly.
+
+    Returns:
+        The packet of the satellite, to be serialized to JSON.
+    """
+    horizon = ephemeris.horizon
+    data = _ephemeris_to_array(ephemeris, with_velocity) * 1000
+
+    steps = np.arange(len(data))
+    if lod_tolerance is not None:
+        steps = decimate(data[:, :3], lod_tolerance * 1000)
+        data = data[steps]
+
+    position: dict[str, Any] = {
+        "epoch": _czml_time(horizon.start),
+        "referenceFrame": "FIXED",
+    }
+    if lod_tolerance is not None:
+        position |= {"interpolationAlgorithm": "LINEAR", "interpolationDegree": 1}
+    elif with_velocity:
+        position |= {"interpolationAlgorithm": "HERMITE", "interpolationDegree": 1}
+    else:
+        position |= {"interpolationAlgorithm": "LAGRANGE", "interpolationDegree": 5}
+
+    samples = np.column_stack([steps * horizon.step.total_seconds(), data])
+    position[
+        "cartesianVelocity" if with_velocity else "cartesian"
+    ] = samples.ravel().tolist()
+
+    name = f"satellite {satellite.id}"
+    if satellite.plane is not None:
+        name = (
+            f"{satellite.plane.constellation.name} {satellite.plane.index}"
+            f"-{satellite.index}"
+        )
+
+    return {
+        "id": f"satellite-{satellite.id}",
+        "name": name,
+        "availability": _czml_interval(horizon),
+        "position": position,
+        "point": {"pixelSize": 5},
+    }
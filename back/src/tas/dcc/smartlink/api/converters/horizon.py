@@ -20,3 +20,16 @@ def horizon_schema_to_model(horizon: schemas.Horizon) -> models.Horizon:
     return models.Horizon(
         start=ensure_utc(horizon.start), end=ensure_utc(horizon.end), step=horizon.step
     )
+
+
+def horizon_model_to_schema(horizon: models.Horizon) -> schemas.Horizon:
+    """
+    Convert a smartlink Horizon model to an API horizon model.
+
+    Args:
+        horizon: Model to convert.
+
+    Returns:
+        The converted model.
+    """
+    return schemas.Horizon(start=horizon.start, end=horizon.end, step=horizon.step)
@@ -3,7 +3,7 @@ from typing import Any, Literal, cast
 import numpy as np
 from astropy import units as u
 
-from ..schemas.utils import FloatDataFormat, IntDataFormat
+from ..schemas.utils import FloatDataFormat, IntDataFormat, Quantization
 
 
 def _make_dtype(
@@ -13,23 +13,21 @@ def _make_dtype(
     return np.dtype(type).newbyteorder(endianess)  # type: ignore
 
 
-def numpy_to_schema(
+def numpy_to_bytes(
     value: np.ndarray[tuple[int, ...], Any], format: FloatDataFormat | IntDataFormat
 ) -> bytes:
     """
-    Convert a numpy array to a base-64 encoded byte array according to the given format.
+    Convert a numpy array to a raw byte array according to the given format.
 
     Args:
         value: Value to convert.
         format: Format to convert to.
 
     Returns:
-        A base64-encoded array containing the given numpy array, according to the
-        specified format.
+        A byte array containing the given numpy array, according to the specified
+        format.
     """
 
-    import base64
-
     v_bytes = value.astype(_make_dtype(format.type, format.endianess)).tobytes(
         order=format.order
     )
@@ -43,7 +41,71 @@ def numpy_to_schema(
 
         v_bytes = gzip.compress(v_bytes)
 
-    return base64.b64encode(v_bytes)
+    return v_bytes
+
+
+def quantize(
+    value: np.ndarray[tuple[int, int], Any], format: FloatDataFormat
+) -> tuple[np.ndarray[tuple[int, int], Any], list[Quantization] | None]:
+    """
+    Quantize each column of the given array to scaled integers if the format requires
+    it, using the full range of the integer type between the minimum and the maximum
+    of the column, and encode differences between consecutive values if requested.
+
+    Args:
+        value: Array of shape (N, C) to quantize.
+        format: Format to quantize to.
+
+    Returns:
+        The quantized array (the given array for float types), and the quantization of
+        each column (None for float types).
+    """
+    if format.type not in ("int16", "int32"):
+        return value, None
+
+    info = np.iinfo(format.type)
+    low = value.min(axis=0)
+    scale = (value.max(axis=0) - low) / (float(info.max) - float(info.min))
+    scale[scale == 0] = 1.0  # constant columns
+
+    quantized = np.clip(
+        np.rint((value - low) / scale) + info.min, info.min, info.max
+    ).astype(format.type)
+    offset = low - info.min * scale
+
+    # actual error of the decoded values, at most half a step
+    max_error = np.abs(offset + scale * quantized - value).max(axis=0)
+
+    if format.delta:
+        # wraps around on overflow, like the cumulative sum decoding it
+        quantized = np.diff(
+            quantized, axis=0, prepend=np.zeros((1, value.shape[1]), quantized.dtype)
+        )
+
+    return quantized, [
+        Quantization(offset=float(o), scale=float(s), max_error=float(e))
+        for o, s, e in zip(offset, scale, max_error)
+    ]
+
+
+def numpy_to_schema(
+    value: np.ndarray[tuple[int, ...], Any], format: FloatDataFormat | IntDataFormat
+) -> bytes:
+    """
+    Convert a numpy array to a base-64 encoded byte array according to the given format.
+
+    Args:
+        value: Value to convert.
+        format: Format to convert to.
+
+    Returns:
+        A base64-encoded array containing the given numpy array, according to the
+        specified format.
+    """
+
+    import base64
+
+    return base64.b64encode(numpy_to_bytes(value, format))
 
 
 def quantity_to_schema(
@@ -5,6 +5,7 @@ from .routers import (
     eligibilities,
     ephemeris,
     ground_segments,
+    jobs,
     stations,
     systems,
     topologies,
@@ -19,3 +20,4 @@ app.include_router(router=ephemeris.router)
 app.include_router(router=stations.router)
 app.include_router(router=ground_segments.router)
 app.include_router(router=eligibilities.router)
+app.include_router(router=jobs.router)
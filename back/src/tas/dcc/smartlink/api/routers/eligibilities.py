@@ -5,11 +5,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from tas.dcc.orbits.compute.azel import astropy_compute_azel, celest_compute_azel
-from tas.dcc.orbits.compute.eligibilities.base import EligibilityComputation
-from tas.dcc.orbits.compute.ephemeris import PoliastroPropagator
-from tas.dcc.orbits.utils.coordinates import astropy_gcrs_to_itrs
 from tas.dcc.orbits.utils.eligibilities import make_constant_mask
 
+from ...compute import Progress, compute_eligibilities_parallel, propagate_parallel
 from ...database import get_database
 from ...database.managers import (
     EligibilityManager,
@@ -17,8 +15,17 @@ from ...database.managers import (
     SatelliteManager,
     StationManager,
 )
+from ...database.models import Ephemeris as EphemerisDb
 from ...database.models.base import Base
-from ...models import ElevationMask, Eligibility, Ephemeris, Satellite, Station
+from ...models import (
+    ElevationMask,
+    Eligibility,
+    Ephemeris,
+    Horizon,
+    LazyITRS,
+    Satellite,
+    Station,
+)
 from .. import schemas
 from ..converters.eligibility import eligibility_model_to_schema
 from ..converters.horizon import horizon_schema_to_model
@@ -27,15 +34,17 @@ from ..schemas import EligibilityRequest, ErrorMessage
 router = APIRouter(prefix="/eligibilities", tags=["eligibilities"])
 
 
-@router.post(
-    "/compute",
-    responses={200: {"model": list[schemas.Eligibility]}, 422: {"model": ErrorMessage}},
-    operation_id="compute_eligibilities",
-)
-async def api_compute_eligibilities(
-    request: EligibilityRequest, db: Annotated[Session, Depends(get_database)]
-):
-    # load satellites and stations with masks
+def load_satellites_and_stations(
+    request: EligibilityRequest, db: Session
+) -> tuple[list[Satellite], dict[Station, ElevationMask]]:
+    """
+    Load the satellites and the stations (with their elevation mask) of the given
+    request.
+
+    Raises:
+        HTTPException: If one of the satellites or stations does not exist, or if a
+            mask is invalid.
+    """
     satellite_manager = SatelliteManager(db)
     satellites: list[Satellite] = []
 
@@ -91,6 +100,30 @@ async def api_compute_eligibilities(
 
         stations[station] = mask
 
+    return satellites, stations
+
+
+def run_eligibility_computation(
+    request: EligibilityRequest,
+    satellites: Sequence[Satellite],
+    stations: dict[Station, ElevationMask],
+    db: Session,
+    progress: Progress | None = None,
+) -> list[schemas.Eligibility]:
+    """
+    Compute eligibilities for the given request.
+
+    Args:
+        request: Request to compute eligibilities for.
+        satellites: Satellites of the request (see load_satellites_and_stations).
+        stations: Stations of the request with their mask.
+        db: Database session to use.
+        progress: Callback reporting satellites whose eligibilities are available.
+
+    Returns:
+        The eligibilities for the request.
+    """
+
     # convert horizon
     horizon = horizon_schema_to_model(request.horizon)
     interpolation_step = request.step or horizon.step
@@ -118,73 +151,97 @@ async def api_compute_eligibilities(
                 continue
             eligibilities[satellite][station] = eligibilities_for_link
 
-    azel_fn = {"astropy": astropy_compute_azel, "celest": celest_compute_azel}[
-        request.backend
-    ]
+    # None to compute all the stations of each satellite at once
+    azel_fn = {
+        "astropy": astropy_compute_azel,
+        "celest": celest_compute_azel,
+        "matrix": None,
+        "refine": None,
+    }[request.backend]
 
-    # compute eligibilities
-    propagator = PoliastroPropagator(propagation_step=horizon.step)
-    db_models: list[Base] = []
-    for satellite in satellites:
-        missing_stations = {
+    # retrieve ephemeris for satellites with missing eligibilities, propagating only
+    # what is missing from the database
+    missing_stations_per_satellite = {
+        satellite: {
             station: mask
             for station, mask in stations.items()
             if station not in eligibilities[satellite]
         }
+        for satellite in satellites
+    }
+    missing_satellites = [
+        satellite
+        for satellite, missing_stations in missing_stations_per_satellite.items()
+        if missing_stations
+    ]
+    if progress is not None:
+        progress(len(satellites) - len(missing_satellites))
 
-        if not missing_stations:
-            continue
-
-        # load or compute ephemeris
-        ephemeris: Ephemeris | None = None
-        if request.cache:
-            ephemeris = ephemeris_manager.extract(satellite, horizon)
+    # only eligibilities are reported, not the propagation
+    def propagate(
+        satellites: Sequence[Satellite],
+        horizon: Horizon,
+        progress: Progress | None = None,
+    ) -> list[LazyITRS]:
+        return propagate_parallel("poliastro", satellites, horizon)
 
-        if ephemeris is None:
-            gcrs = propagator.propagate(
-                satellite,
-                horizon.start,
-                horizon.end,
+    ephemeris_per_satellite: dict[Satellite, Ephemeris]
+    if request.cache:
+        ephemeris_per_satellite = ephemeris_manager.complete_many(
+            missing_satellites, horizon, propagate
+        )
+    else:
+        ephemeris_per_satellite = {
+            satellite: Ephemeris(
+                id=None, satellite=satellite, horizon=horizon, itrs=itrs
             )
-            ephemeris = Ephemeris(
-                id=None,
-                satellite=satellite,
-                horizon=horizon,
-                itrs=astropy_gcrs_to_itrs(gcrs),
+            for satellite, itrs in zip(
+                missing_satellites, propagate(missing_satellites, horizon)
             )
+        }
 
-            if request.cache:
-                db_models.append(ephemeris_manager.convert_to_database(ephemeris))
+    # compute eligibilities, database entries are created in this process only
+    computed_eligibilities = compute_eligibilities_parallel(
+        missing_satellites,
+        [ephemeris_per_satellite[satellite].itrs for satellite in missing_satellites],
+        horizon,
+        [
+            list(missing_stations_per_satellite[satellite].items())
+            for satellite in missing_satellites
+        ],
+        azel_fn,
+        interpolation_step,
+        progress,
+        refine=request.backend == "refine",
+    )
 
-        eligibility_computation = EligibilityComputation(
-            satellite=satellite,
-            ephemeris=ephemeris.itrs,
-            azel_fn=azel_fn,
-            interpolation="linear",
-            interpolation_step=interpolation_step,
-        )
+    db_models: list[Base] = []
+    for satellite, satellite_eligibilities in zip(
+        missing_satellites, computed_eligibilities
+    ):
+        missing_stations = missing_stations_per_satellite[satellite]
+        ephemeris = ephemeris_per_satellite[satellite]
 
-        for station, mask in missing_stations.items():
-            orbit_eligibilities = eligibility_computation.compute(
-                station.location, mask
-            )
+        ephemeris_db: Ephemeris | EphemerisDb = ephemeris
+        if request.cache and ephemeris.id is None:
+            ephemeris_db = ephemeris_manager.convert_to_database(ephemeris)
+            db_models.append(ephemeris_db)
 
+        for station, station_eligibilities in zip(
+            missing_stations, satellite_eligibilities
+        ):
             eligibilities[satellite][station] = [
                 Eligibility(
-                    id=None,
-                    satellite=satellite,
-                    station=station,
-                    start=eligibility.start,
-                    end=eligibility.end,
+                    id=None, satellite=satellite, station=station, start=start, end=end
                 )
-                for eligibility in orbit_eligibilities
+                for start, end in station_eligibilities
             ]
 
         if request.cache:
             db_models.extend(
                 [
                     eligibility_manager.create_group(
-                        ephemeris,
+                        ephemeris_db,
                         station,
                         eligibilities[satellite][station],
                         stations[station],
@@ -205,3 +262,17 @@ async def api_compute_eligibilities(
         for station_eligibilities in satellite_eligibilities.values()
         for e in station_eligibilities
     ]
+
+
+@router.post(
+    "/compute",
+    responses={200: {"model": list[schemas.Eligibility]}, 422: {"model": ErrorMessage}},
+    operation_id="compute_eligibilities",
+)
+def api_compute_eligibilities(
+    request: EligibilityRequest, db: Annotated[Session, Depends(get_database)]
+):
+    # runs in the thread pool of FastAPI (not async) to keep serving other requests
+    # during the computation
+    satellites, stations = load_satellites_and_stations(request, db)
+    return run_eligibility_computation(request, satellites, stations, db)
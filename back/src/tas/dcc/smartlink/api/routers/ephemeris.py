@@ -1,62 +1,56 @@
-from typing import Annotated, cast
+import json
+from datetime import datetime, timedelta
+from typing import Annotated, Callable, Iterator, Sequence, cast
 
-from astropy.units import km
-from fastapi import APIRouter, Depends, HTTPException
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
 
-from tas.dcc.orbits.compute.ephemeris import PoliastroPropagator
-from tas.dcc.orbits.utils.coordinates import celest_gcrs_to_itrs
-from tas.dcc.orbits.utils.units import km_per_s
-
-from ...database import get_database
+from ...compute import (
+    TWO_BODY,
+    Progress,
+    ephemeris_model,
+    propagate_parallel,
+    propagation_dynamics,
+)
+from ...database import ephemeris_cache, get_database
+from ...database.codecs import CHEBYSHEV, DEFAULT_CODEC
 from ...database.managers import (
     ConstellationManager,
     EphemerisManager,
     SatelliteManager,
     SystemManager,
 )
-from ...models import Ephemeris, Horizon, Satellite
+from ...models import Ephemeris, Horizon, LazyITRS, Satellite
+from ...utils.time import ensure_utc
 from .. import schemas
-from ..converters.horizon import horizon_schema_to_model
-from ..converters.utils import quantity_to_schema
+from ..converters.ephemeris import (
+    czml_document_packet,
+    ephemeris_to_binary,
+    ephemeris_to_czml_packet,
+    ephemeris_to_schema,
+)
+from ..converters.horizon import horizon_model_to_schema, horizon_schema_to_model
 from ..schemas import EphemerisRequest, EphemerisResponse, ErrorMessage
-from ..schemas.ephemeris import FloatDataFormat
 
 router = APIRouter(prefix="/ephemeris", tags=["ephemeris"])
 
+_STREAM_CHUNK_SIZE = 64
+"""Number of satellites propagated together when streaming ephemeris, a trade-off
+between the time to the first propagated satellite and the efficiency of batched
+propagation."""
 
-def _convert_ephemeris(
-    ephemeris: Ephemeris, with_velocity: bool, format: FloatDataFormat
-) -> schemas.Ephemeris:
-    # convert xyz
-    position = schemas.EphemerisPosition(
-        x_km=quantity_to_schema(ephemeris.itrs.x, format=format, unit=km),
-        y_km=quantity_to_schema(ephemeris.itrs.y, format=format, unit=km),
-        z_km=quantity_to_schema(ephemeris.itrs.z, format=format, unit=km),
-    )
 
-    velocity: schemas.EphemerisVelocity | None = None
-    if with_velocity:
-        velocity = schemas.EphemerisVelocity(
-            dx_km_per_s=quantity_to_schema(
-                ephemeris.itrs.d_x, format=format, unit=km_per_s
-            ),
-            dy_km_per_s=quantity_to_schema(
-                ephemeris.itrs.d_y, format=format, unit=km_per_s
-            ),
-            dz_km_per_s=quantity_to_schema(
-                ephemeris.itrs.d_z, format=format, unit=km_per_s
-            ),
-        )
-
-    return schemas.Ephemeris(position=position, velocity=velocity)
-
-
-def _get_common_horizons(satellites: list[Satellite], db: Session) -> list[Horizon]:
+def _get_common_horizons(
+    satellites: list[Satellite], db: Session, step: timedelta | None = None
+) -> list[Horizon]:
     ephem_m = EphemerisManager(db)
 
     horizons_per_satellite = {
-        satellite: ephem_m.horizons(satellite.id) if satellite.id is not None else []
+        satellite: ephem_m.horizons(satellite.id, step)
+        if satellite.id is not None
+        else []
         for satellite in satellites
     }
 
@@ -78,10 +72,12 @@ def _get_common_horizons(satellites: list[Satellite], db: Session) -> list[Horiz
     response_model=list[schemas.Horizon],
     operation_id="get_computed_ephemeris_horizons_by_satellite_id",
 )
-async def get_horizons_by_satellite_id(
-    satellite_id: int, db: Annotated[Session, Depends(get_database)]
+def get_horizons_by_satellite_id(
+    satellite_id: int,
+    db: Annotated[Session, Depends(get_database)],
+    step: timedelta | None = None,
 ):
-    return EphemerisManager(db).horizons(satellite_id)
+    return EphemerisManager(db).horizons(satellite_id, step)
 
 
 @router.get(
@@ -89,8 +85,10 @@ async def get_horizons_by_satellite_id(
     response_model=list[schemas.Horizon],
     operation_id="get_computed_ephemeris_horizons_by_constellation_id",
 )
-async def get_horizons_by_constellation_id(
-    constellation_id: int, db: Annotated[Session, Depends(get_database)]
+def get_horizons_by_constellation_id(
+    constellation_id: int,
+    db: Annotated[Session, Depends(get_database)],
+    step: timedelta | None = None,
 ):
     constellation = ConstellationManager(db).load(constellation_id)
 
@@ -101,7 +99,7 @@ async def get_horizons_by_constellation_id(
         )
 
     return _get_common_horizons(
-        [satellite for plane in constellation for satellite in plane], db
+        [satellite for plane in constellation for satellite in plane], db, step
     )
 
 
@@ -110,8 +108,10 @@ async def get_horizons_by_constellation_id(
     response_model=list[schemas.Horizon],
     operation_id="get_computed_ephemeris_horizons_by_system_id",
 )
-async def get_horizons_by_system_id(
-    system_id: int, db: Annotated[Session, Depends(get_database)]
+def get_horizons_by_system_id(
+    system_id: int,
+    db: Annotated[Session, Depends(get_database)],
+    step: timedelta | None = None,
 ):
     system = SystemManager(db).load(system_id)
 
@@ -129,17 +129,57 @@ async def get_horizons_by_system_id(
             for satellite in plane
         ],
         db,
+        step,
+    )
+
+
+@router.get(
+    "/cache",
+    response_model=schemas.EphemerisCacheStatistics,
+    operation_id="get_ephemeris_cache_statistics",
+)
+async def get_cache_statistics():
+    statistics = ephemeris_cache.statistics()
+    return schemas.EphemerisCacheStatistics(
+        hits=statistics.hits,
+        misses=statistics.misses,
+        evictions=statistics.evictions,
+        entries=statistics.entries,
+        size_bytes=statistics.size,
+        max_size_bytes=statistics.max_size,
     )
 
 
 @router.post(
-    "/compute",
-    responses={200: {"model": EphemerisResponse}, 422: {"model": ErrorMessage}},
-    operation_id="compute_ephemeris",
+    "/compact",
+    response_model=schemas.EphemerisCompaction,
+    operation_id="compact_ephemeris",
 )
-async def compute_ephemeris(
-    request: EphemerisRequest, db: Annotated[Session, Depends(get_database)]
+def compact_ephemeris(
+    db: Annotated[Session, Depends(get_database)],
+    satellite_ids: list[int] | None = Query(None),
 ):
+    created, removed = EphemerisManager(db).compact(satellite_ids)
+    return schemas.EphemerisCompaction(created=created, removed=removed)
+
+
+def load_satellites(request: EphemerisRequest, db: Session) -> list[Satellite]:
+    """
+    Load the satellites of the given request.
+
+    Raises:
+        HTTPException: If one of the satellites does not exist, or if phase shifting
+            is requested with a backend that is not two-body.
+    """
+    if request.phase_shift and propagation_dynamics(request.backend) != TWO_BODY:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": f"phase shift is not available with the {request.backend}"
+                " backend"
+            },
+        )
+
     satellites: list[Satellite] = []
 
     satellite_m = SatelliteManager(db)
@@ -154,43 +194,395 @@ async def compute_ephemeris(
 
         satellites.append(satellite)
 
-    ephemeris_m = EphemerisManager(db)
+    return satellites
+
+
+def page_horizon(request: EphemerisRequest) -> tuple[Horizon, datetime | None]:
+    """
+    Find the horizon of the page of the given request (see
+    EphemerisRequest.window_start), whose size is bounded by the maximum number of
+    samples and bytes of the request.
+
+    Args:
+        request: Request to find the page of.
+
+    Returns:
+        The horizon of the page, and the start of the next page (None for the last
+        page).
+
+    Raises:
+        HTTPException: If the start of the page is not a time step of the horizon, or
+            if the page cannot contain a single time step.
+    """
     horizon = horizon_schema_to_model(request.horizon)
-    ephemeris: dict[Satellite, Ephemeris | None] = {
-        satellite: None for satellite in satellites
-    }
 
-    if request.cache:
-        for satellite in satellites:
-            ephemeris[satellite] = ephemeris_m.extract(satellite, horizon)
-
-    propagator = PoliastroPropagator(propagation_step=horizon.step)
-    for satellite in satellites:
-        if ephemeris[satellite] is not None:
-            continue
-
-        gcrs = propagator.propagate(satellite, horizon.start, horizon.end)
-        ephem = Ephemeris(
-            id=None,
-            satellite=satellite,
-            horizon=horizon,
-            itrs=celest_gcrs_to_itrs(gcrs),
+    start = (
+        horizon.start
+        if request.window_start is None
+        else ensure_utc(request.window_start)
+    )
+    if (
+        not horizon.start <= start <= horizon.end
+        or (start - horizon.start) % horizon.step
+    ):
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": f"window start {start} is not a time step of the horizon"
+            },
+        )
+
+    max_samples = request.max_samples
+    if request.max_bytes is not None:
+        sample_size = np.dtype(request.format.type).itemsize * (
+            6 if request.velocity else 3
+        )
+        max_bytes_samples = request.max_bytes // sample_size
+        max_samples = (
+            max_bytes_samples
+            if max_samples is None
+            else min(max_samples, max_bytes_samples)
+        )
+
+    if max_samples is None:
+        return Horizon(start=start, end=horizon.end, step=horizon.step), None
+
+    if max_samples < 1:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "pages must contain at least one time step"},
+        )
+
+    end = min(start + (max_samples - 1) * horizon.step, horizon.end)
+    return (
+        Horizon(start=start, end=end, step=horizon.step),
+        end + horizon.step if end < horizon.end else None,
+    )
+
+
+def _propagate_function(
+    request: EphemerisRequest,
+) -> Callable[[Sequence[Satellite], Horizon, Progress | None], list[LazyITRS]]:
+    def propagate(
+        satellites: Sequence[Satellite],
+        horizon: Horizon,
+        progress: Progress | None = None,
+    ) -> list[LazyITRS]:
+        return propagate_parallel(
+            request.backend,
+            satellites,
+            horizon,
+            progress=progress,
+            phase_shift=request.phase_shift,
+        )
+
+    return propagate
+
+
+def _propagate_ephemeris(
+    request: EphemerisRequest,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    progress: Progress | None = None,
+) -> dict[Satellite, Ephemeris]:
+    return {
+        satellite: Ephemeris(id=None, satellite=satellite, horizon=horizon, itrs=itrs)
+        for satellite, itrs in zip(
+            satellites, _propagate_function(request)(satellites, horizon, progress)
         )
-        ephemeris[satellite] = ephem
+    }
+
+
+def _store_computed(
+    ephemeris: dict[Satellite, Ephemeris], ephemeris_m: EphemerisManager, db: Session
+):
+    computed = [e for e in ephemeris.values() if e.id is None]
+    for ephem in computed:
+        ephemeris_m.store(ephem, commit=False)
+    if computed:
+        db.commit()
+
+
+def _compute_ephemeris(
+    request: EphemerisRequest,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    ephemeris_m: EphemerisManager,
+    db: Session,
+    progress: Progress | None = None,
+) -> dict[Satellite, Ephemeris]:
+    if not request.cache:
+        return _propagate_ephemeris(request, satellites, horizon, progress)
+
+    ephemeris = ephemeris_m.complete_many(
+        satellites, horizon, _propagate_function(request), progress
+    )
+    _store_computed(ephemeris, ephemeris_m, db)
+
+    return ephemeris
+
 
-        if request.cache:
-            ephemeris_m.store(ephem)
+def _make_manager(request: EphemerisRequest, db: Session) -> EphemerisManager:
+    return EphemerisManager(
+        db,
+        codec={"samples": DEFAULT_CODEC, "chebyshev": CHEBYSHEV}[request.storage],
+        dynamics=ephemeris_model(request.backend),
+        interpolate=request.interpolate,
+    )
+
+
+def run_ephemeris_computation(
+    request: EphemerisRequest,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    next_cursor: datetime | None,
+    db: Session,
+    progress: Progress | None = None,
+) -> EphemerisResponse:
+    """
+    Compute ephemeris for the given request.
+
+    Args:
+        request: Request to compute ephemeris for.
+        satellites: Satellites of the request (see load_satellites).
+        horizon: Page of the horizon of the request to compute (see page_horizon).
+        next_cursor: Start of the next page (see page_horizon).
+        db: Database session to use.
+        progress: Callback reporting satellites whose ephemeris are available, found
+            in the cache or propagated.
+
+    Returns:
+        The response to the request.
+    """
+    ephemeris = _compute_ephemeris(
+        request, satellites, horizon, _make_manager(request, db), db, progress
+    )
 
     return EphemerisResponse(
         ephemeris={
-            cast(int, satellite.id): _convert_ephemeris(
-                cast(Ephemeris, s_ephemeris),
+            cast(int, satellite.id): ephemeris_to_schema(
+                s_ephemeris,
                 with_velocity=request.velocity,
                 format=request.format,
+                lod_tolerance=request.lod_tolerance_km,
             )
             for satellite, s_ephemeris in ephemeris.items()
         },
         velocity=request.velocity,
-        horizon=request.horizon,
+        horizon=horizon_model_to_schema(horizon),
         format=request.format,
+        next_cursor=next_cursor,
     )
+
+
+def iterate_ephemeris(
+    request: EphemerisRequest,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    db: Session,
+) -> Iterator[tuple[Satellite, Ephemeris]]:
+    """
+    Compute ephemeris for the given request, yielding the ephemeris of each satellite
+    as soon as it is available: satellites found in the cache first, then the other
+    satellites, propagated by chunks (see _STREAM_CHUNK_SIZE and
+    EphemerisManager.iterate_complete).
+
+    Args:
+        request: Request to compute ephemeris for.
+        satellites: Satellites of the request (see load_satellites).
+        horizon: Page of the horizon of the request to compute (see page_horizon),
+            the caller is responsible for sending the cursor of the next page.
+        db: Database session to use.
+
+    Yields:
+        Each satellite with its ephemeris over the given horizon, in no particular
+        order.
+    """
+    if not request.cache:
+        for start in range(0, len(satellites), _STREAM_CHUNK_SIZE):
+            yield from _propagate_ephemeris(
+                request, satellites[start : start + _STREAM_CHUNK_SIZE], horizon
+            ).items()
+        return
+
+    ephemeris_m = _make_manager(request, db)
+    for ephemeris in ephemeris_m.iterate_complete(
+        satellites,
+        horizon,
+        _propagate_function(request),
+        chunk_size=_STREAM_CHUNK_SIZE,
+    ):
+        # stored before being sent, so that they are reused if the client leaves
+        _store_computed(ephemeris, ephemeris_m, db)
+        yield from ephemeris.items()
+
+
+def stream_ephemeris_computation(
+    request: EphemerisRequest,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    db: Session,
+) -> Iterator[schemas.EphemerisStreamItem]:
+    """
+    Compute ephemeris for the given request, yielding the ephemeris of each satellite
+    as soon as it is available (see iterate_ephemeris).
+
+    Args:
+        request: Request to compute ephemeris for.
+        satellites: Satellites of the request (see load_satellites).
+        horizon: Page of the horizon of the request to compute (see page_horizon).
+        db: Database session to use.
+
+    Yields:
+        The ephemeris of each satellite, in no particular order.
+    """
+    for satellite, ephemeris in iterate_ephemeris(request, satellites, horizon, db):
+        yield schemas.EphemerisStreamItem(
+            satellite_id=cast(int, satellite.id),
+            ephemeris=ephemeris_to_schema(
+                ephemeris,
+                with_velocity=request.velocity,
+                format=request.format,
+                lod_tolerance=request.lod_tolerance_km,
+            ),
+        )
+
+
+@router.post(
+    "/compute",
+    responses={200: {"model": EphemerisResponse}, 422: {"model": ErrorMessage}},
+    operation_id="compute_ephemeris",
+)
+def compute_ephemeris(
+    request: EphemerisRequest, db: Annotated[Session, Depends(get_database)]
+):
+    # not async, so that FastAPI runs it in its thread pool and the computation (and
+    # the synchronous database requests) do not block the event loop
+    horizon, next_cursor = page_horizon(request)
+    return run_ephemeris_computation(
+        request, load_satellites(request, db), horizon, next_cursor, db
+    )
+
+
+@router.post(
+    "/compute/binary",
+    response_class=Response,
+    responses={
+        200: {
+            "content": {"application/octet-stream": {}},
+            "description": "Size of the header (little-endian uint32), header"
+            " (EphemerisBinaryHeader as JSON) and one block of raw data per satellite,"
+            " aligned on 8 bytes.",
+        },
+        422: {"model": ErrorMessage},
+    },
+    operation_id="compute_ephemeris_binary",
+)
+def compute_ephemeris_binary(
+    request: EphemerisRequest, db: Annotated[Session, Depends(get_database)]
+):
+    if request.lod_tolerance_km is not None:
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "level of detail is not available for binary responses"},
+        )
+
+    horizon, next_cursor = page_horizon(request)
+    satellites = load_satellites(request, db)
+    ephemeris = _compute_ephemeris(
+        request, satellites, horizon, _make_manager(request, db), db
+    )
+
+    return Response(
+        content=ephemeris_to_binary(
+            {
+                cast(int, satellite.id): s_ephemeris
+                for satellite, s_ephemeris in ephemeris.items()
+            },
+            horizon=horizon_model_to_schema(horizon),
+            with_velocity=request.velocity,
+            format=request.format,
+            next_cursor=next_cursor,
+        ),
+        media_type="application/octet-stream",
+    )
+
+
+@router.post(
+    "/compute/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": "One EphemerisStreamHeader, then one EphemerisStreamItem"
+            " per satellite, each on its own line.",
+        },
+        422: {"model": ErrorMessage},
+    },
+    operation_id="stream_ephemeris",
+)
+def stream_ephemeris(
+    request: EphemerisRequest, db: Annotated[Session, Depends(get_database)]
+):
+    horizon, next_cursor = page_horizon(request)
+    satellites = load_satellites(request, db)
+
+    # the generator is iterated in the thread pool, and the session is only closed
+    # once the response is sent
+    def lines() -> Iterator[str]:
+        header = schemas.EphemerisStreamHeader(
+            velocity=request.velocity,
+            horizon=horizon_model_to_schema(horizon),
+            format=request.format,
+            next_cursor=next_cursor,
+        )
+        yield header.model_dump_json(by_alias=True) + "\n"
+        for item in stream_ephemeris_computation(request, satellites, horizon, db):
+            yield item.model_dump_json(by_alias=True) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/czml",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/json": {}},
+            "description": "CZML document, with one packet per satellite.",
+        },
+        422: {"model": ErrorMessage},
+    },
+    operation_id="stream_ephemeris_czml",
+)
+def stream_ephemeris_czml(
+    request: EphemerisRequest, db: Annotated[Session, Depends(get_database)]
+):
+    # a CZML document has no place for the cursor of the next page
+    if (
+        request.max_samples is not None
+        or request.max_bytes is not None
+        or request.window_start is not None
+    ):
+        raise HTTPException(
+            status_code=422,
+            detail={"message": "paging is not available for CZML documents"},
+        )
+
+    horizon, _ = page_horizon(request)
+    satellites = load_satellites(request, db)
+
+    # see stream_ephemeris
+    def chunks() -> Iterator[str]:
+        yield "[" + json.dumps(czml_document_packet(horizon))
+        for satellite, ephemeris in iterate_ephemeris(request, satellites, horizon, db):
+            packet = ephemeris_to_czml_packet(
+                satellite,
+                ephemeris,
+                with_velocity=request.velocity,
+                lod_tolerance=request.lod_tolerance_km,
+            )
+            yield ",\n" + json.dumps(packet)
+        yield "]\n"
+
+    return StreamingResponse(chunks(), media_type="application/json")
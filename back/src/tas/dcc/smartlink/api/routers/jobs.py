@@ -0,0 +1,107 @@
+import os
+from typing import Annotated, Any, Callable, TypeVar
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from ... import database
+from ...database import get_database
+from ...utils.jobs import Job, JobRegistry
+from .. import schemas
+from ..schemas import EligibilityRequest, EphemerisRequest, ErrorMessage
+from .eligibilities import load_satellites_and_stations, run_eligibility_computation
+from .ephemeris import load_satellites, page_horizon, run_ephemeris_computation
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+_T = TypeVar("_T")
+
+_jobs = JobRegistry(
+    max_workers=int(os.environ.get("SMARTLINK_JOB_WORKERS", 4)),
+    max_finished=int(os.environ.get("SMARTLINK_JOB_HISTORY", 64)),
+)
+"""Process-local registry of jobs. The number of jobs running at the same time is set
+by SMARTLINK_JOB_WORKERS (4 by default) and the number of finished jobs kept (with
+their result) by SMARTLINK_JOB_HISTORY (64 by default)."""
+
+
+def _with_session(function: Callable[[Session], _T]) -> _T:
+    # jobs outlive the request, so they cannot use its session
+    db = database.SessionLocal()
+    try:
+        return function(db)
+    finally:
+        db.close()
+
+
+def _convert_job(job: Job[Any]) -> schemas.Job:
+    return schemas.Job(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        total_satellites=job.total,
+        completed_satellites=job.completed,
+        created=job.created,
+        finished=job.finished,
+        error=job.error,
+        ephemeris=job.result if job.kind == "ephemeris" else None,
+        eligibilities=job.result if job.kind == "eligibilities" else None,
+    )
+
+
+@router.post(
+    "/ephemeris",
+    responses={200: {"model": schemas.Job}, 422: {"model": ErrorMessage}},
+    operation_id="submit_ephemeris_job",
+)
+def submit_ephemeris_job(
+    request: EphemerisRequest, db: Annotated[Session, Depends(get_database)]
+):
+    horizon, next_cursor = page_horizon(request)
+    satellites = load_satellites(request, db)
+
+    def run(job: Job[schemas.EphemerisResponse]) -> schemas.EphemerisResponse:
+        return _with_session(
+            lambda db: run_ephemeris_computation(
+                request, satellites, horizon, next_cursor, db, job.advance
+            )
+        )
+
+    return _convert_job(_jobs.submit("ephemeris", len(satellites), run))
+
+
+@router.post(
+    "/eligibilities",
+    responses={200: {"model": schemas.Job}, 422: {"model": ErrorMessage}},
+    operation_id="submit_eligibilities_job",
+)
+def submit_eligibilities_job(
+    request: EligibilityRequest, db: Annotated[Session, Depends(get_database)]
+):
+    satellites, stations = load_satellites_and_stations(request, db)
+
+    def run(job: Job[list[schemas.Eligibility]]) -> list[schemas.Eligibility]:
+        return _with_session(
+            lambda db: run_eligibility_computation(
+                request, satellites, stations, db, job.advance
+            )
+        )
+
+    return _convert_job(_jobs.submit("eligibilities", len(satellites), run))
+
+
+@router.get(
+    "/{job_id}",
+    responses={200: {"model": schemas.Job}, 404: {"model": ErrorMessage}},
+    operation_id="get_job",
+)
+async def get_job(job_id: str):
+    job = _jobs.get(job_id)
+
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={"message": f"job {job_id} not found"},
+        )
+
+    return _convert_job(job)
@@ -12,14 +12,21 @@ from .constellation import (
 from .eligibility import Eligibility, EligibilityRequest
 from .ephemeris import (
     Ephemeris,
+    EphemerisBinaryBlock,
+    EphemerisBinaryHeader,
+    EphemerisCacheStatistics,
+    EphemerisCompaction,
     EphemerisPosition,
     EphemerisRequest,
     EphemerisResponse,
+    EphemerisStreamHeader,
+    EphemerisStreamItem,
     EphemerisVelocity,
 )
 from .error import ErrorMessage
 from .ground_segment import GroundSegment, GroundSegmentCreate, GroundSegmentInfo
 from .horizon import Horizon
+from .job import Job
 from .station import Location, Station, StationCreate
 from .system import System, SystemCreate, SystemInfo
 from .topology import SimpleTopologyParameters, Topology, TopologyCreate, TopologyInfo
@@ -35,15 +42,22 @@ __all__ = [
     "Eligibility",
     "EligibilityRequest",
     "Ephemeris",
+    "EphemerisBinaryBlock",
+    "EphemerisBinaryHeader",
+    "EphemerisCacheStatistics",
+    "EphemerisCompaction",
     "EphemerisPosition",
     "EphemerisRequest",
     "EphemerisResponse",
+    "EphemerisStreamHeader",
+    "EphemerisStreamItem",
     "EphemerisVelocity",
     "ErrorMessage",
     "GroundSegment",
     "GroundSegmentCreate",
     "GroundSegmentInfo",
     "Horizon",
+    "Job",
     "Location",
     "Satellite",
     "SatelliteOrbit",
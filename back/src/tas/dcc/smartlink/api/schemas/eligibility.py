@@ -47,5 +47,8 @@ class EligibilityRequest(BaseSchema):
     cache: bool = True
     """Whether to use caching (database) for ephemeris and eligibilities."""
 
-    backend: Literal["astropy", "celest"] = "celest"
-    """Backend to use to compute eligibilities."""
+    backend: Literal["astropy", "celest", "matrix", "refine"] = "celest"
+    """Backend to use to compute eligibilities, "matrix" computing geometric azimuths
+    and elevations for all the stations of a satellite at once, and "refine" doing so
+    only around the bounds of eligibilities (the step being then the minimum duration
+    of eligibilities to find)."""
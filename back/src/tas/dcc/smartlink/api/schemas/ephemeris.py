@@ -1,8 +1,9 @@
+from datetime import datetime
 from typing import Literal
 
 from .base import BaseSchema
 from .horizon import Horizon
-from .utils import FloatDataFormat
+from .utils import FloatDataFormat, Quantization
 
 
 class EphemerisPosition(BaseSchema):
@@ -51,6 +52,15 @@ class Ephemeris(BaseSchema):
     velocity: EphemerisVelocity | None = None
     """Velocity of the satellite over time, only if requested."""
 
+    steps: bytes | None = None
+    """Indices of the time steps of the horizon contained in the ephemeris, only when
+    decimated (see EphemerisRequest.lod_tolerance_km), as base64 encoded array of
+    int32 (with the endianess and compression of the format)."""
+
+    quantization: dict[str, Quantization] | None = None
+    """Quantization of each array (e.g., "xKm" or "dxKmPerS"), only for scaled integer
+    formats (see FloatDataFormat)."""
+
 
 class _EphemerisRequestResponse(BaseSchema):
     horizon: Horizon
@@ -71,10 +81,161 @@ class EphemerisRequest(_EphemerisRequestResponse):
     """Whether to check the cache before computing and to store computed ephemeris in
     the cache after computation."""
 
-    backend: Literal["poliastro"] = "poliastro"
-    """Backend to use to compute ephemeris."""
+    backend: Literal["poliastro", "kepler", "j2"] = "poliastro"
+    """Backend to use to compute ephemeris. "kepler" propagates all the satellites at
+    once with the same two-body model as "poliastro", and is much faster for large
+    systems. "j2" also includes the secular drift due to J2 of the node, perigee and
+    mean anomaly, and is more accurate for horizons of several days. Ephemeris are only
+    retrieved from the cache if they were computed with the same model."""
+
+    phase_shift: bool = False
+    """Whether to propagate only one satellite per orbital plane, the ephemeris of the
+    other satellites of the plane (same orbit, different anomaly) being obtained by
+    shifting the ephemeris of the propagated one in time. Much faster for Walker or
+    Telesat constellations, only available for two-body backends ("poliastro" and
+    "kepler")."""
+
+    lod_tolerance_km: float | None = None
+    """Tolerance of the level of detail, in km. If set, the ephemeris of each satellite
+    only contain the time steps needed for the linear interpolation (in time) between
+    them to be within the tolerance of all the positions (Douglas-Peucker), e.g., to
+    draw orbits with a few hundred points. Not available for binary responses."""
+
+    window_start: datetime | None = None
+    """Start of the requested page, i.e., the nextCursor of the previous page (must be
+    a time step of the horizon). Defaults to the start of the horizon. The horizon of
+    the response is the horizon of the page."""
+
+    max_samples: int | None = None
+    """Maximum number of time steps per page, no limit by default."""
+
+    max_bytes: int | None = None
+    """Maximum size of the (uncompressed) data of each satellite per page, in bytes,
+    no limit by default."""
+
+    storage: Literal["samples", "chebyshev"] = "samples"
+    """Storage mode for computed ephemeris in the cache. "chebyshev" stores Chebyshev
+    polynomials fitted on the ephemeris (positions within 1 m, velocities within
+    1 mm/s), which can later be used for requests with any step."""
+
+    interpolate: bool = False
+    """Whether cached ephemeris with another step (at most 60 s) can be interpolated to
+    answer the request, instead of propagating. Interpolated ephemeris are accurate to
+    about 2 cm (30 s step) to 30 cm (60 s step) for LEO satellites. Cached ephemeris
+    whose step divides the requested step are always used."""
 
 
 class EphemerisResponse(_EphemerisRequestResponse):
     ephemeris: dict[int, Ephemeris]
     """Mapping between satellite ID and ephemeris."""
+
+    next_cursor: datetime | None = None
+    """Start of the next page, to send as windowStart to retrieve it, or None if this
+    is the last page of the horizon."""
+
+
+class EphemerisStreamHeader(_EphemerisRequestResponse):
+
+    """
+    First line of a streamed ephemeris response (NDJSON), followed by one
+    EphemerisStreamItem per line.
+    """
+
+    next_cursor: datetime | None = None
+    """Start of the next page, to send as windowStart to retrieve it, or None if this
+    is the last page of the horizon."""
+
+
+class EphemerisStreamItem(BaseSchema):
+
+    """
+    Ephemeris of a single satellite in a streamed ephemeris response.
+    """
+
+    satellite_id: int
+    """ID of the satellite."""
+
+    ephemeris: Ephemeris
+    """Ephemeris of the satellite."""
+
+
+class EphemerisBinaryBlock(BaseSchema):
+
+    """
+    Location of the ephemeris of a single satellite in a binary ephemeris response.
+    """
+
+    satellite_id: int
+    """ID of the satellite."""
+
+    offset: int
+    """Offset of the block from the start of the data, in bytes (multiple of 8)."""
+
+    size: int
+    """Size of the block, in bytes (without padding)."""
+
+    quantization: list[Quantization] | None = None
+    """Quantization of each column, only for scaled integer formats (see
+    FloatDataFormat)."""
+
+
+class EphemerisBinaryHeader(_EphemerisRequestResponse):
+
+    """
+    Header of a binary ephemeris response, describing the blocks that follow it. Each
+    block contains an array of shape (samples, columns), encoded according to the
+    format (see FloatDataFormat), that can be read directly (e.g., with a typed array
+    over the response buffer) if the data are not compressed.
+    """
+
+    samples: int
+    """Number of time steps of each ephemeris."""
+
+    columns: list[str]
+    """Name of the columns of each ephemeris (e.g., "xKm" or "dxKmPerS")."""
+
+    blocks: list[EphemerisBinaryBlock]
+    """Location of the ephemeris of each satellite."""
+
+    next_cursor: datetime | None = None
+    """Start of the next page, to send as windowStart to retrieve it, or None if this
+    is the last page of the horizon."""
+
+
+class EphemerisCacheStatistics(BaseSchema):
+
+    """
+    Statistics of the in-memory cache of ephemeris extracted from the database, for
+    the process handling the request.
+    """
+
+    hits: int
+    """Number of ephemeris found in the cache."""
+
+    misses: int
+    """Number of ephemeris not found in the cache."""
+
+    evictions: int
+    """Number of ephemeris removed from the cache to stay under its maximum size."""
+
+    entries: int
+    """Number of ephemeris currently in the cache."""
+
+    size_bytes: int
+    """Current size of the cache, in bytes."""
+
+    max_size_bytes: int
+    """Maximum size of the cache, in bytes."""
+
+
+class EphemerisCompaction(BaseSchema):
+
+    """
+    Result of the compaction of the ephemeris in the database.
+    """
+
+    created: int
+    """Number of ephemeris created by merging existing ephemeris."""
+
+    removed: int
+    """Number of ephemeris removed after being merged."""
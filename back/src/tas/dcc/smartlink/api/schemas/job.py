@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Literal
+
+from .base import BaseSchema
+from .eligibility import Eligibility
+from .ephemeris import EphemerisResponse
+
+
+class Job(BaseSchema):
+
+    """
+    Computation running in the background on the server.
+    """
+
+    id: str
+    """ID of the job."""
+
+    kind: Literal["ephemeris", "eligibilities"]
+    """Kind of computation."""
+
+    status: Literal["pending", "running", "done", "failed"]
+    """Status of the job."""
+
+    total_satellites: int
+    """Number of satellites of the request."""
+
+    completed_satellites: int
+    """Number of satellites already processed."""
+
+    created: datetime
+    """Time at which the job was submitted."""
+
+    finished: datetime | None = None
+    """Time at which the job finished, if finished."""
+
+    error: str | None = None
+    """Error message, if the job failed."""
+
+    ephemeris: EphemerisResponse | None = None
+    """Result of an ephemeris job, once done."""
+
+    eligibilities: list[Eligibility] | None = None
+    """Result of an eligibilities job, once done."""
@@ -45,4 +45,30 @@ class IntDataFormat(_DataFormat):
 
 
 class FloatDataFormat(_DataFormat):
-    type: Literal["float16", "float32", "float64"] = "float32"
+    type: Literal["float16", "float32", "float64", "int16", "int32"] = "float32"
+    """Type of the encoded values. With "int16" and "int32", each array is quantized
+    to scaled integers q, and the values are offset + scale * q (see Quantization)."""
+
+    delta: bool = False
+    """Whether to encode the difference between consecutive values (the first value
+    being encoded as is), only for "int16" and "int32". The arrays are then decoded
+    with a cumulative sum modulo 2^16 or 2^32 (e.g., accumulating in a typed array)
+    before scaling. Smooth data such as ephemeris compress much better this way."""
+
+
+class Quantization(BaseSchema):
+
+    """
+    Parameters of an array of floats quantized to scaled integers (see
+    FloatDataFormat).
+    """
+
+    offset: float
+    """Offset of the decoded values."""
+
+    scale: float
+    """Scale of the decoded values."""
+
+    max_error: float
+    """Maximum error between the decoded values (computed in double precision) and the
+    values before quantization, guaranteed by the server."""
@@ -0,0 +1,47 @@
+from .eligibilities import (
+    StationFrames,
+    compute_eligibilities_matrix,
+    compute_eligibilities_refined,
+)
+from .ephemeris import (
+    J2,
+    TWO_BODY,
+    Propagator,
+    PropagatorBackend,
+    ephemeris_model,
+    make_propagator,
+    propagate_many,
+    propagation_dynamics,
+)
+from .frames import ITRS_MODEL, EarthRotation, earth_rotation
+from .j2 import J2Propagator, propagate_j2
+from .kepler import KeplerianElements, KeplerPropagator, propagate_kepler
+from .parallel import Progress, compute_eligibilities_parallel, propagate_parallel
+from .planes import group_by_orbit, propagate_phase_shifted
+
+__all__ = [
+    "EarthRotation",
+    "ITRS_MODEL",
+    "J2",
+    "J2Propagator",
+    "KeplerianElements",
+    "KeplerPropagator",
+    "Progress",
+    "Propagator",
+    "PropagatorBackend",
+    "StationFrames",
+    "TWO_BODY",
+    "compute_eligibilities_matrix",
+    "compute_eligibilities_parallel",
+    "compute_eligibilities_refined",
+    "earth_rotation",
+    "ephemeris_model",
+    "group_by_orbit",
+    "make_propagator",
+    "propagate_j2",
+    "propagate_kepler",
+    "propagate_many",
+    "propagate_parallel",
+    "propagate_phase_shifted",
+    "propagation_dynamics",
+]
@@ -0,0 +1,540 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Sequence
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import EarthLocation
+
+from tas.dcc.orbits.models import GroundLocation
+
+from ..models import ElevationMask, Horizon
+from ..utils.interpolation import hermite_interpolate
+
+
+@dataclass(frozen=True)
+class StationFrames:
+
+    """
+    Topocentric frames of several stations, stacked to compute azimuths and
+    elevations for all of them at once.
+    """
+
+    positions: np.ndarray[tuple[int, int], Any]
+    """ITRS positions of the stations (WGS84), in km, as an array of shape (S, 3)."""
+
+    rotations: np.ndarray[tuple[int, int, int], Any]
+    """Rotations from ITRS to the east-north-up frame of each station, as an array of
+    shape (S, 3, 3)."""
+
+    @classmethod
+    def from_locations(cls, locations: Sequence[GroundLocation]) -> "StationFrames":
+        """
+        Args:
+            locations: Locations of the stations.
+
+        Returns:
+            The frames of the given stations, in the same order.
+        """
+        longitude = u.Quantity([location.longitude for location in locations])
+        latitude = u.Quantity([location.latitude for location in locations])
+        height = u.Quantity([location.height for location in locations])
+
+        earth_location = EarthLocation.from_geodetic(longitude, latitude, height)
+        positions = np.stack(
+            [
+                earth_location.x.to_value(u.km),
+                earth_location.y.to_value(u.km),
+                earth_location.z.to_value(u.km),
+            ],
+            axis=-1,
+        )
+
+        lon, lat = longitude.to_value(u.rad), latitude.to_value(u.rad)
+        sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+        sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+        zero = np.zeros(len(locations))
+        rotations = np.stack(
+            [
+                np.stack([-sin_lon, cos_lon, zero], axis=-1),
+                np.stack([-sin_lat * cos_lon, -sin_lat * sin_lon, cos_lat], axis=-1),
+                np.stack([cos_lat * cos_lon, cos_lat * sin_lon, sin_lat], axis=-1),
+            ],
+            axis=-2,
+        )
+
+        return cls(positions=positions, rotations=rotations)
+
+    def compute_enu(
+        self, positions: np.ndarray[tuple[int, int], Any]
+    ) -> np.ndarray[tuple[int, int, int], Any]:
+        """
+        Compute the east, north and up components of the line of sight from all the
+        stations to a satellite at once.
+
+        Args:
+            positions: Array of shape (T, 3) containing the ITRS positions (in km) of
+                the satellite.
+
+        Returns:
+            The components of the line of sight, in km, as an array of shape (3, S, T).
+        """
+        # R . (p - s) = R . p - R . s, with a single matrix product for all the
+        # stations rather than creating the (S, T, 3) differences
+        n_stations = len(self.positions)
+        enu = (self.rotations.reshape(-1, 3) @ positions.T).reshape(n_stations, 3, -1)
+        enu -= np.einsum("sij,sj->si", self.rotations, self.positions)[..., None]
+        return np.moveaxis(enu, 1, 0)
+
+    def compute_enu_at(
+        self,
+        stations: np.ndarray[tuple[int], Any],
+        positions: np.ndarray[tuple[int, int], Any],
+    ) -> np.ndarray[tuple[int, int], Any]:
+        """
+        Compute the east, north and up components of the line of sight for pairs of
+        stations and positions.
+
+        Args:
+            stations: Indices of the stations, array of shape (K,).
+            positions: Array of shape (K, 3) containing the ITRS positions (in km) of
+                the satellite seen from each station.
+
+        Returns:
+            The components of the lines of sight, in km, as an array of shape (3, K).
+        """
+        return np.einsum(
+            "kij,kj->ik",
+            self.rotations[stations],
+            positions - self.positions[stations],
+        )
+
+    def compute_azel(
+        self, positions: np.ndarray[tuple[int, int], Any]
+    ) -> tuple[np.ndarray[tuple[int, int], Any], np.ndarray[tuple[int, int], Any]]:
+        """
+        Compute the geometric azimuth and elevation of a satellite from all the
+        stations at once.
+
+        Args:
+            positions: Array of shape (T, 3) containing the ITRS positions (in km) of
+                the satellite.
+
+        Returns:
+            The azimuths (from the north, towards the east) and the elevations, in
+            degrees, as arrays of shape (S, T).
+        """
+        return _enu_to_azel(self.compute_enu(positions))
+
+
+def _enu_to_azel(
+    enu: np.ndarray[tuple[int, ...], Any]
+) -> tuple[np.ndarray[tuple[int, ...], Any], np.ndarray[tuple[int, ...], Any]]:
+    """
+    Convert east, north and up components (first axis) to azimuths and elevations,
+    in degrees.
+    """
+    east, north, up = enu
+    azimuths = np.degrees(np.arctan2(east, north)) % 360
+    elevations = np.degrees(np.arctan2(up, np.hypot(east, north)))
+    return azimuths, elevations
+
+
+def _mask_elevations(
+    masks: Sequence[ElevationMask], azimuths: np.ndarray[tuple[int, int], Any]
+) -> np.ndarray[tuple[int, int], Any]:
+    """
+    Interpolate the minimum elevation of each mask (periodic in azimuth) at the
+    given azimuths, in degrees, array of shape (S, T).
+    """
+    return np.stack(
+        [
+            np.interp(
+                station_azimuths,
+                mask.azimuths.to_value(u.deg),
+                mask.elevations.to_value(u.deg),
+                period=360,
+            )
+            for mask, station_azimuths in zip(masks, azimuths)
+        ]
+    )
+
+
+def _resample(
+    positions: np.ndarray[tuple[int, int], Any], step: float, interpolation_step: float
+) -> np.ndarray[tuple[int, int], Any]:
+    """
+    Linearly interpolate positions sampled every step seconds at every
+    interpolation_step seconds, over the same time span.
+    """
+    if interpolation_step == step:
+        return positions
+
+    duration = (len(positions) - 1) * step
+    times = np.arange(int(duration // interpolation_step) + 1) * interpolation_step
+    samples = np.arange(len(positions)) * step
+    return np.stack(
+        [np.interp(times, samples, positions[:, axis]) for axis in range(3)], axis=-1
+    )
+
+
+def _find_crossings(
+    margins: np.ndarray[tuple[int, int], Any]
+) -> tuple[np.ndarray[tuple[int], Any], np.ndarray[tuple[int, int], Any]]:
+    """
+    Find the intervals where margins are non-negative, for several series at once,
+    locating their bounds by linear interpolation between samples.
+
+    Args:
+        margins: Array of shape (S, N) containing the margins of S series at N
+            regular time steps.
+
+    Returns:
+        The index of the series of each interval, in increasing order, and the start
+        and end of each interval (in fractional time steps) as an array of shape
+        (I, 2).
+    """
+    n_series, n_steps = margins.shape
+
+    # padding with negative margins, each interval starts with a rise and ends with
+    # a fall, change[:, k] being between steps k - 1 and k
+    above = np.zeros((n_series, n_steps + 2), dtype=np.int8)
+    above[:, 1:-1] = margins >= 0
+    series, steps = np.nonzero(np.diff(above, axis=1))
+
+    before = margins[series, np.maximum(steps - 1, 0)]
+    after = margins[series, np.minimum(steps, n_steps - 1)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.clip(before / (before - after), 0, 1)
+    bounds = np.where(
+        steps == 0,
+        0.0,
+        np.where(steps == n_steps, n_steps - 1.0, steps - 1 + fraction),
+    )
+
+    return series[::2], bounds.reshape(-1, 2)
+
+
+def _bounds_to_times(
+    start: datetime,
+    step: float,
+    n_series: int,
+    series: np.ndarray[tuple[int], Any],
+    bounds: np.ndarray[tuple[int, int], Any],
+) -> list[list[tuple[datetime, datetime]]]:
+    """
+    Convert the bounds of intervals (in fractional time steps) to times, grouping
+    them by series (see _find_crossings).
+    """
+    splits = np.searchsorted(series, np.arange(1, n_series))
+    return [
+        [
+            (
+                start + timedelta(seconds=lower * step),
+                start + timedelta(seconds=upper * step),
+            )
+            for lower, upper in series_bounds.tolist()
+        ]
+        for series_bounds in np.split(bounds, splits)
+    ]
+
+
+def compute_eligibilities_matrix(
+    positions: np.ndarray[tuple[int, int], Any],
+    horizon: Horizon,
+    stations: Sequence[tuple[GroundLocation, ElevationMask]],
+    interpolation_step: timedelta,
+    frames: StationFrames | None = None,
+) -> list[list[tuple[datetime, datetime]]]:
+    """
+    Compute the eligibilities of a satellite over several stations at once, the
+    azimuths and elevations for all the stations and time steps being computed as
+    single array operations rather than station by station.
+
+    Positions are interpolated linearly at the interpolation step, and the bounds of
+    eligibilities are interpolated linearly between the interpolated steps. Azimuths
+    and elevations are geometric (no aberration nor refraction).
+
+    Args:
+        positions: Array of shape (T, 3) containing the ITRS positions (in km) of the
+            satellite at each time step of the horizon.
+        horizon: Horizon of the positions.
+        stations: Locations of the stations with their elevation mask.
+        interpolation_step: Step used to interpolate positions.
+        frames: Frames of the stations, when computing eligibilities of several
+            satellites over the same stations.
+
+    Returns:
+        For each station, the start and end times of the eligibilities.
+    """
+    if not stations:
+        return []
+
+    if frames is None:
+        frames = StationFrames.from_locations([location for location, _ in stations])
+
+    step = interpolation_step.total_seconds()
+    azimuths, elevations = frames.compute_azel(
+        _resample(positions, horizon.step.total_seconds(), step)
+    )
+    margins = elevations - _mask_elevations([mask for _, mask in stations], azimuths)
+
+    series, bounds = _find_crossings(margins)
+    return _bounds_to_times(horizon.start, step, len(stations), series, bounds)
+
+
+_REFINE_TOLERANCE = 1e-3
+"""Precision of the bounds of eligibilities found by refinement, in seconds."""
+
+_SPEED_MARGIN = 1.1
+"""Factor applied to the maximum sampled speed of a satellite to bound its speed
+between samples."""
+
+
+def _mask_slopes(masks: Sequence[ElevationMask]) -> np.ndarray[tuple[int], Any]:
+    """
+    Compute the maximum slope of each mask (periodic in azimuth), in degrees of
+    elevation per degree of azimuth.
+    """
+    slopes = np.zeros(len(masks))
+    for index, mask in enumerate(masks):
+        azimuths = mask.azimuths.to_value(u.deg)
+        elevations = mask.elevations.to_value(u.deg)
+        if len(azimuths) > 1:
+            order = np.argsort(azimuths % 360)
+            azimuths = np.append(azimuths[order] % 360, azimuths[order][0] % 360 + 360)
+            elevations = np.append(elevations[order], elevations[order][0])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                slope = np.abs(np.diff(elevations) / np.diff(azimuths))
+            slopes[index] = np.nan_to_num(slope, nan=0, posinf=np.inf).max()
+    return slopes
+
+
+class _Margins:
+
+    """
+    Margins (elevation above the mask) of a satellite seen from several stations, at
+    any time of the horizon, with bounds on their rate of change.
+    """
+
+    def __init__(
+        self,
+        data: np.ndarray[tuple[int, int], Any],
+        step: float,
+        masks: Sequence[ElevationMask],
+        frames: StationFrames,
+    ):
+        self.data = data
+        self.step = step
+        self.masks = masks
+        self.frames = frames
+        self.slopes = _mask_slopes(masks)
+        self.speed = _SPEED_MARGIN * np.linalg.norm(data[:, 3:], axis=1).max()
+
+    def _margins(
+        self, stations: np.ndarray[tuple[int, ...], Any], enu: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        azimuths, elevations = _enu_to_azel(enu)
+        masks = np.empty_like(azimuths)
+        for index, mask in enumerate(self.masks):
+            selected = stations == index
+            masks[selected] = np.interp(
+                azimuths[selected],
+                mask.azimuths.to_value(u.deg),
+                mask.elevations.to_value(u.deg),
+                period=360,
+            )
+        return (
+            elevations - masks,
+            np.linalg.norm(enu, axis=0),
+            np.hypot(enu[0], enu[1]),
+        )
+
+    def at_samples(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            The margins (in degrees), distances and horizontal distances (in km) of
+            the satellite from each station at each sample, arrays of shape (S, T).
+        """
+        enu = self.frames.compute_enu(self.data[:, :3])
+        stations = np.broadcast_to(np.arange(enu.shape[1])[:, None], enu.shape[1:])
+        return self._margins(stations, enu)
+
+    def at(
+        self,
+        stations: np.ndarray[tuple[int], Any],
+        steps: np.ndarray[tuple[int], Any],
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            The margins (in degrees), distances and horizontal distances (in km) of
+            the satellite from the given stations at the given (fractional) steps,
+            interpolating the ephemeris with Hermite polynomials.
+        """
+        positions = hermite_interpolate(self.data, self.step, steps)[:, :3]
+        return self._margins(stations, self.frames.compute_enu_at(stations, positions))
+
+    def may_vanish(
+        self,
+        stations: np.ndarray[tuple[int], Any],
+        duration: np.ndarray[tuple[int], Any],
+        margins: tuple[np.ndarray, np.ndarray],
+        distances: tuple[np.ndarray, np.ndarray],
+        horizontal: tuple[np.ndarray, np.ndarray],
+    ) -> np.ndarray[tuple[int], Any]:
+        """
+        Check whether margins with the same sign at both ends of intervals may vanish
+        within the intervals, bounding the rate of change of the elevation by
+        speed / distance and the one of the azimuth by speed / horizontal distance.
+
+        Returns:
+            For each interval, whether the margin may vanish.
+        """
+        # distances within the interval, at most half of it from one of its ends
+        reach = self.speed * duration / 2
+        distance = np.minimum(*distances) - reach
+        horizontal_distance = np.minimum(*horizontal) - reach
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            elevation_rate = np.where(distance > 0, self.speed / distance, np.inf)
+            azimuth_rate = np.where(
+                horizontal_distance > 0, self.speed / horizontal_distance, np.inf
+            )
+            slopes = self.slopes[stations]
+            rate = np.degrees(
+                elevation_rate + np.where(slopes > 0, slopes * azimuth_rate, 0)
+            )
+            return np.abs(margins[0]) + np.abs(margins[1]) <= rate * duration
+
+
+def compute_eligibilities_refined(
+    data: np.ndarray[tuple[int, int], Any],
+    horizon: Horizon,
+    stations: Sequence[tuple[GroundLocation, ElevationMask]],
+    interpolation_step: timedelta,
+    frames: StationFrames | None = None,
+) -> list[list[tuple[datetime, datetime]]]:
+    """
+    Compute the eligibilities of a satellite over several stations at once, scanning
+    the samples of the ephemeris and refining only the intervals that may contain a
+    bound of an eligibility.
+
+    Intervals between samples are skipped when a bound on the rate of change of the
+    margin above the mask shows that it cannot vanish, and are otherwise split until
+    they contain a crossing of the mask or are shorter than the interpolation step
+    (so that eligibilities found by sampling at the interpolation step are found as
+    well). Crossings are then located by bisection, interpolating the ephemeris with
+    Hermite polynomials. Azimuths and elevations are geometric (see
+    compute_eligibilities_matrix).
+
+    Args:
+        data: Array of shape (T, 6) containing the ITRS positions (in km) and
+            velocities (in km/s) of the satellite at each time step of the horizon.
+        horizon: Horizon of the ephemeris.
+        stations: Locations of the stations with their elevation mask.
+        interpolation_step: Minimum duration of the eligibilities to find.
+        frames: Frames of the stations, when computing eligibilities of several
+            satellites over the same stations.
+
+    Returns:
+        For each station, the start and end times of the eligibilities.
+    """
+    if not stations:
+        return []
+
+    # no interval between samples to look for eligibilities in
+    if len(data) < 2:
+        return [[] for _ in stations]
+
+    if frames is None:
+        frames = StationFrames.from_locations([location for location, _ in stations])
+
+    step = horizon.step.total_seconds()
+    margins = _Margins(data, step, [mask for _, mask in stations], frames)
+    n_stations, n_steps = len(stations), len(data)
+
+    # intervals between samples, as arrays of (station, start, end)
+    margin, distance, horizontal = margins.at_samples()
+    interval = (
+        np.repeat(np.arange(n_stations), n_steps - 1),
+        np.tile(np.arange(n_steps - 1, dtype=float), n_stations),
+        np.tile(np.arange(1, n_steps, dtype=float), n_stations),
+    )
+    ends = (
+        (margin[:, :-1].ravel(), margin[:, 1:].ravel()),
+        (distance[:, :-1].ravel(), distance[:, 1:].ravel()),
+        (horizontal[:, :-1].ravel(), horizontal[:, 1:].ravel()),
+    )
+
+    # split intervals that may contain crossings until they do, or are too short
+    brackets: list[tuple[np.ndarray, ...]] = []
+    while len(interval[0]):
+        station, start, end = interval
+        (margin_start, margin_end), distances, horizontals = ends
+
+        crossing = (margin_start >= 0) != (margin_end >= 0)
+        brackets.append(
+            tuple(
+                array[crossing]
+                for array in (station, start, end, margin_start, margin_end)
+            )
+        )
+
+        duration = (end - start) * step
+        split = (
+            ~crossing
+            & (duration > interpolation_step.total_seconds())
+            & margins.may_vanish(
+                station, duration, (margin_start, margin_end), distances, horizontals
+            )
+        )
+
+        station, start, end = station[split], start[split], end[split]
+        middle = (start + end) / 2
+        margin_middle, distance_middle, horizontal_middle = margins.at(station, middle)
+        interval = (
+            np.concatenate([station, station]),
+            np.concatenate([start, middle]),
+            np.concatenate([middle, end]),
+        )
+        ends = tuple(
+            (
+                np.concatenate([values[0][split], value_middle]),
+                np.concatenate([value_middle, values[1][split]]),
+            )
+            for values, value_middle in zip(
+                ends, (margin_middle, distance_middle, horizontal_middle)
+            )
+        )
+
+    station, start, end, margin_start, margin_end = (
+        np.concatenate(arrays) for arrays in zip(*brackets)
+    )
+
+    # bisection of the crossings
+    while len(start) and ((end - start) * step).max() > _REFINE_TOLERANCE:
+        middle = (start + end) / 2
+        margin_middle, _, _ = margins.at(station, middle)
+        before = (margin_start >= 0) != (margin_middle >= 0)
+        end = np.where(before, middle, end)
+        margin_end = np.where(before, margin_middle, margin_end)
+        start = np.where(before, start, middle)
+        margin_start = np.where(before, margin_start, margin_middle)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.clip(margin_start / (margin_start - margin_end), 0, 1)
+    crossings = start + np.nan_to_num(fraction) * (end - start)
+
+    # eligibilities at the start or end of the horizon are bounded by it
+    above_start = np.flatnonzero(margin[:, 0] >= 0)
+    above_end = np.flatnonzero(margin[:, -1] >= 0)
+    station = np.concatenate([above_start, station, above_end])
+    crossings = np.concatenate(
+        [np.zeros(len(above_start)), crossings, np.full(len(above_end), n_steps - 1.0)]
+    )
+
+    # crossings of each station alternate between rises and falls
+    order = np.lexsort((crossings, station))
+    station, bounds = station[order][::2], crossings[order].reshape(-1, 2)
+
+    return _bounds_to_times(horizon.start, step, n_stations, station, bounds)
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from typing import Literal, Sequence
+
+from tas.dcc.orbits.compute.ephemeris import PoliastroPropagator
+from tas.dcc.orbits.coordinates import GCRS
+
+from ..models import Satellite
+from .frames import ITRS_MODEL
+from .j2 import J2Propagator
+from .kepler import KeplerPropagator
+
+Propagator = PoliastroPropagator | KeplerPropagator
+
+PropagatorBackend = Literal["poliastro", "kepler", "j2"]
+
+TWO_BODY = "two-body"
+"""Dynamical model of the two-body backends (poliastro and kepler)."""
+
+J2 = "j2"
+"""Dynamical model of the J2 backend."""
+
+
+def make_propagator(
+    backend: PropagatorBackend, propagation_step: timedelta
+) -> Propagator:
+    """
+    Create a propagator for the given backend.
+
+    Args:
+        backend: Backend to use, "poliastro" propagates satellites one by one with
+            poliastro, "kepler" propagates all the satellites at once (see
+            KeplerPropagator), "j2" also includes the secular effects of J2 (see
+            J2Propagator).
+        propagation_step: Step between two propagated time steps.
+
+    Returns:
+        The propagator for the given backend.
+    """
+    if backend == "j2":
+        return J2Propagator(propagation_step=propagation_step)
+    if backend == "kepler":
+        return KeplerPropagator(propagation_step=propagation_step)
+    return PoliastroPropagator(propagation_step=propagation_step)
+
+
+def propagation_dynamics(backend: PropagatorBackend) -> str:
+    """
+    Find the dynamical model of the given backend, ephemeris computed by backends
+    with the same model are interchangeable and can be cached together.
+
+    Args:
+        backend: Backend to find the model of.
+
+    Returns:
+        The dynamical model of the backend (TWO_BODY or J2).
+    """
+    return J2 if backend == "j2" else TWO_BODY
+
+
+def ephemeris_model(backend: PropagatorBackend) -> str:
+    """
+    Find the model of the ITRS ephemeris computed by the given backend, i.e., its
+    dynamical model (see propagation_dynamics) and the model of the conversion to ITRS
+    (see frames.ITRS_MODEL). Cached ephemeris are only reused for the same model.
+
+    Args:
+        backend: Backend to find the model of.
+
+    Returns:
+        The model of the ephemeris of the backend.
+    """
+    return f"{propagation_dynamics(backend)}+{ITRS_MODEL}"
+
+
+def propagate_many(
+    propagator: Propagator,
+    satellites: Sequence[Satellite],
+    start: datetime,
+    end: datetime,
+) -> list[GCRS]:
+    """
+    Propagate the given satellites between start and end (both included), at once if
+    the propagator supports it.
+
+    Returns:
+        The GCRS coordinates of each satellite, in the same order.
+    """
+    if isinstance(propagator, KeplerPropagator):
+        return propagator.propagate_many(satellites, start, end)
+    return [propagator.propagate(satellite, start, end) for satellite in satellites]
@@ -0,0 +1,137 @@
+import warnings
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import astropy.units as u
+import erfa
+import numpy as np
+from astropy.time import Time
+from astropy.utils import iers
+from astropy.utils.exceptions import AstropyWarning
+
+from tas.dcc.orbits.utils.astropy import astropy_timerange
+
+from ..models import Horizon
+
+EARTH_ROTATION_RATE = 7.292115146706979e-5
+"""Rotation rate of the Earth (derivative of the Earth rotation angle), in rad/s."""
+
+ITRS_MODEL = "iau06a"
+"""Model of the conversion from GCRS to ITRS (see earth_rotation), stored with cached
+ephemeris (see ephemeris_model) so that ephemeris converted with another model are not
+mixed with them."""
+
+_ROTATION_CACHE_SIZE = 32
+"""Maximum number of horizons whose rotation matrices are kept in memory."""
+
+_DEFAULT_POLAR_MOTION = (0.035 * u.arcsec, 0.29 * u.arcsec)
+"""Polar motion used outside of the range of the IERS tables (50-years mean, as
+astropy does)."""
+
+
+@dataclass(frozen=True)
+class EarthRotation:
+
+    """
+    Rotation from GCRS to ITRS at each time step of a horizon, as arrays of shape
+    (T, 3, 3).
+    """
+
+    rotation: np.ndarray[tuple[int, int, int], Any]
+    """Rotation matrix from GCRS to ITRS."""
+
+    rotation_rate: np.ndarray[tuple[int, int, int], Any]
+    """Time derivative of the rotation matrix, in 1/s."""
+
+    def apply(
+        self,
+        data: np.ndarray[tuple[int, ...], Any],
+        out: np.ndarray[tuple[int, ...], Any] | None = None,
+    ) -> np.ndarray[tuple[int, ...], Any]:
+        """
+        Convert GCRS positions and velocities to ITRS, for any number of satellites at
+        once.
+
+        Args:
+            data: Array of shape (..., T, 6) containing GCRS positions (in km) and
+                velocities (in km/s) at each time step of the horizon.
+            out: Array of the same shape as data to store the result in, must not
+                overlap data.
+
+        Returns:
+            The ITRS positions and velocities, with the same shape as data.
+        """
+        if out is None:
+            out = np.empty_like(data)
+
+        position, velocity = data[..., :3], data[..., 3:]
+        np.einsum("tij,...tj->...ti", self.rotation, position, out=out[..., :3])
+        np.einsum("tij,...tj->...ti", self.rotation, velocity, out=out[..., 3:])
+        out[..., 3:] += np.einsum("tij,...tj->...ti", self.rotation_rate, position)
+        return out
+
+
+def _polar_motion(
+    time: Time,
+) -> tuple[np.ndarray[tuple[int], Any], np.ndarray[tuple[int], Any]]:
+    """
+    Returns:
+        The polar motion components (xp, yp) at the given times, in radians.
+    """
+    xp, yp, status = iers.earth_orientation_table.get().pm_xy(time, return_status=True)
+
+    outside = (status == iers.TIME_BEFORE_IERS_RANGE) | (
+        status == iers.TIME_BEYOND_IERS_RANGE
+    )
+    if np.any(outside):
+        warnings.warn(
+            "some times are outside of the IERS tables, using the 50-years mean polar"
+            " motion for them",
+            AstropyWarning,
+        )
+        xp[outside], yp[outside] = _DEFAULT_POLAR_MOTION
+
+    return xp.to_value(u.rad), yp.to_value(u.rad)
+
+
+def _ut1(time: Time) -> Time:
+    try:
+        return time.ut1
+    except iers.IERSRangeError as error:
+        warnings.warn(f"{error}, using UTC instead of UT1", AstropyWarning)
+        return time
+
+
+@lru_cache(maxsize=_ROTATION_CACHE_SIZE)
+def earth_rotation(horizon: Horizon) -> EarthRotation:
+    """
+    Compute the rotation from GCRS to ITRS over the given horizon (IAU 2006/2000A
+    precession-nutation, Earth rotation angle and polar motion, as astropy does).
+
+    Results are cached per horizon and shared by all the satellites propagated over
+    it, the returned arrays are read-only.
+
+    Args:
+        horizon: Horizon to compute the rotation for.
+
+    Returns:
+        The rotation at each time step of the horizon.
+    """
+    time = astropy_timerange(horizon.start, horizon.end, horizon.step)
+    tt, ut1 = time.tt, _ut1(time)
+
+    # ITRS = W . R(ERA) . C . GCRS, only the Earth rotation angle varies quickly, so
+    # dR/dt = W . dR(ERA)/dt . C = w . W . S . W^T . R
+    celestial = erfa.c2i06a(tt.jd1, tt.jd2)
+    polar_motion = erfa.pom00(*_polar_motion(time), erfa.sp00(tt.jd1, tt.jd2))
+    rotation = erfa.c2tcio(celestial, erfa.era00(ut1.jd1, ut1.jd2), polar_motion)
+
+    spin = np.array([[0.0, 1.0, 0.0], [-1.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+    rotation_rate = EARTH_ROTATION_RATE * (
+        polar_motion @ spin @ np.swapaxes(polar_motion, -1, -2) @ rotation
+    )
+
+    rotation.flags.writeable = False
+    rotation_rate.flags.writeable = False
+    return EarthRotation(rotation=rotation, rotation_rate=rotation_rate)
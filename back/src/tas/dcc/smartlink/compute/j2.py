@@ -0,0 +1,123 @@
+from dataclasses import replace
+from typing import Any
+
+import numpy as np
+
+from .kepler import (
+    KeplerianElements,
+    KeplerPropagator,
+    elements_to_cartesian,
+    mean_anomaly_at_epoch,
+)
+
+EARTH_J2 = 1.08262668e-3
+"""Second zonal harmonic of the Earth gravity field."""
+
+EARTH_RADIUS = 6378.1363
+"""Equatorial radius of the Earth (associated to EARTH_J2), in km."""
+
+
+def mean_semi_major_axis(elements: KeplerianElements) -> np.ndarray[tuple[int], Any]:
+    """
+    Remove the first-order short-periodic variations due to J2 from the osculating
+    semi-major axis of the given orbits. These variations are up to about 10 km in
+    LEO, which would otherwise bias the mean motion and lead to along-track errors of
+    hundreds of kilometers after a few days.
+
+    Args:
+        elements: Osculating orbital elements of N satellites around the Earth.
+
+    Returns:
+        The mean semi-major axis of each orbit, in km.
+    """
+    a, ecc = elements.a, elements.ecc
+    sin_i2 = np.sin(elements.inc) ** 2
+
+    # a / r at epoch
+    a_r = (1 + ecc * np.cos(elements.nu)) / (1 - ecc**2)
+
+    return a - EARTH_J2 * EARTH_RADIUS**2 / a * (
+        (1 - 1.5 * sin_i2) * (a_r**3 - (1 - ecc**2) ** -1.5)
+        + 1.5 * sin_i2 * a_r**3 * np.cos(2 * (elements.argp + elements.nu))
+    )
+
+
+def j2_secular_rates(
+    elements: KeplerianElements,
+) -> tuple[
+    np.ndarray[tuple[int], Any],
+    np.ndarray[tuple[int], Any],
+    np.ndarray[tuple[int], Any],
+]:
+    """
+    Compute the first-order secular drift due to J2 of the given orbits.
+
+    Args:
+        elements: Mean orbital elements of N satellites around the Earth.
+
+    Returns:
+        The rates of the right ascension of the ascending node, of the argument of the
+        perigee and of the mean anomaly (including the mean motion), in radians per
+        second, as arrays of shape (N,).
+    """
+    mean_motion = np.sqrt(elements.k / elements.a**3)
+    p = elements.a * (1 - elements.ecc**2)
+    factor = 1.5 * EARTH_J2 * (EARTH_RADIUS / p) ** 2 * mean_motion
+    cos_i2 = np.cos(elements.inc) ** 2
+
+    return (
+        -factor * np.cos(elements.inc),
+        factor * (2.5 * cos_i2 - 0.5),
+        mean_motion + factor * np.sqrt(1 - elements.ecc**2) * (1.5 * cos_i2 - 0.5),
+    )
+
+
+def propagate_j2(
+    elements: KeplerianElements, dt: np.ndarray[tuple[int, int], Any]
+) -> tuple[
+    np.ndarray[tuple[int, int, int], Any], np.ndarray[tuple[int, int, int], Any]
+]:
+    """
+    Propagate the given elliptical orbits around the Earth using the two-body model
+    with the secular drift due to J2 of the right ascension of the ascending node, of
+    the argument of the perigee and of the mean anomaly.
+
+    The mean semi-major axis is computed from the osculating one (see
+    mean_semi_major_axis), other short-periodic terms (of a few kilometers in LEO) are
+    not modelled.
+
+    Args:
+        elements: Osculating orbital elements of N satellites around the Earth.
+        dt: Time since the epoch of each satellite, in seconds, of shape (N, T).
+
+    Returns:
+        The positions (in km) and velocities (in km/s) in GCRS, as arrays of shape
+        (N, T, 3).
+    """
+    if np.any(elements.ecc >= 1):
+        raise ValueError("only elliptical orbits can be propagated")
+
+    elements = replace(elements, a=mean_semi_major_axis(elements))
+    raan_rate, argp_rate, mean_anomaly_rate = j2_secular_rates(elements)
+
+    return elements_to_cartesian(
+        elements,
+        elements.raan[:, None] + raan_rate[:, None] * dt,
+        elements.argp[:, None] + argp_rate[:, None] * dt,
+        mean_anomaly_at_epoch(elements)[:, None] + mean_anomaly_rate[:, None] * dt,
+    )
+
+
+class J2Propagator(KeplerPropagator):
+
+    """
+    Analytical propagator including the secular effects of J2 (see propagate_j2),
+    propagating all the satellites and all the time steps at once.
+    """
+
+    def _propagate(
+        self, elements: KeplerianElements, dt: np.ndarray[tuple[int, int], Any]
+    ) -> tuple[
+        np.ndarray[tuple[int, int, int], Any], np.ndarray[tuple[int, int, int], Any]
+    ]:
+        return propagate_j2(elements, dt)
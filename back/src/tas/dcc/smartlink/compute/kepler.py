@@ -0,0 +1,271 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Sequence
+
+import astropy.units as u
+import numpy as np
+from astropy.time import Time
+
+from tas.dcc.orbits.coordinates import GCRS
+from tas.dcc.orbits.utils.astropy import astropy_timerange
+from tas.dcc.orbits.utils.units import km_per_s
+
+from ..models import Satellite
+
+_KEPLER_TOLERANCE = 1e-12
+"""Tolerance (in radians) on the eccentric anomaly when solving Kepler's equation."""
+
+_KEPLER_MAX_ITERATIONS = 32
+"""Maximum number of Newton iterations when solving Kepler's equation."""
+
+
+@dataclass(frozen=True)
+class KeplerianElements:
+
+    """
+    Classical orbital elements of N satellites, as arrays of shape (N,).
+    """
+
+    k: np.ndarray[tuple[int], Any]
+    """Gravitational parameter of the attractor, in km^3/s^2."""
+
+    a: np.ndarray[tuple[int], Any]
+    """Semi-major axis, in km."""
+
+    ecc: np.ndarray[tuple[int], Any]
+    """Eccentricity."""
+
+    inc: np.ndarray[tuple[int], Any]
+    """Inclination, in radians."""
+
+    raan: np.ndarray[tuple[int], Any]
+    """Right ascension of the ascending node, in radians."""
+
+    argp: np.ndarray[tuple[int], Any]
+    """Argument of the perigee, in radians."""
+
+    nu: np.ndarray[tuple[int], Any]
+    """True anomaly at epoch, in radians."""
+
+    epoch: Time
+    """Epoch of the elements."""
+
+    @staticmethod
+    def from_satellites(satellites: Sequence[Satellite]) -> "KeplerianElements":
+        """
+        Args:
+            satellites: Satellites to retrieve orbital elements from.
+
+        Returns:
+            The orbital elements of the given satellites, in the same order.
+        """
+
+        def values(name: str, unit: u.UnitBase) -> np.ndarray[tuple[int], Any]:
+            return np.array(
+                [getattr(s.orbit, name).to_value(unit) for s in satellites],
+                dtype=float,
+            )
+
+        return KeplerianElements(
+            k=np.array(
+                [s.orbit.attractor.k.to_value(u.km**3 / u.s**2) for s in satellites]
+            ),
+            a=values("a", u.km),
+            ecc=values("ecc", u.one),
+            inc=values("inc", u.rad),
+            raan=values("raan", u.rad),
+            argp=values("argp", u.rad),
+            nu=values("nu", u.rad),
+            epoch=Time([s.orbit.epoch for s in satellites]),
+        )
+
+
+def _solve_kepler(
+    mean_anomaly: np.ndarray[tuple[int, int], Any],
+    ecc: np.ndarray[tuple[int, int], Any],
+) -> np.ndarray[tuple[int, int], Any]:
+    """
+    Solve Kepler's equation M = E - e.sin(E) for the eccentric anomaly E using Newton
+    iterations, for all the given values at once.
+    """
+    eccentric_anomaly = np.where(ecc < 0.8, mean_anomaly, np.pi * np.sign(mean_anomaly))
+    for _ in range(_KEPLER_MAX_ITERATIONS):
+        delta = (eccentric_anomaly - ecc * np.sin(eccentric_anomaly) - mean_anomaly) / (
+            1 - ecc * np.cos(eccentric_anomaly)
+        )
+        eccentric_anomaly -= delta
+        if np.abs(delta).max(initial=0) < _KEPLER_TOLERANCE:
+            break
+    return eccentric_anomaly
+
+
+def mean_anomaly_at_epoch(elements: KeplerianElements) -> np.ndarray[tuple[int], Any]:
+    """
+    Returns:
+        The mean anomaly at epoch of the given elliptical orbits, in radians.
+    """
+    eccentric_anomaly = 2 * np.arctan(
+        np.sqrt((1 - elements.ecc) / (1 + elements.ecc)) * np.tan(elements.nu / 2)
+    )
+    return eccentric_anomaly - elements.ecc * np.sin(eccentric_anomaly)
+
+
+def elements_to_cartesian(
+    elements: KeplerianElements,
+    raan: np.ndarray[tuple[int, int], Any],
+    argp: np.ndarray[tuple[int, int], Any],
+    mean_anomaly: np.ndarray[tuple[int, int], Any],
+) -> tuple[
+    np.ndarray[tuple[int, int, int], Any], np.ndarray[tuple[int, int, int], Any]
+]:
+    """
+    Convert orbital elements to positions and velocities, for all the satellites and
+    time steps at once.
+
+    Args:
+        elements: Orbital elements of N satellites, only the gravitational parameter,
+            semi-major axis, eccentricity and inclination are used.
+        raan: Right ascension of the ascending node, in radians, of shape (N, T) or
+            (N, 1).
+        argp: Argument of the perigee, in radians, of shape (N, T) or (N, 1).
+        mean_anomaly: Mean anomaly, in radians, of shape (N, T).
+
+    Returns:
+        The positions (in km) and velocities (in km/s) in the frame of the elements,
+        as arrays of shape (N, T, 3).
+    """
+    k, a, ecc = elements.k[:, None], elements.a[:, None], elements.ecc[:, None]
+
+    eccentric_anomaly = _solve_kepler(
+        np.remainder(mean_anomaly + np.pi, 2 * np.pi) - np.pi, ecc
+    )
+    cos_e, sin_e = np.cos(eccentric_anomaly), np.sin(eccentric_anomaly)
+    sqrt_1_e2 = np.sqrt(1 - ecc**2)
+
+    # position and velocity in the perifocal frame
+    r = a * (1 - ecc * cos_e)
+    x_p, y_p = a * (cos_e - ecc), a * sqrt_1_e2 * sin_e
+    vx_p, vy_p = -np.sqrt(k * a) / r * sin_e, np.sqrt(k * a) / r * sqrt_1_e2 * cos_e
+
+    # perifocal to inertial frame
+    cos_o, sin_o = np.cos(raan), np.sin(raan)
+    cos_w, sin_w = np.cos(argp), np.sin(argp)
+    cos_i, sin_i = np.cos(elements.inc)[:, None], np.sin(elements.inc)[:, None]
+    p = np.stack(
+        np.broadcast_arrays(
+            cos_o * cos_w - sin_o * sin_w * cos_i,
+            sin_o * cos_w + cos_o * sin_w * cos_i,
+            sin_w * sin_i,
+        ),
+        axis=-1,
+    )
+    q = np.stack(
+        np.broadcast_arrays(
+            -cos_o * sin_w - sin_o * cos_w * cos_i,
+            -sin_o * sin_w + cos_o * cos_w * cos_i,
+            cos_w * sin_i,
+        ),
+        axis=-1,
+    )
+
+    return (
+        x_p[..., None] * p + y_p[..., None] * q,
+        vx_p[..., None] * p + vy_p[..., None] * q,
+    )
+
+
+def propagate_kepler(
+    elements: KeplerianElements, dt: np.ndarray[tuple[int, int], Any]
+) -> tuple[
+    np.ndarray[tuple[int, int, int], Any], np.ndarray[tuple[int, int, int], Any]
+]:
+    """
+    Propagate the given elliptical orbits using the two-body model.
+
+    Args:
+        elements: Orbital elements of N satellites.
+        dt: Time since the epoch of each satellite, in seconds, of shape (N, T).
+
+    Returns:
+        The positions (in km) and velocities (in km/s) in the frame of the elements
+        (GCRS for Earth orbits), as arrays of shape (N, T, 3).
+    """
+    if np.any(elements.ecc >= 1):
+        raise ValueError("only elliptical orbits can be propagated")
+
+    mean_motion = np.sqrt(elements.k / elements.a**3)
+
+    return elements_to_cartesian(
+        elements,
+        elements.raan[:, None],
+        elements.argp[:, None],
+        mean_anomaly_at_epoch(elements)[:, None] + mean_motion[:, None] * dt,
+    )
+
+
+class KeplerPropagator:
+
+    """
+    Two-body propagator solving Kepler's equation for all the satellites and all the
+    time steps at once, with the same interface as the propagators from
+    tas.dcc.orbits.
+    """
+
+    def __init__(self, propagation_step: timedelta):
+        """
+        Args:
+            propagation_step: Step between two propagated time steps.
+        """
+        self._propagation_step = propagation_step
+
+    def propagate(self, satellite: Satellite, start: datetime, end: datetime) -> GCRS:
+        """
+        Propagate a single satellite between start and end (both included).
+        """
+        return self.propagate_many([satellite], start, end)[0]
+
+    def _propagate(
+        self, elements: KeplerianElements, dt: np.ndarray[tuple[int, int], Any]
+    ) -> tuple[
+        np.ndarray[tuple[int, int, int], Any], np.ndarray[tuple[int, int, int], Any]
+    ]:
+        return propagate_kepler(elements, dt)
+
+    def propagate_many(
+        self, satellites: Sequence[Satellite], start: datetime, end: datetime
+    ) -> list[GCRS]:
+        """
+        Propagate the given satellites between start and end (both included).
+
+        Args:
+            satellites: Satellites to propagate.
+            start: Start time of the propagation.
+            end: End time of the propagation.
+
+        Returns:
+            The GCRS coordinates of each satellite, in the same order.
+        """
+        if not satellites:
+            return []
+
+        time = astropy_timerange(start, end, self._propagation_step)
+        elements = KeplerianElements.from_satellites(satellites)
+
+        dt = (time[0] - elements.epoch).to_value(u.s)[:, None] + np.arange(
+            len(time)
+        ) * self._propagation_step.total_seconds()
+
+        positions, velocities = self._propagate(elements, dt)
+
+        return [
+            GCRS(
+                time=time,
+                x=u.Quantity(position[:, 0], u.km, copy=False),
+                y=u.Quantity(position[:, 1], u.km, copy=False),
+                z=u.Quantity(position[:, 2], u.km, copy=False),
+                d_x=u.Quantity(velocity[:, 0], km_per_s, copy=False),
+                d_y=u.Quantity(velocity[:, 1], km_per_s, copy=False),
+                d_z=u.Quantity(velocity[:, 2], km_per_s, copy=False),
+            )
+            for position, velocity in zip(positions, velocities)
+        ]
@@ -0,0 +1,414 @@
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from typing import Any, Callable, Iterable, Mapping, Sequence
+
+import numpy as np
+from astropy.units import km
+
+from tas.dcc.orbits.compute.eligibilities.base import EligibilityComputation
+from tas.dcc.orbits.coordinates import GCRS, ITRS
+from tas.dcc.orbits.utils.units import km_per_s
+
+from ..models import ElevationMask, Horizon, LazyITRS, Satellite, Station
+from .eligibilities import (
+    StationFrames,
+    compute_eligibilities_matrix,
+    compute_eligibilities_refined,
+)
+from .ephemeris import PropagatorBackend, make_propagator, propagate_many
+from .frames import earth_rotation
+from .planes import propagate_phase_shifted
+
+compute_workers = int(os.environ.get("SMARTLINK_COMPUTE_WORKERS", 0))
+"""Number of worker processes used for propagation and eligibility computation, set by
+SMARTLINK_COMPUTE_WORKERS (0 by default to compute everything in the process handling
+the request). 1 also computes everything in the process handling the request, since a
+single worker would not compute anything in parallel but would add the cost of sending
+the data to it."""
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = Lock()
+
+_DTYPE = np.float64
+
+Progress = Callable[[int], None]
+"""Callback receiving the number of satellites processed since the last call."""
+
+
+def get_executor() -> Executor | None:
+    """
+    Returns:
+        The process-wide pool of compute workers, created on first use, or None if
+        computations should run in the current process (see compute_workers).
+    """
+    global _executor
+
+    if compute_workers <= 1:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            # "spawn" since the server may have other threads running when forking
+            _executor = ProcessPoolExecutor(
+                max_workers=compute_workers, mp_context=get_context("spawn")
+            )
+        return _executor
+
+
+def _shards(n: int, executor: Executor | None) -> list[tuple[int, int]]:
+    """
+    Split n items in contiguous shards, one per worker.
+
+    Returns:
+        The start (included) and end (excluded) index of each non-empty shard.
+    """
+    n_shards = min(n, compute_workers) if executor is not None else min(n, 1)
+    bounds = np.linspace(0, n, n_shards + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def _wait(futures: Mapping[Future[Any], int], progress: Progress | None):
+    """
+    Wait for the given futures, reporting the number of satellites of each future to
+    the given callback as they complete.
+    """
+    for future in as_completed(futures):
+        future.result()
+        if progress is not None:
+            progress(futures[future])
+
+
+def _coordinates_to_array(
+    coordinates: GCRS | ITRS | LazyITRS, out: np.ndarray[tuple[int, int], Any]
+):
+    out[:, 0] = coordinates.x.to_value(km)
+    out[:, 1] = coordinates.y.to_value(km)
+    out[:, 2] = coordinates.z.to_value(km)
+    out[:, 3] = coordinates.d_x.to_value(km_per_s)
+    out[:, 4] = coordinates.d_y.to_value(km_per_s)
+    out[:, 5] = coordinates.d_z.to_value(km_per_s)
+
+
+def _propagate_shard(
+    out: np.ndarray[tuple[int, int, int], Any],
+    backend: PropagatorBackend,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    to_itrs: Callable[[GCRS], ITRS] | None,
+    progress: Progress | None = None,
+    phase_shift: bool = False,
+):
+    ephemeris: Iterable[GCRS]
+    if phase_shift:
+        ephemeris = propagate_phase_shifted(backend, satellites, horizon)
+    else:
+        ephemeris = propagate_many(
+            make_propagator(backend, horizon.step),
+            satellites,
+            horizon.start,
+            horizon.end,
+        )
+
+    if to_itrs is not None:
+        for index, gcrs in enumerate(ephemeris):
+            _coordinates_to_array(to_itrs(gcrs), out[index])
+            if progress is not None:
+                progress(1)
+        return
+
+    # a single rotation of all the satellites, the time grid being shared
+    data = np.empty_like(out)
+    for index, gcrs in enumerate(ephemeris):
+        _coordinates_to_array(gcrs, data[index])
+        if progress is not None:
+            progress(1)
+    earth_rotation(horizon).apply(data, out=out)
+
+
+def _propagate_worker(
+    name: str,
+    shape: tuple[int, int, int],
+    start: int,
+    backend: PropagatorBackend,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    to_itrs: Callable[[GCRS], ITRS] | None,
+    phase_shift: bool,
+):
+    shm = SharedMemory(name=name)
+    try:
+        # write directly in the shared memory, the view must not outlive it
+        shared = np.ndarray(shape, dtype=_DTYPE, buffer=shm.buf)
+        try:
+            _propagate_shard(
+                shared[start : start + len(satellites)],
+                backend,
+                satellites,
+                horizon,
+                to_itrs,
+                phase_shift=phase_shift,
+            )
+        finally:
+            del shared
+    finally:
+        shm.close()
+
+
+def propagate_parallel(
+    backend: PropagatorBackend,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    to_itrs: Callable[[GCRS], ITRS] | None = None,
+    progress: Progress | None = None,
+    phase_shift: bool = False,
+) -> list[LazyITRS]:
+    """
+    Propagate the given satellites over the given horizon and convert the results to
+    ITRS, sharding satellites between the compute workers (see get_executor).
+
+    Workers write their results directly in a block of shared memory, so that
+    ephemeris are not pickled back to the parent process.
+
+    Args:
+        backend: Propagation backend (see make_propagator).
+        satellites: Satellites to propagate.
+        horizon: Horizon to propagate.
+        to_itrs: Function converting GCRS coordinates to ITRS, must be picklable
+            (e.g., a module-level function) when using workers. By default, all the
+            satellites are rotated at once with the rotation of the horizon (see
+            earth_rotation), which is computed once per horizon and process.
+        progress: Callback reporting propagated satellites, called from the current
+            process (for each satellite, or for each shard when using workers).
+        phase_shift: Whether to propagate only one satellite per orbital plane (see
+            propagate_phase_shifted), only valid for two-body backends. Shards being
+            contiguous, satellites of a plane usually end up in the same shard.
+
+    Returns:
+        The ITRS coordinates of each satellite, in the same order.
+    """
+    shape = (len(satellites), (horizon.end - horizon.start) // horizon.step + 1, 6)
+    executor = get_executor()
+    shards = _shards(len(satellites), executor)
+
+    data: np.ndarray[tuple[int, int, int], Any]
+    if executor is None or len(shards) <= 1:
+        data = np.empty(shape, dtype=_DTYPE)
+        _propagate_shard(
+            data, backend, satellites, horizon, to_itrs, progress, phase_shift
+        )
+    else:
+        shm = SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        try:
+            futures: dict[Future[None], int] = {}
+            for start, end in shards:
+                future = executor.submit(
+                    _propagate_worker,
+                    shm.name,
+                    shape,
+                    start,
+                    backend,
+                    satellites[start:end],
+                    horizon,
+                    to_itrs,
+                    phase_shift,
+                )
+                futures[future] = end - start
+            _wait(futures, progress)
+
+            # single copy out of the shared memory, so that it can be released
+            data = np.ndarray(shape, dtype=_DTYPE, buffer=shm.buf).copy()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    return [LazyITRS(satellite_data, horizon) for satellite_data in data]
+
+
+def _eligibilities_shard(
+    satellites: Sequence[Satellite],
+    ephemeris: Sequence[ITRS | LazyITRS],
+    horizon: Horizon,
+    stations: Sequence[Sequence[tuple[Station, ElevationMask]]],
+    azel_fn: Callable[..., Any] | None,
+    interpolation_step: timedelta,
+    progress: Progress | None = None,
+    refine: bool = False,
+) -> list[list[list[tuple[datetime, datetime]]]]:
+    results: list[list[list[tuple[datetime, datetime]]]] = []
+    frames: dict[tuple[Station, ...], StationFrames] = {}
+    for satellite, itrs, satellite_stations in zip(satellites, ephemeris, stations):
+        if azel_fn is None:
+            # satellites usually share the same stations, whose frames are reused
+            key = tuple(station for station, _ in satellite_stations)
+            if key not in frames:
+                frames[key] = StationFrames.from_locations(
+                    [station.location for station in key]
+                )
+
+            if isinstance(itrs, LazyITRS):
+                data = itrs.data
+            else:
+                data = np.empty((len(itrs.x), 6), dtype=_DTYPE)
+                _coordinates_to_array(itrs, data)
+
+            locations = [
+                (station.location, mask) for station, mask in satellite_stations
+            ]
+            if refine:
+                results.append(
+                    compute_eligibilities_refined(
+                        data, horizon, locations, interpolation_step, frames[key]
+                    )
+                )
+            else:
+                results.append(
+                    compute_eligibilities_matrix(
+                        data[:, :3], horizon, locations, interpolation_step, frames[key]
+                    )
+                )
+        else:
+            computation = EligibilityComputation(
+                satellite=satellite,
+                ephemeris=itrs.to_itrs() if isinstance(itrs, LazyITRS) else itrs,
+                azel_fn=azel_fn,
+                interpolation="linear",
+                interpolation_step=interpolation_step,
+            )
+            results.append(
+                [
+                    [
+                        (eligibility.start, eligibility.end)
+                        for eligibility in computation.compute(station.location, mask)
+                    ]
+                    for station, mask in satellite_stations
+                ]
+            )
+        if progress is not None:
+            progress(1)
+    return results
+
+
+def _eligibilities_worker(
+    name: str,
+    shape: tuple[int, int, int],
+    start: int,
+    satellites: Sequence[Satellite],
+    horizon: Horizon,
+    stations: Sequence[Sequence[tuple[Station, ElevationMask]]],
+    azel_fn: Callable[..., Any] | None,
+    interpolation_step: timedelta,
+    refine: bool,
+) -> list[list[list[tuple[datetime, datetime]]]]:
+    shm = SharedMemory(name=name)
+    try:
+        # copy the shard, no view over the shared memory may outlive it
+        data = np.ndarray(shape, dtype=_DTYPE, buffer=shm.buf)[
+            start : start + len(satellites)
+        ].copy()
+    finally:
+        shm.close()
+
+    return _eligibilities_shard(
+        satellites,
+        [LazyITRS(satellite_data, horizon) for satellite_data in data],
+        horizon,
+        stations,
+        azel_fn,
+        interpolation_step,
+        refine=refine,
+    )
+
+
+def compute_eligibilities_parallel(
+    satellites: Sequence[Satellite],
+    ephemeris: Sequence[ITRS | LazyITRS],
+    horizon: Horizon,
+    stations: Sequence[Sequence[tuple[Station, ElevationMask]]],
+    azel_fn: Callable[..., Any] | None,
+    interpolation_step: timedelta,
+    progress: Progress | None = None,
+    refine: bool = False,
+) -> list[list[list[tuple[datetime, datetime]]]]:
+    """
+    Compute eligibilities of the given satellites over the given stations, sharding
+    satellites between the compute workers (see get_executor).
+
+    Ephemeris are sent to the workers through a block of shared memory rather than
+    being pickled.
+
+    Args:
+        satellites: Satellites to compute eligibilities for.
+        ephemeris: Ephemeris of each satellite over the given horizon.
+        horizon: Horizon of the ephemeris.
+        stations: For each satellite, the stations (with their elevation mask) to
+            compute eligibilities for.
+        azel_fn: Function computing azimuth and elevation (see
+            EligibilityComputation), must be picklable when using workers, or None to
+            compute all the stations of a satellite at once (see
+            compute_eligibilities_matrix).
+        interpolation_step: Interpolation step (see EligibilityComputation).
+        progress: Callback reporting satellites whose eligibilities are computed (see
+            propagate_parallel).
+        refine: Whether to refine the bounds of eligibilities from the samples of the
+            ephemeris rather than interpolating them (see
+            compute_eligibilities_refined), only when azel_fn is None.
+
+    Returns:
+        For each satellite and each of its stations, the start and end times of the
+        eligibilities.
+    """
+    executor = get_executor()
+    shards = _shards(len(satellites), executor)
+
+    if executor is None or len(shards) <= 1:
+        return _eligibilities_shard(
+            satellites,
+            ephemeris,
+            horizon,
+            stations,
+            azel_fn,
+            interpolation_step,
+            progress,
+            refine,
+        )
+
+    shape = (len(satellites), (horizon.end - horizon.start) // horizon.step + 1, 6)
+    shm = SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    try:
+        # write directly in the shared memory, the view must not outlive it
+        shared = np.ndarray(shape, dtype=_DTYPE, buffer=shm.buf)
+        try:
+            for index, itrs in enumerate(ephemeris):
+                if isinstance(itrs, LazyITRS):
+                    shared[index] = itrs.data
+                else:
+                    _coordinates_to_array(itrs, shared[index])
+        finally:
+            del shared
+
+        futures: dict[Future[list[list[list[tuple[datetime, datetime]]]]], int] = {}
+        for start, end in shards:
+            future = executor.submit(
+                _eligibilities_worker,
+                shm.name,
+                shape,
+                start,
+                satellites[start:end],
+                horizon,
+                stations[start:end],
+                azel_fn,
+                interpolation_step,
+                refine,
+            )
+            futures[future] = end - start
+        _wait(futures, progress)
+
+        # futures are ordered by shard
+        return [result for future in futures for result in future.result()]
+    finally:
+        shm.close()
+        shm.unlink()
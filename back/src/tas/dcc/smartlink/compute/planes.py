@@ -0,0 +1,199 @@
+import math
+from datetime import timedelta
+from typing import Any, Sequence
+
+import astropy.units as u
+import numpy as np
+
+from tas.dcc.orbits.coordinates import GCRS
+from tas.dcc.orbits.utils.astropy import astropy_timerange
+from tas.dcc.orbits.utils.units import km_per_s
+
+from ..models import Horizon, Satellite
+from ..utils.interpolation import hermite_interpolate
+from .ephemeris import (
+    TWO_BODY,
+    PropagatorBackend,
+    make_propagator,
+    propagate_many,
+    propagation_dynamics,
+)
+from .kepler import KeplerianElements, mean_anomaly_at_epoch
+
+_MAX_SHIFT_STEP = timedelta(seconds=30)
+"""Maximum step of horizons whose ephemeris are phase shifted, cubic Hermite
+interpolation of LEO ephemeris is accurate to about 2 cm and 2 mm/s with a 30 s
+step. Satellites are propagated directly over horizons with a larger step."""
+
+
+def group_by_orbit(satellites: Sequence[Satellite]) -> list[list[int]]:
+    """
+    Group satellites whose orbits only differ by their anomaly, such as satellites in
+    the same plane of a Walker or Telesat constellation.
+
+    Args:
+        satellites: Satellites to group.
+
+    Returns:
+        The indices of the satellites of each group, in order of first appearance.
+    """
+    elements = KeplerianElements.from_satellites(satellites)
+
+    # elements are rounded (to about a millimeter for LEO orbits, and a microsecond
+    # for the epoch) so that numerical noise, e.g., from the conversion of the orbits,
+    # does not split groups
+    epoch = (elements.epoch - elements.epoch[0]).sec
+    groups: dict[tuple[float, ...], list[int]] = {}
+    for index in range(len(satellites)):
+        key = (
+            round(float(elements.k[index]), 3),
+            round(float(elements.a[index]), 6),
+            round(float(elements.ecc[index]), 9),
+            round(float(elements.inc[index]), 9),
+            round(float(elements.raan[index]), 9),
+            round(float(elements.argp[index]), 9),
+            round(float(epoch[index]), 6),
+        )
+        groups.setdefault(key, []).append(index)
+    return list(groups.values())
+
+
+def propagate_phase_shifted(
+    backend: PropagatorBackend, satellites: Sequence[Satellite], horizon: Horizon
+) -> list[GCRS]:
+    """
+    Propagate the given satellites with a two-body backend, propagating only one
+    reference satellite for each group of satellites on the same orbit (see
+    group_by_orbit).
+
+    With the two-body model, a satellite on the same orbit as the reference one but
+    with a mean anomaly larger by dM is at the position of the reference satellite
+    dM / n later (n being the mean motion). The reference satellite is propagated
+    over a horizon extended by up to one period, and the ephemeris of the other
+    satellites are interpolated (in the inertial frame) at the shifted times.
+
+    Satellites are propagated directly if the step of the horizon is too large for
+    the interpolation (see _MAX_SHIFT_STEP), or if their group is too small for the
+    extension of the horizon to be worth it (e.g., short horizons with two
+    satellites per plane).
+
+    Args:
+        backend: Two-body propagation backend (see make_propagator).
+        satellites: Satellites to propagate.
+        horizon: Horizon to propagate.
+
+    Returns:
+        The GCRS coordinates of each satellite over the horizon, in the same order.
+
+    Raises:
+        ValueError: If the backend is not a two-body one.
+    """
+    if propagation_dynamics(backend) != TWO_BODY:
+        raise ValueError(f"phase shift requires a two-body backend, got {backend}")
+
+    if not satellites:
+        return []
+
+    if horizon.step > _MAX_SHIFT_STEP:
+        return list(
+            propagate_many(
+                make_propagator(backend, horizon.step),
+                satellites,
+                horizon.start,
+                horizon.end,
+            )
+        )
+
+    elements = KeplerianElements.from_satellites(satellites)
+    step = horizon.step
+    n_steps = (horizon.end - horizon.start) // step + 1
+
+    # time shift of each satellite from the reference of its group, in [0, period)
+    mean_anomaly = mean_anomaly_at_epoch(elements)
+    mean_motion = np.sqrt(elements.k / elements.a**3)
+    shifts = np.empty(len(satellites))
+    groups: list[list[int]] = []
+    direct: list[int] = []
+    for group in group_by_orbit(satellites):
+        shifts[group] = (
+            np.remainder(mean_anomaly[group] - mean_anomaly[group[0]], 2 * np.pi)
+            / mean_motion[group]
+        )
+
+        # the reference is propagated over the extended horizon, instead of
+        # propagating each satellite of the group over the horizon
+        extension = math.ceil(shifts[group].max() / step.total_seconds()) + 2
+        if len(group) * n_steps > n_steps + extension:
+            groups.append(group)
+        else:
+            direct.extend(group)
+
+    result: list[GCRS | None] = [None] * len(satellites)
+    for index, gcrs in zip(
+        direct,
+        propagate_many(
+            make_propagator(backend, step),
+            [satellites[index] for index in direct],
+            horizon.start,
+            horizon.end,
+        ),
+    ):
+        result[index] = gcrs
+
+    if not groups:
+        return [gcrs for gcrs in result if gcrs is not None]
+
+    # propagate the references over a horizon extended by the largest shift
+    references = [group[0] for group in groups]
+    n_reference_steps = (
+        n_steps
+        + math.ceil(max(shifts[group].max() for group in groups) / step.total_seconds())
+        + 1
+    )
+
+    reference_data = [
+        np.stack(
+            [
+                gcrs.x.to_value(u.km),
+                gcrs.y.to_value(u.km),
+                gcrs.z.to_value(u.km),
+                gcrs.d_x.to_value(km_per_s),
+                gcrs.d_y.to_value(km_per_s),
+                gcrs.d_z.to_value(km_per_s),
+            ],
+            axis=1,
+        )
+        for gcrs in propagate_many(
+            make_propagator(backend, step),
+            [satellites[index] for index in references],
+            horizon.start,
+            horizon.start + (n_reference_steps - 1) * step,
+        )
+    ]
+
+    time = astropy_timerange(horizon.start, horizon.end, horizon.step)
+    steps = np.arange(n_steps)
+
+    for group, data in zip(groups, reference_data):
+        for index in group:
+            shifted: np.ndarray[tuple[int, int], Any]
+            if shifts[index] == 0:
+                shifted = data[steps]
+            else:
+                shifted = hermite_interpolate(
+                    data,
+                    step.total_seconds(),
+                    steps + shifts[index] / step.total_seconds(),
+                )
+
+            result[index] = GCRS(
+                time=time,
+                x=u.Quantity(shifted[:, 0], u.km),
+                y=u.Quantity(shifted[:, 1], u.km),
+                z=u.Quantity(shifted[:, 2], u.km),
+                d_x=u.Quantity(shifted[:, 3], km_per_s),
+                d_y=u.Quantity(shifted[:, 4], km_per_s),
+                d_z=u.Quantity(shifted[:, 5], km_per_s),
+            )
+
+    return [gcrs for gcrs in result if gcrs is not None]
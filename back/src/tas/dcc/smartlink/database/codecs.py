@@ -0,0 +1,320 @@
+"""
+Codecs used to store ephemeris data (arrays of shape Nx6, containing positions in
+kilometers and velocities in kilometers per second) as binary blobs in the database.
+
+Each codec is identified by an integer format which is stored alongside the data, so
+that data stored with a given codec remains readable when the default codec changes.
+"""
+
+import abc
+import lzma
+import zlib
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable
+
+import numpy as np
+
+_NP_DTYPE = "<f8"
+
+
+def _shuffle(data: np.ndarray[tuple[int, int], Any]) -> bytes:
+    """
+    Byte-shuffle the given array, i.e., group the k-th byte of all values of each
+    component together. Since consecutive values are close, this creates long
+    sequences of identical bytes (sign, exponent, high bits) which compress well.
+    """
+    n, m = data.shape
+    return np.ascontiguousarray(
+        data.view(np.uint8).reshape((n, m, data.itemsize)).transpose((2, 1, 0))
+    ).tobytes()
+
+
+def _unshuffle(data: bytes, dtype: str) -> np.ndarray[tuple[int, int], Any]:
+    """
+    Reverse operation of _shuffle for arrays of shape Nx6.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    return np.ascontiguousarray(
+        np.frombuffer(data, dtype=np.uint8)
+        .reshape((itemsize, 6, -1))
+        .transpose((2, 1, 0))
+    ).view(dtype)[:, :, 0]
+
+
+class EphemerisCodec(abc.ABC):
+
+    """
+    Base class for ephemeris codecs.
+    """
+
+    format: int
+    """Identifier of the codec in the database, must be unique."""
+
+    name: str
+    """Name of the codec, for display purpose."""
+
+    @abc.abstractmethod
+    def encode(self, data: np.ndarray[tuple[int, int], Any]) -> bytes:
+        """
+        Encode the given ephemeris data.
+
+        Args:
+            data: Array of shape Nx6 to encode.
+
+        Returns:
+            The encoded data.
+        """
+        ...
+
+    @abc.abstractmethod
+    def decode(self, data: bytes) -> np.ndarray[tuple[int, int], Any]:
+        """
+        Decode the given ephemeris data.
+
+        Args:
+            data: Data to decode, as returned by encode.
+
+        Returns:
+            The decoded array, of shape Nx6 and type float64.
+        """
+        ...
+
+
+@dataclass(frozen=True)
+class RawCodec(EphemerisCodec):
+
+    """
+    Codec storing data as little-endian IEEE 64-bits floats, without compression.
+    """
+
+    format: int = 0
+    name: str = "raw"
+
+    def encode(self, data: np.ndarray[tuple[int, int], Any]) -> bytes:
+        return np.ascontiguousarray(data, dtype=_NP_DTYPE).tobytes()
+
+    def decode(self, data: bytes) -> np.ndarray[tuple[int, int], Any]:
+        return np.frombuffer(data, dtype=_NP_DTYPE).reshape((-1, 6), order="C")
+
+
+@dataclass(frozen=True)
+class ShuffleCodec(EphemerisCodec):
+
+    """
+    Lossless codec storing data as byte-shuffled 64-bits floats, compressed.
+    """
+
+    format: int
+    name: str
+    compress: Callable[[bytes], bytes]
+    decompress: Callable[[bytes], bytes]
+
+    def encode(self, data: np.ndarray[tuple[int, int], Any]) -> bytes:
+        return self.compress(_shuffle(np.ascontiguousarray(data, dtype=_NP_DTYPE)))
+
+    def decode(self, data: bytes) -> np.ndarray[tuple[int, int], Any]:
+        return _unshuffle(self.decompress(data), _NP_DTYPE)
+
+
+@dataclass(frozen=True)
+class QuantizedDeltaCodec(EphemerisCodec):
+
+    """
+    Lossy codec storing data as fixed-point integers (with the given resolutions),
+    delta-encoded along the time axis, byte-shuffled and compressed.
+
+    Since ephemeris are smooth, successive differences of the quantized values are
+    much smaller than the values themselves, so most of the bytes are null after
+    shuffling. The maximum error is half the resolution of each component.
+    """
+
+    format: int
+    name: str
+    position_resolution: float
+    """Resolution of the positions, in kilometers."""
+
+    velocity_resolution: float
+    """Resolution of the velocities, in kilometers per second."""
+
+    order: int = 3
+    """Order of the delta encoding."""
+
+    def _resolutions(self) -> np.ndarray[tuple[int], Any]:
+        return np.array([self.position_resolution] * 3 + [self.velocity_resolution] * 3)
+
+    def encode(self, data: np.ndarray[tuple[int, int], Any]) -> bytes:
+        values = np.round(data / self._resolutions()).astype("<i8")
+        for _ in range(self.order):
+            values[1:] = np.diff(values, axis=0)
+        return zlib.compress(_shuffle(values))
+
+    def decode(self, data: bytes) -> np.ndarray[tuple[int, int], Any]:
+        values = _unshuffle(zlib.decompress(data), "<i8")
+        for _ in range(self.order):
+            values = np.cumsum(values, axis=0)
+        return values * self._resolutions()
+
+
+@dataclass(frozen=True)
+class ChebyshevCodec(EphemerisCodec):
+
+    """
+    Lossy codec storing the coefficients of Chebyshev polynomials fitted (least-squares)
+    on each component of the data, so that ephemeris can be evaluated at any time, not
+    only at the time steps used for the fit.
+
+    The degree of the polynomials is the smallest degree such that the fit is within
+    the tolerances at every sample. The degree is always lower than the number of
+    samples minus one, so the fit is not a mere interpolation and the residuals on the
+    samples are representative of the error between samples. If no such degree exists,
+    encode raises a ValueError.
+
+    Encoded data starts with the number of samples (little-endian 32-bits integer),
+    followed by the coefficients as little-endian 64-bits floats, of shape (D+1)x6.
+    """
+
+    format: int
+    name: str
+
+    segment_duration: timedelta
+    """Recommended duration of each encoded segment."""
+
+    position_tolerance: float
+    """Maximum error for positions, in kilometers."""
+
+    velocity_tolerance: float
+    """Maximum error for velocities, in kilometers per second."""
+
+    min_degree: int = 4
+    max_degree: int = 24
+
+    @property
+    def min_samples(self) -> int:
+        """Minimum number of samples that can be encoded."""
+        return self.min_degree + 2
+
+    def _domain(self, n: int) -> np.ndarray[tuple[int], Any]:
+        return np.linspace(-1, 1, n)
+
+    def encode(self, data: np.ndarray[tuple[int, int], Any]) -> bytes:
+        from numpy.polynomial import chebyshev
+
+        n = data.shape[0]
+        x = self._domain(n)
+        tolerances = np.array(
+            [self.position_tolerance] * 3 + [self.velocity_tolerance] * 3
+        )
+
+        for degree in range(self.min_degree, min(self.max_degree, n - 2) + 1):
+            coefficients = chebyshev.chebfit(x, data, degree)
+            residuals = np.abs(chebyshev.chebval(x, coefficients).T - data).max(axis=0)
+            if np.all(residuals <= tolerances):
+                return (
+                    np.array([n], dtype="<i4").tobytes()
+                    + np.ascontiguousarray(coefficients, dtype=_NP_DTYPE).tobytes()
+                )
+
+        raise ValueError(
+            f"cannot fit {n} samples with Chebyshev polynomials within tolerances"
+        )
+
+    def _coefficients(
+        self, data: bytes
+    ) -> tuple[int, np.ndarray[tuple[int, int], Any]]:
+        n = int(np.frombuffer(data[:4], dtype="<i4")[0])
+        return n, np.frombuffer(data[4:], dtype=_NP_DTYPE).reshape((-1, 6))
+
+    def decode(self, data: bytes) -> np.ndarray[tuple[int, int], Any]:
+        n, _ = self._coefficients(data)
+        return self.evaluate(data, np.arange(n, dtype=float))
+
+    def evaluate(
+        self, data: bytes, steps: np.ndarray[tuple[int], Any]
+    ) -> np.ndarray[tuple[int, int], Any]:
+        """
+        Evaluate the encoded polynomials at the given times.
+
+        Args:
+            data: Encoded data.
+            steps: Times to evaluate the polynomials at, expressed in number of time
+                steps from the first sample used for the fit (may be non-integer).
+
+        Returns:
+            An array of shape Nx6 with the evaluated data.
+        """
+        from numpy.polynomial import chebyshev
+
+        n, coefficients = self._coefficients(data)
+        x = 2 * np.asarray(steps, dtype=float) / max(n - 1, 1) - 1
+        return np.ascontiguousarray(chebyshev.chebval(x, coefficients).T)
+
+
+RAW = RawCodec()
+SHUFFLE_ZLIB = ShuffleCodec(
+    format=1, name="shuffle-zlib", compress=zlib.compress, decompress=zlib.decompress
+)
+SHUFFLE_LZMA = ShuffleCodec(
+    format=2, name="shuffle-lzma", compress=lzma.compress, decompress=lzma.decompress
+)
+QUANTIZED_DELTA_ZLIB = QuantizedDeltaCodec(
+    format=3,
+    name="quantized-delta-zlib",
+    position_resolution=1e-6,
+    velocity_resolution=1e-9,
+)
+CHEBYSHEV = ChebyshevCodec(
+    format=4,
+    name="chebyshev",
+    segment_duration=timedelta(minutes=10),
+    position_tolerance=1e-3,
+    velocity_tolerance=1e-6,
+)
+"""Chebyshev codec, positions are within 1 m and velocities within 1 mm/s of the
+propagated ephemeris."""
+
+_CODECS: dict[int, EphemerisCodec] = {}
+
+DEFAULT_CODEC: EphemerisCodec = QUANTIZED_DELTA_ZLIB
+"""Codec used to store new ephemeris. Positions are stored with an error of at most
+0.5 mm, and velocities with an error of at most 0.5 µm/s, which is orders of
+magnitude below the accuracy of the propagation."""
+
+
+def register_codec(codec: EphemerisCodec) -> EphemerisCodec:
+    """
+    Register the given codec so that data stored with it can be decoded.
+
+    Args:
+        codec: Codec to register.
+
+    Returns:
+        The codec.
+
+    Raises:
+        ValueError: If another codec is already registered with the same format.
+    """
+    if _CODECS.get(codec.format, codec) is not codec:
+        raise ValueError(f"a codec is already registered for format {codec.format}")
+    _CODECS[codec.format] = codec
+    return codec
+
+
+def get_codec(format: int) -> EphemerisCodec:
+    """
+    Retrieve the codec for the given format.
+
+    Args:
+        format: Format to retrieve the codec for.
+
+    Returns:
+        The codec for the given format.
+
+    Raises:
+        KeyError: If no codec is registered for the given format.
+    """
+    return _CODECS[format]
+
+
+for _codec in (RAW, SHUFFLE_ZLIB, SHUFFLE_LZMA, QUANTIZED_DELTA_ZLIB, CHEBYSHEV):
+    register_codec(_codec)
@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+import numpy as np
+
+
+class EphemerisFileStore:
+
+    """
+    Store ephemeris data as .npy files in a local directory. Files are read through
+    memory maps, so loaded data is shared by all processes through the page cache and
+    only the parts actually used are read from the disk.
+    """
+
+    def __init__(self, directory: Path | str):
+        """
+        Args:
+            directory: Directory containing the files, created if it does not exist.
+        """
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, data: np.ndarray[tuple[int, int], Any]) -> str:
+        """
+        Write the given data to a new file.
+
+        Args:
+            data: Array to write.
+
+        Returns:
+            The name of the created file, relative to the store directory.
+        """
+        name = f"{uuid4().hex}.npy"
+
+        # write to a temporary file first so that a file is never read partially
+        path = self._directory.joinpath(name)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as fp:
+            np.save(fp, data, allow_pickle=False)
+        os.replace(tmp_path, path)
+
+        return name
+
+    def read(self, name: str) -> np.memmap[Any, Any]:
+        """
+        Open the given file as a read-only memory map.
+
+        Args:
+            name: Name of the file, as returned by write().
+
+        Returns:
+            A read-only memory map over the array in the file.
+        """
+        return np.load(self._directory.joinpath(name), mmap_mode="r")
+
+    def remove(self, name: str):
+        """
+        Remove the given file, if it exists.
+
+        Args:
+            name: Name of the file, as returned by write().
+        """
+        self._directory.joinpath(name).unlink(missing_ok=True)
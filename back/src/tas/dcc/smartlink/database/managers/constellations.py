@@ -1,10 +1,12 @@
 from datetime import timezone
 
 from poliastro.twobody import Orbit
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from ... import models
-from ..models import Constellation, Plane, Satellite, SatelliteOrbit
+from .. import ephemeris_cache, ephemeris_files
+from ..models import Constellation, Ephemeris, Plane, Satellite, SatelliteOrbit
 from .base import BaseManager
 
 
@@ -46,6 +48,27 @@ def convert_from_db(value: Constellation) -> models.Constellation:
     )
 
 
+def _ephemeris_paths(db: Session, satellite_ids: set[int]) -> list[str]:
+    """
+    Find the files in the ephemeris file store (see database.files) containing
+    ephemeris of the given satellites, which are not removed by the cascade deletion of
+    their entries.
+    """
+    return list(
+        db.scalars(
+            select(Ephemeris.path).where(
+                Ephemeris.satellite_id.in_(satellite_ids), Ephemeris.path.is_not(None)
+            )
+        )
+    )
+
+
+def _remove_ephemeris_files(paths: list[str]):
+    if ephemeris_files is not None:
+        for path in paths:
+            ephemeris_files.remove(path)
+
+
 class SatelliteManager(BaseManager[models.Satellite, Satellite, int]):
     def __init__(self, db: Session):
         super().__init__(db, Satellite, Satellite.id, lambda s: s.id)
@@ -71,6 +94,14 @@ class SatelliteManager(BaseManager[models.Satellite, Satellite, int]):
         )
         return Satellite(id=model.id, index=model.index, orbit=db_orbit)
 
+    def delete(self, id: int) -> Satellite | None:
+        paths = _ephemeris_paths(self._db, {id})
+        entry = super().delete(id)
+        ephemeris_cache.invalidate(lambda key: key[0] == id)
+        if entry is not None:
+            _remove_ephemeris_files(paths)
+        return entry
+
 
 class ConstellationManager(BaseManager[models.Constellation, Constellation, int]):
     def __init__(self, db: Session):
@@ -97,6 +128,20 @@ class ConstellationManager(BaseManager[models.Constellation, Constellation, int]
             ],
         )
 
+    def delete(self, id: int) -> Constellation | None:
+        satellite_ids = set(
+            self._db.scalars(
+                select(Satellite.id).join(Plane).where(Plane.constellation_id == id)
+            )
+        )
+        paths = _ephemeris_paths(self._db, satellite_ids)
+        entry = super().delete(id)
+        ephemeris_cache.invalidate(lambda key: key[0] in satellite_ids)
+        if entry is not None:
+            _remove_ephemeris_files(paths)
+        return entry
+
+
 def delete(self, constellation_id: int):
     constellation = self.db.query(Constellation).filter_by(id=constellation_id).first()
     if constellation:
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta
 from typing import Literal, Sequence, cast
 
 import sqlalchemy
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from ... import models
@@ -66,7 +66,7 @@ class EligibilityManager(BaseManager[models.Eligibility, Eligibility, int]):
         stations: dict[models.Station, models.ElevationMask],
         horizon: models.Horizon,
         interpolation_step: timedelta,
-        backend: Literal["celest", "astropy"],
+        backend: Literal["celest", "astropy", "matrix", "refine"],
         shrink: bool = True,
     ) -> dict[tuple[models.Satellite, models.Station], None | list[models.Eligibility]]:
         """
@@ -104,9 +104,12 @@ class EligibilityManager(BaseManager[models.Eligibility, Eligibility, int]):
                 .join(Ephemeris, Ephemeris.id == EligibilityGroup.ephemeris_id)
                 .where(
                     Ephemeris.satellite_id.in_([s.id for s in satellites]),
-                    Ephemeris.start <= ensure_utc(horizon.start),
-                    Ephemeris.end >= ensure_utc(horizon.end),
-                    Ephemeris.step == timedelta_to_database(horizon.step),
+                    func.coalesce(EligibilityGroup.start, Ephemeris.start)
+                    <= ensure_utc(horizon.start),
+                    func.coalesce(EligibilityGroup.end, Ephemeris.end)
+                    >= ensure_utc(horizon.end),
+                    func.coalesce(EligibilityGroup.horizon_step, Ephemeris.step)
+                    == timedelta_to_database(horizon.step),
                     sqlalchemy.tuple_(
                         EligibilityGroup.station_id, EligibilityGroup.mask
                     ).in_(
@@ -200,7 +203,7 @@ class EligibilityManager(BaseManager[models.Eligibility, Eligibility, int]):
         eligibilities: Sequence[models.Eligibility],
         mask: models.ElevationMask,
         interpolation_step: timedelta,
-        backend: Literal["celest", "astropy"],
+        backend: Literal["celest", "astropy", "matrix", "refine"],
     ) -> EligibilityGroup:
         """
         Create a group of eligibilities computed together for a single station.
@@ -221,8 +224,14 @@ class EligibilityManager(BaseManager[models.Eligibility, Eligibility, int]):
 
         if isinstance(ephemeris, models.Ephemeris):
             ephemeris_db = self._ephemeris_manager.store_or_load(ephemeris)
+            start, end, step = (
+                ephemeris.horizon.start,
+                ephemeris.horizon.end,
+                timedelta_to_database(ephemeris.horizon.step),
+            )
         else:
             ephemeris_db = ephemeris
+            start, end, step = ephemeris.start, ephemeris.end, ephemeris.step
 
         station_db = self._station_manager.store_or_load(station)
 
@@ -233,6 +242,9 @@ class EligibilityManager(BaseManager[models.Eligibility, Eligibility, int]):
             mask=self._encode_mask(mask),
             step=timedelta_to_database(interpolation_step),
             backend=backend,
+            start=ensure_utc(start),
+            end=ensure_utc(end),
+            horizon_step=step,
             eligibilities=[
                 Eligibility(
                     id=eligibility.id,
@@ -1,17 +1,24 @@
-from datetime import datetime
-from typing import Iterable, cast
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable, Iterator, Sequence, cast
 
-from astropy.units import Quantity, km
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+import numpy as np
+from astropy.units import km
+from sqlalchemy import ColumnElement, and_, event, func, or_, select, true, update
+from sqlalchemy.orm import Session, SessionTransaction, defer, load_only
+from sqlalchemy.orm.attributes import set_committed_value
 
 from tas.dcc.orbits.coordinates import ITRS
-from tas.dcc.orbits.utils.astropy import astropy_timerange
 from tas.dcc.orbits.utils.units import km_per_s
 
-from ... import models
+from ... import compute, models
+from ...utils.cache import LRUCache
+from ...utils.interpolation import hermite_interpolate
 from ...utils.time import ensure_utc
-from ..models.ephemeris import Ephemeris
+from .. import ephemeris_cache, ephemeris_files
+from ..codecs import DEFAULT_CODEC, RAW, ChebyshevCodec, EphemerisCodec, get_codec
+from ..files import EphemerisFileStore
+from ..models.eligibility import EligibilityGroup
+from ..models.ephemeris import Ephemeris, EphemerisSegment
 from .base import BaseManager
 from .constellations import SatelliteManager
 from .utils import timedelta_from_database, timedelta_to_database
@@ -20,113 +27,679 @@ _POS_Q = km
 _SPE_Q = km_per_s
 _NP_DTYPE = "<f8"
 
+_SEGMENT_SIZE = 256
+"""Number of time steps in each segment of newly stored ephemeris."""
 
-def _db2py(e: Ephemeris, h: models.Horizon | None = None) -> ITRS:
-    import numpy as np
+_MAX_INTERPOLATION_STEP = timedelta(seconds=60)
+"""Maximum step of ephemeris that can be interpolated to retrieve ephemeris at another
+step. For LEO satellites, cubic Hermite interpolation is accurate to about 2 cm and
+2 mm/s with a 30 s step, and to about 30 cm and 1.5 cm/s with a 60 s step."""
 
-    data = np.frombuffer(e.data, dtype=_NP_DTYPE).reshape((-1, 6), order="C")
+_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+"""Reference time to find ephemeris with aligned time steps."""
 
-    # need to extract the range
-    if h is not None:
-        start, end, step = h.start, h.end, h.step
+# modes to retrieve ephemeris over a horizon from an existing ephemeris, by order of
+# preference
+_EXACT, _STRIDED, _INTERPOLATED, _CHEBYSHEV = range(4)
 
-        idx_start = (h.start - ensure_utc(e.start)) // h.step
-        idx_end = idx_start + (h.end - h.start) // h.step
 
-        data = data[idx_start : idx_end + 1, :]
-    else:
-        start, end, step = e.start, e.end, timedelta_from_database(e.step)
+def _py2np(itrs: ITRS | models.LazyITRS) -> np.ndarray[tuple[int, int], Any]:
+    if isinstance(itrs, models.LazyITRS):
+        return np.ascontiguousarray(itrs.data, dtype=_NP_DTYPE)
 
-    return ITRS(
-        # ugly, maybe there is a better way?
-        time=astropy_timerange(start, end, step),
-        x=Quantity(data[:, 0], _POS_Q),
-        y=Quantity(data[:, 1], _POS_Q),
-        z=Quantity(data[:, 2], _POS_Q),
-        d_x=Quantity(data[:, 3], _SPE_Q),
-        d_y=Quantity(data[:, 4], _SPE_Q),
-        d_z=Quantity(data[:, 5], _SPE_Q),
-    )
-
-
-def _py2db(e: models.Ephemeris) -> bytes:
-    import numpy as np
-
-    data = np.ascontiguousarray(
+    return np.ascontiguousarray(
         np.stack(
             [
-                e.itrs.x.to_value(_POS_Q),
-                e.itrs.y.to_value(_POS_Q),
-                e.itrs.z.to_value(_POS_Q),
-                e.itrs.d_x.to_value(_SPE_Q),
-                e.itrs.d_y.to_value(_SPE_Q),
-                e.itrs.d_z.to_value(_SPE_Q),
+                itrs.x.to_value(_POS_Q),
+                itrs.y.to_value(_POS_Q),
+                itrs.z.to_value(_POS_Q),
+                itrs.d_x.to_value(_SPE_Q),
+                itrs.d_y.to_value(_SPE_Q),
+                itrs.d_z.to_value(_SPE_Q),
             ]
         ).T.astype(_NP_DTYPE)
     )
 
-    return np.copy(data, order="C").tobytes()  # type: ignore
+
+def _reuse_mode(
+    e: Ephemeris, h: models.Horizon, interpolate: bool = True
+) -> int | None:
+    """
+    Find how the given ephemeris can be used to retrieve ephemeris over the given
+    horizon.
+
+    Args:
+        e: Ephemeris to use.
+        h: Horizon to retrieve.
+        interpolate: Whether the ephemeris can be interpolated (_INTERPOLATED).
+
+    Returns:
+        The mode (see _EXACT, _STRIDED, etc.), or None if the ephemeris cannot be used.
+    """
+    if ensure_utc(e.start) > h.start or ensure_utc(e.end) < h.end:
+        return None
+
+    if isinstance(get_codec(e.format), ChebyshevCodec):
+        return _CHEBYSHEV
+
+    step = timedelta_from_database(e.step)
+    if (h.start - ensure_utc(e.start)) % step == timedelta(0):
+        if h.step == step:
+            return _EXACT
+        if h.step % step == timedelta(0):
+            return _STRIDED
+
+    if interpolate and step <= _MAX_INTERPOLATION_STEP:
+        return _INTERPOLATED
+
+    return None
+
+
+def _segment_count(n_steps: int, segment_size: int, codec: EphemerisCodec) -> int:
+    """
+    Compute the number of segments of an ephemeris with the given number of time
+    steps (see EphemerisManager._encode_segments).
+
+    Segments encoded with a Chebyshev codec overlap by one time step, and a last
+    segment too short to be fitted is merged into the previous one, so the last
+    segment may contain more than segment_size time steps.
+    """
+    if not isinstance(codec, ChebyshevCodec):
+        return len(range(0, max(n_steps, 1), segment_size))
+
+    count = len(range(0, max(n_steps - 1, 1), segment_size))
+    if count > 1 and n_steps - (count - 1) * segment_size < codec.min_samples:
+        count -= 1
+    return count
+
+
+def _entry_segment_count(e: Ephemeris) -> int:
+    """Compute the number of segments of the given segmented ephemeris."""
+    step = timedelta_from_database(e.step)
+    n_steps = (ensure_utc(e.end) - ensure_utc(e.start)) // step + 1
+    return _segment_count(n_steps, cast(int, e.segment_size), get_codec(e.format))
+
+
+def _horizon_steps(e: Ephemeris, h: models.Horizon) -> np.ndarray[tuple[int], Any]:
+    """
+    Compute the times of the given horizon, expressed in number of time steps from the
+    start of the given ephemeris.
+    """
+    step = timedelta_from_database(e.step)
+    return (h.start - ensure_utc(e.start)) / step + np.arange(
+        (h.end - h.start) // h.step + 1
+    ) * (h.step / step)
+
+
+_PENDING_FILES = "smartlink.pending_ephemeris_files"
+"""Key of the session info containing the files written for entries that are not
+committed yet, as (store, name) pairs."""
+
+
+def _forget_pending_files(session: Session):
+    session.info.pop(_PENDING_FILES, None)
+
+
+def _remove_pending_files(session: Session, transaction: SessionTransaction):
+    # the transaction was not committed (see _forget_pending_files), so the files
+    # written for its entries are not referenced by the database
+    if transaction.parent is None:
+        for files, name in session.info.pop(_PENDING_FILES, []):
+            files.remove(name)
 
 
 class EphemerisManager(BaseManager[models.Ephemeris, Ephemeris, int]):
     # does not extends BaseManager currently because the primary key is a 4-tuples, so
     # it does not work properly
 
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        codec: EphemerisCodec = DEFAULT_CODEC,
+        files: EphemerisFileStore | None = None,
+        cache: LRUCache[
+            tuple[int, datetime, datetime, timedelta, str],
+            tuple[int, np.ndarray[tuple[int, int], Any], bool],
+        ]
+        | None = None,
+        dynamics: str | None = None,
+        interpolate: bool = False,
+    ):
+        """
+        Args:
+            db: The database session to use for requests.
+            codec: Codec used to encode newly stored ephemeris.
+            files: Store for ephemeris data kept on the local disk, defaults to the
+                one configured for the application (see database.ephemeris_files).
+                If there is one, newly stored ephemeris are written to it instead of
+                the database, unless the codec is a Chebyshev codec.
+            cache: Cache for extracted ephemeris, defaults to the process-wide one
+                (see database.ephemeris_cache).
+            dynamics: Model of the ephemeris (see compute.ephemeris_model), defaults
+                to the one of the two-body backends. Only ephemeris computed with
+                this model are retrieved, and newly stored ephemeris are marked with
+                it.
+            interpolate: Whether ephemeris with another step can be interpolated to
+                retrieve ephemeris (see extract). Interpolated ephemeris are only
+                accurate to a few centimeters, so this is disabled by default.
+        """
         super().__init__(db, Ephemeris, Ephemeris.id, lambda e: e.id)
 
         self._satellite_manager = SatelliteManager(db)
+        self._codec = codec
+        self._files = files if files is not None else ephemeris_files
+        self._cache = cache if cache is not None else ephemeris_cache
+        self._dynamics = (
+            dynamics if dynamics is not None else compute.ephemeris_model("poliastro")
+        )
+        self._interpolate = interpolate
+
+        # segments fetched in advance by extract_many, by ephemeris ID: first and last
+        # fetched indices, and data of the fetched segments by index
+        self._prefetched: dict[int, tuple[int, int, dict[int, bytes]]] = {}
+
+    def _loadable(self) -> ColumnElement[bool]:
+        """
+        Condition on the ephemeris whose data can be loaded by this manager, i.e.,
+        excluding ephemeris stored in files if there is no file store.
+        """
+        return Ephemeris.path.is_(None) if self._files is None else true()
+
+    def _fetch_segments(
+        self, e: Ephemeris, seg_start: int, seg_end: int
+    ) -> Sequence[bytes]:
+        """
+        Fetch the data of the segments of the given ephemeris with index between
+        seg_start and seg_end (both included), ordered by index.
+        """
+        if e.id in self._prefetched:
+            first, last, segments = self._prefetched[e.id]
+            if first <= seg_start and seg_end <= last:
+                return [
+                    data
+                    for index, data in sorted(segments.items())
+                    if seg_start <= index <= seg_end
+                ]
+
+        return self._db.scalars(
+            select(EphemerisSegment.data)
+            .where(
+                EphemerisSegment.ephemeris_id == e.id,
+                EphemerisSegment.index.between(seg_start, seg_end),
+            )
+            .order_by(EphemerisSegment.index)
+        ).all()
+
+    def _segment_range(self, e: Ephemeris, h: models.Horizon) -> tuple[int, int]:
+        """
+        Find the indices of the first and last segments of the given ephemeris
+        required to load the given horizon with _load_data.
+        """
+        segment_size = cast(int, e.segment_size)
+        idx_last = (ensure_utc(e.end) - ensure_utc(e.start)) // timedelta_from_database(
+            e.step
+        )
+
+        steps = _horizon_steps(e, h)
+        idx_start = int(np.floor(steps[0]))
+        idx_end = max(min(int(np.ceil(steps[-1])), idx_last), idx_start + 1)
+
+        last = _entry_segment_count(e) - 1
+        return min(idx_start // segment_size, last), min(idx_end // segment_size, last)
+
+    def _prefetch(self, entries: Iterable[Ephemeris], h: models.Horizon):
+        """
+        Fetch the data required to load the given horizon from each of the given
+        ephemeris, using one query for the segmented ephemeris and one for the legacy
+        ones.
+        """
+        legacy: dict[int, Ephemeris] = {}
+        ranges: dict[tuple[int, int], list[int]] = {}
+        for e in entries:
+            if e.path is not None:
+                continue
+            elif e.segment_size is None:
+                legacy[e.id] = e
+            else:
+                seg_start, seg_end = self._segment_range(e, h)
+                ranges.setdefault((seg_start, seg_end), []).append(e.id)
+                self._prefetched[e.id] = (seg_start, seg_end, {})
+
+        if ranges:
+            for ephemeris_id, index, data in self._db.execute(
+                select(
+                    EphemerisSegment.ephemeris_id,
+                    EphemerisSegment.index,
+                    EphemerisSegment.data,
+                ).where(
+                    or_(
+                        *(
+                            and_(
+                                EphemerisSegment.ephemeris_id.in_(ids),
+                                EphemerisSegment.index.between(seg_start, seg_end),
+                            )
+                            for (seg_start, seg_end), ids in ranges.items()
+                        )
+                    )
+                )
+            ):
+                self._prefetched[ephemeris_id][2][index] = data
+
+        if legacy:
+            for ephemeris_id, data in self._db.execute(
+                select(Ephemeris.id, Ephemeris.data).where(Ephemeris.id.in_(legacy))
+            ):
+                set_committed_value(legacy[ephemeris_id], "data", data)
+
+    def _encode_segments(
+        self,
+        codec: EphemerisCodec,
+        data: np.ndarray[tuple[int, int], Any],
+        start: datetime,
+        step: timedelta,
+    ) -> tuple[int, list[EphemerisSegment]]:
+        """
+        Split the given data in segments and encode them with the given codec.
+
+        Segments encoded with a Chebyshev codec also contain the first time step of
+        the next segment, so that the fit covers the time between segments, and a last
+        segment too short to be fitted is merged into the previous one (see
+        _segment_count).
+
+        Returns:
+            The size of the segments, and the segments.
+        """
+        segment_size, overlap = _SEGMENT_SIZE, 0
+        if isinstance(codec, ChebyshevCodec):
+            segment_size = max(codec.min_degree + 1, codec.segment_duration // step)
+            overlap = 1
+
+        count = _segment_count(len(data), segment_size, codec)
+        segments: list[EphemerisSegment] = []
+        for index in range(count):
+            offset = index * segment_size
+            # the last segment contains all the remaining time steps
+            end = offset + segment_size + overlap if index < count - 1 else len(data)
+            segments.append(
+                EphemerisSegment(
+                    index=index,
+                    start=start + step * offset,
+                    data=codec.encode(data[offset:end, :]),
+                )
+            )
+
+        return segment_size, segments
 
-    def horizons(self, satellite_id: int) -> list[models.Horizon]:
+    def _evaluate(
+        self, e: Ephemeris, codec: ChebyshevCodec, steps: np.ndarray[tuple[int], Any]
+    ) -> np.ndarray[tuple[int, int], Any]:
+        """
+        Evaluate the given Chebyshev-encoded ephemeris at the given times (in number
+        of time steps of the ephemeris), only fetching the segments containing these
+        times.
+        """
+        segment_size = cast(int, e.segment_size)
+        n_segments = _entry_segment_count(e)
+
+        indices = np.clip(steps // segment_size, 0, n_segments - 1).astype(int)
+
+        seg_start, seg_end = int(indices.min()), int(indices.max())
+        segments = self._fetch_segments(e, seg_start, seg_end)
+
+        data = np.empty((len(steps), 6))
+        for index, segment in enumerate(segments, start=seg_start):
+            mask = indices == index
+            data[mask] = codec.evaluate(segment, steps[mask] - index * segment_size)
+
+        return data
+
+    def _load_range(
+        self, e: Ephemeris, codec: EphemerisCodec, idx_start: int, idx_end: int
+    ) -> np.ndarray[tuple[int, int], Any]:
+        """
+        Load the time steps between idx_start and idx_end (both included) of the given
+        ephemeris, only fetching the segments containing these time steps.
+        """
+
+        # file on the local disk, slice of the memory map without copy
+        if e.path is not None:
+            if self._files is None:
+                raise ValueError(
+                    f"ephemeris {e.id} is stored in a file but no file store is "
+                    "configured"
+                )
+            return self._files.read(e.path)[idx_start : idx_end + 1, :]
+
+        # single blob, need to load everything
+        if e.segment_size is None:
+            return codec.decode(cast(bytes, e.data))[idx_start : idx_end + 1, :]
+
+        last = _entry_segment_count(e) - 1
+        seg_start = min(idx_start // e.segment_size, last)
+        seg_end = min(idx_end // e.segment_size, last)
+        segments = self._fetch_segments(e, seg_start, seg_end)
+
+        # segments may overlap (see _encode_segments), so only the last one is kept
+        # entirely
+        data = np.concatenate(
+            [codec.decode(segment)[: e.segment_size] for segment in segments[:-1]]
+            + [codec.decode(segments[-1])]
+        )
+
+        offset = idx_start - seg_start * e.segment_size
+        return data[offset : offset + idx_end - idx_start + 1, :]
+
+    def _load_data(
+        self, e: Ephemeris, h: models.Horizon | None
+    ) -> np.ndarray[tuple[int, int], Any]:
+        """
+        Load the raw data of the given ephemeris over the given horizon, only
+        fetching the segments overlapping the horizon from the database.
+
+        Args:
+            e: Ephemeris to load data from.
+            h: Horizon to load, or None to load the whole ephemeris. The horizon can
+                have a different step than the ephemeris (see _reuse_mode).
+
+        Returns:
+            An array of shape Nx6 containing the ephemeris data over the horizon.
+        """
+        codec = get_codec(e.format)
+        step = timedelta_from_database(e.step)
+        idx_last = (ensure_utc(e.end) - ensure_utc(e.start)) // step
+
+        if h is None:
+            return self._load_range(e, codec, 0, idx_last)
+
+        mode = _reuse_mode(e, h)
+        steps = _horizon_steps(e, h)
+
+        if mode == _EXACT or mode == _STRIDED:
+            # strided view over the loaded time steps
+            stride = h.step // step
+            idx_start = round(steps[0])
+            return self._load_range(
+                e, codec, idx_start, idx_start + (len(steps) - 1) * stride
+            )[::stride, :]
+
+        if mode == _CHEBYSHEV:
+            return self._evaluate(e, cast(ChebyshevCodec, codec), steps)
+
+        if mode == _INTERPOLATED:
+            idx_start = int(np.floor(steps[0]))
+            idx_end = max(min(int(np.ceil(steps[-1])), idx_last), idx_start + 1)
+            return hermite_interpolate(
+                self._load_range(e, codec, idx_start, idx_end),
+                step.total_seconds(),
+                steps - idx_start,
+            )
+
+        raise ValueError(f"ephemeris {e.id} cannot be used for horizon {h}")
+
+    def horizons(
+        self, satellite_id: int, step: timedelta | None = None
+    ) -> list[models.Horizon]:
         """
         Retrieve the available horizons for the given satellite ID.
 
         Args:
             satellite_id: Satellite to retrieve horizons for.
+            step: If specified, retrieve the horizons with this step that can be
+                extracted from the database (see extract), instead of the horizons
+                of the ephemeris in the database.
 
         Returns:
             The list of already computed (in the database) horizons.
         """
 
-        return [
-            models.Horizon(
-                start=ensure_utc(start),
-                end=ensure_utc(end),
-                step=timedelta_from_database(step),
+        if step is None:
+            return [
+                models.Horizon(
+                    start=ensure_utc(start),
+                    end=ensure_utc(end),
+                    step=timedelta_from_database(step),
+                )
+                for start, end, step in cast(
+                    Iterable[tuple[datetime, datetime, int]],
+                    self._db.execute(
+                        select(Ephemeris)
+                        .where(
+                            Ephemeris.satellite_id == satellite_id,
+                            Ephemeris.dynamics == self._dynamics,
+                        )
+                        .with_only_columns(
+                            Ephemeris.start, Ephemeris.end, Ephemeris.step
+                        )
+                    ).all(),
+                )
+            ]
+
+        horizons: dict[models.Horizon, None] = {}
+        for e in self._db.scalars(
+            select(Ephemeris)
+            .options(
+                load_only(
+                    Ephemeris.start, Ephemeris.end, Ephemeris.step, Ephemeris.format
+                )
             )
-            for start, end, step in cast(
-                Iterable[tuple[datetime, datetime, int]],
-                self._db.execute(
-                    select(Ephemeris)
-                    .where(Ephemeris.satellite_id == satellite_id)
-                    .with_only_columns(Ephemeris.start, Ephemeris.end, Ephemeris.step)
-                ).all(),
+            .where(
+                Ephemeris.satellite_id == satellite_id,
+                Ephemeris.dynamics == self._dynamics,
             )
-        ]
+        ):
+            start = ensure_utc(e.start)
+            horizon = models.Horizon(
+                start=start,
+                end=start + ((ensure_utc(e.end) - start) // step) * step,
+                step=step,
+            )
+            if _reuse_mode(e, horizon, self._interpolate) is not None:
+                horizons[horizon] = None
+
+        return list(horizons)
 
     def convert_from_database(self, model: Ephemeris) -> models.Ephemeris:
+        horizon = models.Horizon(
+            start=ensure_utc(model.start),
+            end=ensure_utc(model.end),
+            step=timedelta_from_database(model.step),
+        )
         return models.Ephemeris(
             id=model.id,
             satellite=self._satellite_manager.convert_from_database(model.satellite),
-            horizon=models.Horizon(
-                start=ensure_utc(model.start),
-                end=ensure_utc(model.end),
-                step=timedelta_from_database(model.step),
-            ),
-            itrs=_db2py(model, None),
+            horizon=horizon,
+            itrs=models.LazyITRS(self._load_data(model, None), horizon),
         )
 
-    def convert_to_database(self, model: models.Ephemeris) -> Ephemeris:
+    def _create_entry(
+        self, data: np.ndarray[tuple[int, int], Any], horizon: models.Horizon
+    ) -> Ephemeris:
+        """
+        Create an ephemeris entry (without satellite) for the given data over the
+        given horizon, stored in the file store if there is one, or encoded in
+        segments with the codec of this manager.
+        """
+        start = ensure_utc(horizon.start)
+        end = ensure_utc(horizon.end)
+        step = timedelta_to_database(horizon.step)
+
+        if self._files is not None and not isinstance(self._codec, ChebyshevCodec):
+            path = self._files.write(data)
+
+            # remove the file if the entry is never committed
+            if not event.contains(self._db, "after_commit", _forget_pending_files):
+                event.listen(self._db, "after_commit", _forget_pending_files)
+                event.listen(self._db, "after_transaction_end", _remove_pending_files)
+            self._db.info.setdefault(_PENDING_FILES, []).append((self._files, path))
+
+            return Ephemeris(
+                start=start,
+                end=end,
+                step=step,
+                format=RAW.format,
+                path=path,
+                dynamics=self._dynamics,
+            )
+
+        codec = self._codec
+        try:
+            segment_size, segments = self._encode_segments(
+                codec, data, start, horizon.step
+            )
+        except ValueError:
+            # the codec cannot represent these ephemeris (e.g., Chebyshev polynomials
+            # with a step too large for the orbit), fallback to the default one
+            codec = DEFAULT_CODEC
+            segment_size, segments = self._encode_segments(
+                codec, data, start, horizon.step
+            )
+
         return Ephemeris(
-            satellite=self._satellite_manager.store_or_load(
-                model.satellite, commit=False
+            start=start,
+            end=end,
+            step=step,
+            format=codec.format,
+            segment_size=segment_size,
+            segments=segments,
+            dynamics=self._dynamics,
+        )
+
+    def convert_to_database(self, model: models.Ephemeris) -> Ephemeris:
+        entry = self._create_entry(_py2np(model.itrs), model.horizon)
+        entry.satellite = self._satellite_manager.store_or_load(
+            model.satellite, commit=False
+        )
+        return entry
+
+    def _cache_get(
+        self, satellites: Sequence[models.Satellite], horizon: models.Horizon
+    ) -> dict[models.Satellite, models.Ephemeris | None]:
+        """
+        Retrieve ephemeris of the given satellites over the given horizon from the
+        cache.
+
+        The cache is local to the process, so the entries the cached ephemeris were
+        extracted from may have been removed by another process (e.g., by compact or
+        when deleting a satellite). The cached ephemeris whose entry does not exist
+        anymore are removed from the cache and not returned, so that their ID is not
+        referenced by new eligibility groups.
+
+        Returns:
+            For each satellite, the cached ephemeris, or None if not in the cache.
+        """
+        keys = {
+            satellite: (
+                cast(int, satellite.id),
+                horizon.start,
+                horizon.end,
+                horizon.step,
+                self._dynamics,
+            )
+            for satellite in satellites
+        }
+        cached = {satellite: self._cache.get(key) for satellite, key in keys.items()}
+
+        # interpolated ephemeris can only be used by managers allowing interpolation
+        if not self._interpolate:
+            cached = {
+                satellite: None if value is None or value[2] else value
+                for satellite, value in cached.items()
+            }
+
+        ids = {value[0] for value in cached.values() if value is not None}
+        if ids:
+            existing = set(
+                self._db.scalars(select(Ephemeris.id).where(Ephemeris.id.in_(ids)))
+            )
+            removed = {
+                satellite
+                for satellite, value in cached.items()
+                if value is not None and value[0] not in existing
+            }
+            if removed:
+                removed_keys = {keys[satellite] for satellite in removed}
+                self._cache.invalidate(lambda key: key in removed_keys)
+                cached.update({satellite: None for satellite in removed})
+
+        return {
+            satellite: None
+            if value is None
+            else models.Ephemeris(
+                id=value[0],
+                satellite=satellite,
+                horizon=horizon,
+                itrs=models.LazyITRS(value[1], horizon),
+            )
+            for satellite, value in cached.items()
+        }
+
+    def _extract_data(
+        self, e: Ephemeris, satellite: models.Satellite, horizon: models.Horizon
+    ) -> models.Ephemeris:
+        data = self._load_data(e, horizon)
+        interpolated = _reuse_mode(e, horizon) == _INTERPOLATED
+
+        # strided views and slices are copied on purpose: the cache charges entries by
+        # their own size, so keeping a view would keep the whole decoded (full
+        # resolution) ephemeris alive without accounting for it. Memory maps are not
+        # in memory anyway, so they are kept as views
+        if data.base is not None and not isinstance(data, np.memmap):
+            data = data.copy()
+
+        # data are shared through the cache, so they must not be modified
+        data.setflags(write=False)
+        self._cache.put(
+            (
+                cast(int, satellite.id),
+                horizon.start,
+                horizon.end,
+                horizon.step,
+                self._dynamics,
             ),
-            start=ensure_utc(model.horizon.start),
-            end=ensure_utc(model.horizon.end),
-            step=timedelta_to_database(model.horizon.step),
-            data=_py2db(model),
+            (e.id, data, interpolated),
         )
 
+        return models.Ephemeris(
+            id=e.id,
+            satellite=satellite,
+            horizon=horizon,
+            itrs=models.LazyITRS(data, horizon),
+        )
+
+    def _find(
+        self, satellite_ids: Sequence[int], horizon: models.Horizon
+    ) -> dict[int, Ephemeris]:
+        """
+        Find the most appropriate ephemeris (see extract) for each of the given
+        satellites over the given horizon, using a single query.
+
+        Returns:
+            The ephemeris found (without data loaded), by satellite ID.
+        """
+        found: dict[int, tuple[int, int, Ephemeris]] = {}
+        for e in self._db.scalars(
+            select(Ephemeris)
+            .options(defer(Ephemeris.data))
+            .filter(
+                Ephemeris.satellite_id.in_(satellite_ids),
+                Ephemeris.dynamics == self._dynamics,
+                self._loadable(),
+                Ephemeris.start <= ensure_utc(horizon.start),
+                Ephemeris.end >= ensure_utc(horizon.end),
+            )
+        ):
+            mode = _reuse_mode(e, horizon, self._interpolate)
+            if mode is None:
+                continue
+
+            # prefer the largest step for strided views (less data to load), and the
+            # smallest step for interpolation (more accurate)
+            order = -e.step if mode == _STRIDED else e.step
+            if e.satellite_id not in found or (mode, order) < found[e.satellite_id][:2]:
+                found[e.satellite_id] = (mode, order, e)
+
+        return {satellite_id: e for satellite_id, (_, _, e) in found.items()}
+
     def extract(
         self, satellite: models.Satellite, horizon: models.Horizon, shrink: bool = True
     ) -> models.Ephemeris | None:
@@ -134,7 +707,16 @@ class EphemerisManager(BaseManager[models.Ephemeris, Ephemeris, int]):
         Retrieve appropriate ephemeris for the given satellite over the given horizon,
         using entries which are broader than the given horizon if necessary.
 
-        This function can return a subset of an existing ephemeris from the database.
+        This function can return a subset of an existing ephemeris from the database,
+        in which case only the segments overlapping the horizon are retrieved.
+
+        Ephemeris with a different step can also be used, by order of preference:
+          - ephemeris whose step divides the horizon step, using a strided view (the
+            largest such step is used);
+          - if the manager allows interpolation, ephemeris with a small step (see
+            _MAX_INTERPOLATION_STEP), using cubic Hermite interpolation of positions
+            and velocities;
+          - ephemeris stored with the Chebyshev codec, evaluating the polynomials.
 
         Args:
             satellite: Satellite to retrieve ephemeris from (must be from the database).
@@ -146,24 +728,402 @@ class EphemerisManager(BaseManager[models.Ephemeris, Ephemeris, int]):
             Convert ephemeris from the database, if found, or None.
         """
 
-        ephemeris = self._db.scalars(
-            select(Ephemeris).filter(
-                Ephemeris.satellite_id == satellite.id,
-                Ephemeris.start <= ensure_utc(horizon.start),
-                Ephemeris.end >= ensure_utc(horizon.end),
-                Ephemeris.step == timedelta_to_database(horizon.step),
-            )
-        ).first()
+        if (
+            shrink
+            and (cached := self._cache_get([satellite], horizon)[satellite]) is not None
+        ):
+            return cached
+
+        ephemeris = self._find([cast(int, satellite.id)], horizon).get(
+            cast(int, satellite.id)
+        )
 
-        if not ephemeris:
+        if ephemeris is None:
             return None
 
         if shrink:
-            return models.Ephemeris(
-                id=ephemeris.id,
-                satellite=satellite,
-                horizon=horizon,
-                itrs=_db2py(ephemeris, horizon),
-            )
+            return self._extract_data(ephemeris, satellite, horizon)
         else:
             return self.convert_from_database(ephemeris)
+
+    def extract_many(
+        self, satellites: Sequence[models.Satellite], horizon: models.Horizon
+    ) -> dict[models.Satellite, models.Ephemeris | None]:
+        """
+        Retrieve appropriate ephemeris for each of the given satellites over the given
+        horizon (see extract).
+
+        Ephemeris are found using a single query, and the data of all the ephemeris
+        found are fetched using a single query.
+
+        Args:
+            satellites: Satellites to retrieve ephemeris from (must be from the
+                database).
+            horizon: Horizon to retrieve ephemeris for.
+
+        Returns:
+            For each satellite, the ephemeris over the given horizon if found, or None.
+        """
+
+        extracted = self._cache_get(satellites, horizon)
+
+        found = self._find(
+            [
+                satellite.id
+                for satellite, ephemeris in extracted.items()
+                if ephemeris is None and satellite.id is not None
+            ],
+            horizon,
+        )
+
+        self._prefetch(found.values(), horizon)
+        try:
+            for satellite, ephemeris in extracted.items():
+                if ephemeris is None and satellite.id in found:
+                    extracted[satellite] = self._extract_data(
+                        found[satellite.id], satellite, horizon
+                    )
+        finally:
+            self._prefetched.clear()
+
+        return extracted
+
+    def complete_many(
+        self,
+        satellites: Sequence[models.Satellite],
+        horizon: models.Horizon,
+        propagate: Callable[
+            [Sequence[models.Satellite], models.Horizon, Callable[[int], None] | None],
+            Sequence[ITRS | models.LazyITRS],
+        ],
+        progress: Callable[[int], None] | None = None,
+    ) -> dict[models.Satellite, models.Ephemeris]:
+        """
+        Retrieve ephemeris for the given satellites over the given horizon, propagating
+        only the parts of the horizon that are not in the database.
+
+        For satellites without a single entry that can be used (see extract), the
+        entries with the same step overlapping the horizon are stitched together, and
+        the missing sub-horizons are propagated. Satellites missing the same
+        sub-horizon are propagated together.
+
+        Args:
+            satellites: Satellites to retrieve ephemeris from (must be from the
+                database).
+            horizon: Horizon to retrieve ephemeris for.
+            propagate: Function computing ephemeris of the given satellites over a
+                given horizon (with the same step as the given horizon), in the same
+                order as the satellites, and reporting propagated satellites to the
+                given callback (if not None).
+            progress: Callback receiving the number of satellites whose ephemeris
+                are complete since the last call, each satellite being reported
+                once: first the satellites found in the database, then the others as
+                their missing sub-horizons are propagated.
+
+        Returns:
+            For each satellite, the ephemeris over the given horizon. If some parts
+            were propagated, the returned ephemeris has no ID and should be stored in
+            the database to be reused.
+        """
+        ephemeris: dict[models.Satellite, models.Ephemeris | None] = dict.fromkeys(
+            satellites
+        )
+        for completed in self.iterate_complete(
+            satellites, horizon, propagate, progress
+        ):
+            ephemeris.update(completed)
+
+        return cast(dict[models.Satellite, models.Ephemeris], ephemeris)
+
+    def iterate_complete(
+        self,
+        satellites: Sequence[models.Satellite],
+        horizon: models.Horizon,
+        propagate: Callable[
+            [Sequence[models.Satellite], models.Horizon, Callable[[int], None] | None],
+            Sequence[ITRS | models.LazyITRS],
+        ],
+        progress: Callable[[int], None] | None = None,
+        chunk_size: int | None = None,
+    ) -> Iterator[dict[models.Satellite, models.Ephemeris]]:
+        """
+        Retrieve ephemeris like complete_many, but yield them as soon as they are
+        complete.
+
+        Args:
+            satellites: Satellites to retrieve ephemeris from (see complete_many).
+            horizon: Horizon to retrieve ephemeris for.
+            propagate: Function computing ephemeris (see complete_many).
+            progress: Callback reporting complete satellites (see complete_many).
+            chunk_size: Maximum number of satellites propagated by a single call to
+                propagate, or None to propagate all the satellites missing the same
+                sub-horizon at once.
+
+        Yields:
+            Batches of complete ephemeris by satellite (see complete_many), each
+            satellite being in a single batch: first the satellites found in the
+            database, then the satellites stitched from the database only, then the
+            others after each call to propagate.
+        """
+        extracted = self.extract_many(satellites, horizon)
+        found = {satellite: e for satellite, e in extracted.items() if e is not None}
+        missing = [satellite for satellite, e in extracted.items() if e is None]
+
+        if progress is not None:
+            progress(len(found))
+        if found:
+            yield found
+
+        step = horizon.step
+        n_steps = (horizon.end - horizon.start) // step + 1
+
+        data = {satellite: np.empty((n_steps, 6)) for satellite in missing}
+        covered = {satellite: np.zeros(n_steps, dtype=bool) for satellite in missing}
+
+        missing_by_id = {
+            satellite.id: satellite for satellite in missing if satellite.id is not None
+        }
+        for e in self._db.scalars(
+            select(Ephemeris)
+            .options(defer(Ephemeris.data))
+            .filter(
+                Ephemeris.satellite_id.in_(missing_by_id),
+                Ephemeris.dynamics == self._dynamics,
+                self._loadable(),
+                Ephemeris.start <= ensure_utc(horizon.end),
+                Ephemeris.end >= ensure_utc(horizon.start),
+                Ephemeris.step == timedelta_to_database(step),
+            )
+            .order_by(Ephemeris.satellite_id, Ephemeris.start)
+        ):
+            e_start = ensure_utc(e.start)
+            if (e_start - horizon.start) % step != timedelta(0):
+                continue
+
+            satellite = missing_by_id[e.satellite_id]
+            idx_start = max((e_start - horizon.start) // step, 0)
+            idx_end = min((ensure_utc(e.end) - horizon.start) // step, n_steps - 1)
+            not_covered = ~covered[satellite][idx_start : idx_end + 1]
+
+            if idx_start > idx_end or not not_covered.any():
+                continue
+
+            data[satellite][idx_start : idx_end + 1][not_covered] = self._load_data(
+                e,
+                models.Horizon(
+                    start=horizon.start + idx_start * step,
+                    end=horizon.start + idx_end * step,
+                    step=step,
+                ),
+            )[not_covered]
+            covered[satellite][idx_start : idx_end + 1] = True
+
+        # group satellites by missing sub-horizon (first and last indices)
+        gaps: dict[tuple[int, int], list[models.Satellite]] = {}
+        for satellite in missing:
+            missing_indices = np.flatnonzero(~covered[satellite])
+            for run in np.split(
+                missing_indices, np.flatnonzero(np.diff(missing_indices) > 1) + 1
+            ):
+                if len(run):
+                    gaps.setdefault((int(run[0]), int(run[-1])), []).append(satellite)
+
+        # number of sub-horizons left to propagate for each satellite, so that
+        # satellites are only reported once complete
+        remaining = {satellite: 0 for satellite in missing}
+        for gap_satellites in gaps.values():
+            for satellite in gap_satellites:
+                remaining[satellite] += 1
+
+        def complete(
+            satellites: Iterable[models.Satellite],
+        ) -> dict[models.Satellite, models.Ephemeris]:
+            return {
+                satellite: models.Ephemeris(
+                    id=None,
+                    satellite=satellite,
+                    horizon=horizon,
+                    itrs=models.LazyITRS(data[satellite], horizon),
+                )
+                for satellite in satellites
+                if remaining[satellite] == 0
+            }
+
+        stitched = complete(missing)
+        if progress is not None:
+            progress(len(stitched))
+        if stitched:
+            yield stitched
+
+        for (idx_start, idx_end), gap_satellites in gaps.items():
+            size = chunk_size or len(gap_satellites)
+            for chunk_start in range(0, len(gap_satellites), size):
+                chunk = gap_satellites[chunk_start : chunk_start + size]
+                for satellite in chunk:
+                    remaining[satellite] -= 1
+                completed = sum(remaining[satellite] == 0 for satellite in chunk)
+
+                # propagate at least two time steps, forwarding the progress of the
+                # propagation if it completes all the satellites
+                itrs = propagate(
+                    chunk,
+                    models.Horizon(
+                        start=horizon.start + idx_start * step,
+                        end=horizon.start + max(idx_end, idx_start + 1) * step,
+                        step=step,
+                    ),
+                    progress if completed == len(chunk) else None,
+                )
+                if progress is not None and completed < len(chunk):
+                    progress(completed)
+                for satellite, satellite_itrs in zip(chunk, itrs):
+                    data[satellite][idx_start : idx_end + 1] = _py2np(satellite_itrs)[
+                        : idx_end - idx_start + 1
+                    ]
+
+                if completed:
+                    yield complete(chunk)
+
+    def compact(self, satellite_ids: Sequence[int] | None = None) -> tuple[int, int]:
+        """
+        Merge overlapping or adjacent ephemeris with the same step (and aligned time
+        steps) and the same dynamical model into single entries covering all of them,
+        and move the eligibility groups computed from the merged ephemeris to the new
+        entries.
+
+        Ephemeris stored with a Chebyshev codec are not merged since they can already
+        be used for any step, and ephemeris stored in files are not merged if there is
+        no file store.
+
+        Args:
+            satellite_ids: Satellites whose ephemeris should be compacted, or None to
+                compact the ephemeris of all satellites.
+
+        Returns:
+            The number of entries created and the number of entries removed.
+        """
+
+        query = (
+            select(Ephemeris)
+            .options(defer(Ephemeris.data))
+            .where(self._loadable())
+            .order_by(Ephemeris.satellite_id, Ephemeris.step, Ephemeris.start)
+        )
+        if satellite_ids is not None:
+            query = query.where(Ephemeris.satellite_id.in_(satellite_ids))
+
+        # group mergeable ephemeris, i.e., same satellite, same step, aligned time
+        # steps and same dynamics, ephemeris are ordered by start within each group
+        groups: dict[tuple[int, int, timedelta, str], list[Ephemeris]] = {}
+        for e in self._db.scalars(query):
+            if isinstance(get_codec(e.format), ChebyshevCodec):
+                continue
+
+            step = timedelta_from_database(e.step)
+            groups.setdefault(
+                (
+                    e.satellite_id,
+                    e.step,
+                    (ensure_utc(e.start) - _EPOCH) % step,
+                    e.dynamics,
+                ),
+                [],
+            ).append(e)
+
+        created, removed = 0, 0
+        removed_paths: list[str] = []
+        compacted_satellites: set[int] = set()
+        for (satellite_id, db_step, _, _), entries in groups.items():
+            step = timedelta_from_database(db_step)
+
+            # split in chains of overlapping or adjacent ephemeris
+            chains: list[list[Ephemeris]] = []
+            chain_end = datetime.min.replace(tzinfo=timezone.utc)
+            for e in entries:
+                start = ensure_utc(e.start)
+                end = start + ((ensure_utc(e.end) - start) // step) * step
+                if not chains or start > chain_end + step:
+                    chains.append([])
+                chains[-1].append(e)
+                chain_end = max(chain_end, end) if len(chains[-1]) > 1 else end
+
+            for chain in chains:
+                if len(chain) == 1:
+                    continue
+
+                target, n_created = self._merge(chain, step)
+                created += n_created
+
+                for e in chain:
+                    if e is target:
+                        continue
+
+                    self._db.execute(
+                        update(EligibilityGroup)
+                        .where(EligibilityGroup.ephemeris_id == e.id)
+                        .values(
+                            ephemeris_id=target.id,
+                            start=func.coalesce(EligibilityGroup.start, e.start),
+                            end=func.coalesce(EligibilityGroup.end, e.end),
+                            horizon_step=func.coalesce(
+                                EligibilityGroup.horizon_step, e.step
+                            ),
+                        )
+                    )
+                    if e.path is not None:
+                        removed_paths.append(e.path)
+                    self._db.delete(e)
+                    removed += 1
+
+                compacted_satellites.add(satellite_id)
+
+        self._db.commit()
+
+        # entries in the cache may refer to removed ephemeris (the caches of other
+        # processes are checked against the database when used, see _cache_get)
+        self._cache.invalidate(lambda key: key[0] in compacted_satellites)
+
+        if self._files is not None:
+            for path in removed_paths:
+                self._files.remove(path)
+
+        return created, removed
+
+    def _merge(self, chain: list[Ephemeris], step: timedelta) -> tuple[Ephemeris, int]:
+        """
+        Find or create an ephemeris covering all the ephemeris in the given chain of
+        overlapping or adjacent ephemeris (see compact).
+
+        Returns:
+            The ephemeris covering the chain, and 1 if it was created, 0 otherwise.
+        """
+        start = min(ensure_utc(e.start) for e in chain)
+        ends = [
+            ensure_utc(e.start)
+            + ((ensure_utc(e.end) - ensure_utc(e.start)) // step) * step
+            for e in chain
+        ]
+        end = max(ends)
+
+        # one of the ephemeris already covers all the others
+        for e, e_end in zip(chain, ends):
+            if ensure_utc(e.start) == start and e_end == end:
+                return e, 0
+
+        data = np.empty(((end - start) // step + 1, 6))
+        for e, e_end in zip(chain, ends):
+            idx_start = (ensure_utc(e.start) - start) // step
+            idx_end = (e_end - start) // step
+            data[idx_start : idx_end + 1] = self._load_range(
+                e, get_codec(e.format), 0, idx_end - idx_start
+            )
+
+        target = self._create_entry(
+            data, models.Horizon(start=start, end=end, step=step)
+        )
+        target.satellite_id = chain[0].satellite_id
+        target.dynamics = chain[0].dynamics
+        self._db.add(target)
+        self._db.flush()
+
+        return target, 1
@@ -6,7 +6,7 @@ from .constellation import (
     SatelliteOrbit,
 )
 from .eligibility import Eligibility, EligibilityGroup
-from .ephemeris import Ephemeris
+from .ephemeris import Ephemeris, EphemerisSegment
 from .ground_segment import GroundSegment, Station
 from .system import System
 from .topology import Topology, TopologyLink, TopologyLinkGroup
@@ -15,6 +15,7 @@ __all__ = [
     "Constellation",
     "ConstellationParameters",
     "Ephemeris",
+    "EphemerisSegment",
     "Eligibility",
     "EligibilityGroup",
     "GroundSegment",
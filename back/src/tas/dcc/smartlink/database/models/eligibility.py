@@ -55,6 +55,18 @@ class EligibilityGroup(Base):
     step: Mapped[int] = mapped_column(Integer, nullable=False)
     backend: Mapped[str] = mapped_column(String(64), nullable=False)
 
+    start: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    end: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    horizon_step: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    """Horizon over which the eligibilities were computed (step in milliseconds),
+    which can be smaller than the horizon of the ephemeris, e.g., after compaction of
+    ephemeris (see EphemerisManager.compact). None for groups created before these
+    columns, in which case the horizon of the ephemeris is used."""
+
     eligibilities: Mapped[list[Eligibility]] = relationship(back_populates="group")
 
-    __table_args__ = (UniqueConstraint(ephemeris_id, station_id, mask, step, backend),)
+    __table_args__ = (
+        UniqueConstraint(
+            ephemeris_id, station_id, mask, step, backend, start, end, horizon_step
+        ),
+    )
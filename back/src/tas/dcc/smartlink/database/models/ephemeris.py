@@ -1,6 +1,15 @@
+from __future__ import annotations
+
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey, Integer, LargeBinary, UniqueConstraint
+from sqlalchemy import (
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -23,11 +32,77 @@ class Ephemeris(Base):
     step: Mapped[int] = mapped_column(Integer, nullable=False)
     """Step of the ephemeris, in milliseconds."""
 
-    data: Mapped[bytes] = mapped_column(
-        LargeBinary(length=(2**32) - 1), nullable=False
+    data: Mapped[bytes | None] = mapped_column(
+        LargeBinary(length=(2**32) - 1), nullable=True
     )
     """Binary data, as IEEE 64-bts float of shape Nx6, where N is the number of time
     steps, and the 6 components are x, y, z and vx, vy, vz. Positions are stored in
-    kilometers and speeds in kilometers per second."""
+    kilometers and speeds in kilometers per second.
+
+    Only used by ephemeris stored as a single blob (segment_size is None), otherwise
+    the data are split in segments."""
+
+    format: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    """Format of the binary data (see database.codecs), 0 for raw IEEE 64-bits
+    floats as described above."""
+
+    segment_size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    """Number of time steps in each segment, or None if the ephemeris is stored as a
+    single blob in data."""
+
+    segments: Mapped[list[EphemerisSegment]] = relationship(
+        back_populates="ephemeris",
+        cascade="all, delete-orphan",
+        order_by="EphemerisSegment.index",
+        passive_deletes=True,
+    )
+
+    path: Mapped[str | None] = mapped_column(String(256), nullable=True)
+    """Name of the file containing the data (as raw IEEE 64-bits floats of shape Nx6)
+    in the ephemeris file store (see database.files), or None if the data are stored
+    in the database."""
+
+    dynamics: Mapped[str] = mapped_column(
+        String(16), nullable=False, default="two-body", server_default="two-body"
+    )
+    """Model used to compute the ephemeris (see compute.ephemeris_model), only
+    ephemeris computed with the same model are used for a request. Ephemeris stored
+    before the model of the conversion to ITRS was recorded are marked with their
+    dynamical model only, and are not used anymore."""
+
+    __table_args__ = (UniqueConstraint(satellite_id, start, end, step, dynamics),)
+
+
+class EphemerisSegment(Base):
+
+    """
+    Represent a fixed-size chunk of an ephemeris, so that a sub-horizon can be
+    retrieved without transferring the whole ephemeris.
+    """
+
+    __tablename__ = "ephemeris_segments"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    ephemeris_id: Mapped[int] = mapped_column(
+        ForeignKey("ephemeris.id", ondelete="CASCADE"), nullable=False
+    )
+    ephemeris: Mapped[Ephemeris] = relationship(back_populates="segments")
+
+    index: Mapped[int] = mapped_column(Integer, nullable=False)
+    """Index of the segment, the first time step of the segment is the time step
+    index * segment_size of the ephemeris."""
+
+    start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    """Time of the first time step in the segment."""
+
+    data: Mapped[bytes] = mapped_column(
+        LargeBinary(length=(2**32) - 1), nullable=False
+    )
+    """Binary data of the segment, encoded using the format of the ephemeris, containing
+    segment_size time steps (except for the last segment, see
+    EphemerisManager._encode_segments)."""
 
-    __table_args__ = (UniqueConstraint(satellite_id, start, end, step),)
+    __table_args__ = (UniqueConstraint(ephemeris_id, index),)
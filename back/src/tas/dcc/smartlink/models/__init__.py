@@ -1,6 +1,6 @@
 from .constellation import Constellation, Plane, Satellite
 from .eligibilities import ElevationMask, Eligibility
-from .ephemeris import Ephemeris
+from .ephemeris import Ephemeris, LazyITRS
 from .horizon import Horizon
 from .stations import GroundSegment, Station
 from .system import System
@@ -13,6 +13,7 @@ __all__ = [
     "Ephemeris",
     "GroundSegment",
     "Horizon",
+    "LazyITRS",
     "Plane",
     "Satellite",
     "Station",
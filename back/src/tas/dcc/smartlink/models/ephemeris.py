@@ -1,11 +1,92 @@
 from dataclasses import dataclass
+from functools import cached_property
+from typing import Any
+
+import numpy as np
+from astropy.time import Time
+from astropy.units import Quantity, Unit, km
 
 from tas.dcc.orbits.coordinates import ITRS
+from tas.dcc.orbits.utils.astropy import astropy_timerange
+from tas.dcc.orbits.utils.units import km_per_s
 
 from .constellation import Satellite
 from .horizon import Horizon
 
 
+class LazyITRS:
+    """
+    ITRS coordinates backed by an array of positions (in km) and velocities (in km/s),
+    such as the one stored in the database.
+
+    The time axis and the components are only created when accessed, and components
+    are views over the underlying array.
+
+    This avoids the copies of the components and the time axis, but not the decoding
+    of the velocities: the underlying array always contains the six components (codecs
+    decode them together and extracted arrays are shared through the ephemeris
+    cache), so positions-only consumers use as much memory as the others.
+    """
+
+    def __init__(self, data: np.ndarray[tuple[int, int], Any], horizon: Horizon):
+        """
+        Args:
+            data: Array of shape (N, 6) containing x, y, z (in km) and dx, dy, dz (in
+                km/s) for each time step of the horizon.
+            horizon: Horizon corresponding to the data.
+        """
+        self.data = data
+        self.horizon = horizon
+
+    def _component(self, index: int, unit: Unit) -> Quantity:
+        return Quantity(self.data[:, index], unit, copy=False)
+
+    @cached_property
+    def time(self) -> Time:
+        return astropy_timerange(
+            self.horizon.start, self.horizon.end, self.horizon.step
+        )
+
+    @cached_property
+    def x(self) -> Quantity:
+        return self._component(0, km)
+
+    @cached_property
+    def y(self) -> Quantity:
+        return self._component(1, km)
+
+    @cached_property
+    def z(self) -> Quantity:
+        return self._component(2, km)
+
+    @cached_property
+    def d_x(self) -> Quantity:
+        return self._component(3, km_per_s)
+
+    @cached_property
+    def d_y(self) -> Quantity:
+        return self._component(4, km_per_s)
+
+    @cached_property
+    def d_z(self) -> Quantity:
+        return self._component(5, km_per_s)
+
+    def to_itrs(self) -> ITRS:
+        """
+        Returns:
+            The ITRS coordinates, with all components and the time axis created.
+        """
+        return ITRS(
+            time=self.time,
+            x=self.x,
+            y=self.y,
+            z=self.z,
+            d_x=self.d_x,
+            d_y=self.d_y,
+            d_z=self.d_z,
+        )
+
+
 @dataclass(frozen=True)
 class Ephemeris:
     id: int | None
@@ -17,5 +98,5 @@ class Ephemeris:
     horizon: Horizon
     """Horizon over which ephemeris are computed."""
 
-    itrs: ITRS
-    """Actual ephemeris."""
+    itrs: ITRS | LazyITRS
+    """Actual ephemeris, lazy when loaded from the database."""
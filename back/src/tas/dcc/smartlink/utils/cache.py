@@ -0,0 +1,142 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Generic, Hashable, TypeVar
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+
+
+@dataclass(frozen=True)
+class CacheStatistics:
+    hits: int
+    """Number of lookups that found an entry."""
+
+    misses: int
+    """Number of lookups that did not find an entry."""
+
+    evictions: int
+    """Number of entries removed to keep the cache under its maximum size."""
+
+    entries: int
+    """Number of entries currently in the cache."""
+
+    size: int
+    """Current size of the cache, in bytes."""
+
+    max_size: int
+    """Maximum size of the cache, in bytes."""
+
+
+class LRUCache(Generic[_K, _V]):
+
+    """
+    Thread-safe least-recently-used cache whose size is bounded by the total size (in
+    bytes) of its values rather than by the number of entries.
+    """
+
+    def __init__(self, max_size: int, size: Callable[[_V], int]):
+        """
+        Args:
+            max_size: Maximum total size of the values, in bytes. A cache with a
+                maximum size of 0 stores nothing.
+            size: Function returning the size of a value, in bytes.
+        """
+        self._max_size = max_size
+        self._size_fn = size
+
+        self._entries: OrderedDict[_K, tuple[_V, int]] = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: _K) -> _V | None:
+        """
+        Retrieve the value for the given key, marking it as recently used.
+
+        Args:
+            key: Key to look for.
+
+        Returns:
+            The value for the given key, or None if not in the cache.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: _K, value: _V):
+        """
+        Add or replace the value for the given key, evicting the least recently used
+        entries if necessary. Values larger than the cache are not stored.
+
+        Args:
+            key: Key of the value.
+            value: Value to store.
+        """
+        size = self._size_fn(value)
+
+        with self._lock:
+            self._remove(key)
+
+            if size > self._max_size:
+                return
+
+            while self._size + size > self._max_size:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+            self._entries[key] = (value, size)
+            self._size += size
+
+    def invalidate(self, predicate: Callable[[_K], bool]) -> int:
+        """
+        Remove all the entries whose key matches the given predicate.
+
+        Args:
+            predicate: Function returning True for keys to remove.
+
+        Returns:
+            The number of removed entries.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        """
+        Remove all the entries from the cache, without resetting statistics.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def statistics(self) -> CacheStatistics:
+        """
+        Returns:
+            The current statistics of the cache.
+        """
+        with self._lock:
+            return CacheStatistics(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size=self._size,
+                max_size=self._max_size,
+            )
+
+    def _remove(self, key: _K):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
@@ -0,0 +1,54 @@
+from typing import Any
+
+import numpy as np
+
+
+def decimate(
+    positions: np.ndarray[tuple[int, int], Any], tolerance: float
+) -> np.ndarray[tuple[int], Any]:
+    """
+    Select the time steps to keep so that linearly interpolating (in time) between
+    them is within the given tolerance of all the positions, using the
+    Douglas-Peucker algorithm with the distance to the interpolated position at the
+    same time step (which also bounds the distance to the polyline).
+
+    All the segments are refined at once, each iteration splitting every segment
+    exceeding the tolerance at its farthest time step.
+
+    Args:
+        positions: Array of shape (N, D) containing positions at regular time steps.
+        tolerance: Maximum distance between positions and the interpolated ones, in
+            the unit of the positions.
+
+    Returns:
+        The sorted indices of the time steps to keep, including the first and last
+        ones.
+    """
+    n = len(positions)
+    if n <= 2:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, -1]] = True
+
+    indices = np.arange(n)
+    while True:
+        kept = np.flatnonzero(keep)
+
+        # segment of each time step (the last one belongs to the last segment)
+        segment = np.minimum(
+            np.searchsorted(kept, indices, side="right") - 1, len(kept) - 2
+        )
+        start, end = kept[segment], kept[segment + 1]
+
+        ratio = ((indices - start) / (end - start))[:, None]
+        interpolated = positions[start] + ratio * (positions[end] - positions[start])
+        distance = np.linalg.norm(positions - interpolated, axis=1)
+
+        # farthest time step of each segment (segments are contiguous)
+        farthest = np.maximum.reduceat(distance, kept[:-1])[segment]
+        split = np.flatnonzero((distance == farthest) & (distance > tolerance))
+        if not len(split):
+            return kept
+
+        keep[split] = True
@@ -0,0 +1,48 @@
+from typing import Any
+
+import numpy as np
+
+
+def hermite_interpolate(
+    data: np.ndarray[tuple[int, int], Any],
+    step: float,
+    steps: np.ndarray[tuple[int], Any],
+) -> np.ndarray[tuple[int, int], Any]:
+    """
+    Interpolate positions and velocities using cubic Hermite interpolation of the
+    positions (the velocities are the derivatives of the interpolated positions).
+
+    Args:
+        data: Array of shape Nx6 containing positions (first 3 columns) and velocities
+            (last 3 columns) at regular time steps, with N >= 2. The velocities must be
+            expressed in position unit per second.
+        step: Time step of the data, in seconds.
+        steps: Times to interpolate at, expressed in number of time steps from the
+            first row of data, between 0 and N - 1.
+
+    Returns:
+        An array of shape Mx6, where M is the length of steps, containing the
+        interpolated positions and velocities.
+    """
+    steps = np.asarray(steps, dtype=float)
+    index = np.clip(np.floor(steps).astype(int), 0, len(data) - 2)
+    s = (steps - index)[:, None]
+
+    p0, p1 = data[index, :3], data[index + 1, :3]
+    m0, m1 = data[index, 3:] * step, data[index + 1, 3:] * step
+
+    s2, s3 = s * s, s * s * s
+    position = (
+        (2 * s3 - 3 * s2 + 1) * p0
+        + (s3 - 2 * s2 + s) * m0
+        + (-2 * s3 + 3 * s2) * p1
+        + (s3 - s2) * m1
+    )
+    velocity = (
+        (6 * s2 - 6 * s) * p0
+        + (3 * s2 - 4 * s + 1) * m0
+        + (-6 * s2 + 6 * s) * p1
+        + (3 * s2 - 2 * s) * m1
+    ) / step
+
+    return np.concatenate([position, velocity], axis=1)
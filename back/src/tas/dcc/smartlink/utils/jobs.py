@@ -0,0 +1,125 @@
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Callable, Generic, Literal, TypeVar
+
+_T = TypeVar("_T")
+
+JobStatus = Literal["pending", "running", "done", "failed"]
+
+
+@dataclass
+class Job(Generic[_T]):
+
+    """
+    Computation running in the background, with its progress and its result.
+    """
+
+    id: str
+    """Unique ID of the job."""
+
+    kind: str
+    """Kind of computation (e.g., "ephemeris")."""
+
+    total: int
+    """Number of items (e.g., satellites) to process."""
+
+    completed: int = 0
+    """Number of items already processed."""
+
+    status: JobStatus = "pending"
+    """Status of the job."""
+
+    result: _T | None = None
+    """Result of the job, once done."""
+
+    error: str | None = None
+    """Error message, if the job failed."""
+
+    created: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    """Time at which the job was submitted."""
+
+    finished: datetime | None = None
+    """Time at which the job finished (successfully or not)."""
+
+    def advance(self, count: int = 1):
+        """
+        Mark the given number of items as processed.
+        """
+        self.completed = min(self.completed + count, self.total)
+
+
+class JobRegistry:
+
+    """
+    Thread-safe registry of jobs running in a pool of threads. Only the most recent
+    finished jobs are kept, to bound the memory used by their results.
+    """
+
+    def __init__(self, max_workers: int, max_finished: int):
+        """
+        Args:
+            max_workers: Maximum number of jobs running at the same time.
+            max_finished: Maximum number of finished jobs to keep.
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        self._max_finished = max_finished
+
+        self._jobs: dict[str, Job[Any]] = {}
+        self._finished: OrderedDict[str, None] = OrderedDict()
+        self._lock = Lock()
+
+    def submit(
+        self, kind: str, total: int, function: Callable[[Job[_T]], _T]
+    ) -> Job[_T]:
+        """
+        Submit a new job.
+
+        Args:
+            kind: Kind of computation.
+            total: Number of items to process.
+            function: Function running the computation, receiving the job to report
+                progress (see Job.advance) and returning the result.
+
+        Returns:
+            The submitted job, whose status is updated as it runs.
+        """
+        job: Job[_T] = Job(id=uuid.uuid4().hex, kind=kind, total=total)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, function)
+        return job
+
+    def get(self, job_id: str) -> Job[Any] | None:
+        """
+        Args:
+            job_id: ID of the job to retrieve.
+
+        Returns:
+            The job with the given ID, or None if it does not exist or was dropped.
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job[_T], function: Callable[[Job[_T]], _T]):
+        job.status = "running"
+        try:
+            job.result = function(job)
+            job.completed = job.total
+            job.status = "done"
+        except Exception as e:
+            job.error = "".join(traceback.format_exception_only(e)).strip()
+            job.status = "failed"
+        job.finished = datetime.now(timezone.utc)
+
+        with self._lock:
+            self._finished[job.id] = None
+            while len(self._finished) > self._max_finished:
+                self._jobs.pop(self._finished.popitem(last=False)[0], None)
@@ -20,9 +20,16 @@ def get(model: type[_T], path: str, params: QueryParamTypes | None = None) -> _T
 
 
 def post(
-    model: type[_T], path: str, data: BaseModel, params: QueryParamTypes | None = None
+    model: type[_T],
+    path: str,
+    data: BaseModel | None = None,
+    params: QueryParamTypes | None = None,
 ) -> _T:
-    response = CLIENT.post(path, params=params, content=data.model_dump_json())
+    response = CLIENT.post(
+        path,
+        params=params,
+        content=data.model_dump_json() if data is not None else None,
+    )
     content = response.read()
     assert response.status_code == 200, content
 
@@ -1,16 +1,29 @@
 import base64
+import struct
+import threading
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
+import anyio
+import httpx
 import numpy as np
+import pytest
 from pytest_unordered import unordered
 
+from tas.dcc.smartlink.api.main import app
+from tas.dcc.smartlink.api.routers import ephemeris as ephemeris_router
 from tas.dcc.smartlink.api.schemas.ephemeris import (
+    EphemerisBinaryHeader,
+    EphemerisCompaction,
     EphemerisRequest,
     EphemerisResponse,
+    EphemerisStreamHeader,
+    EphemerisStreamItem,
+    FloatDataFormat,
     Horizon,
 )
 
-from .client import get, post
+from .client import CLIENT, get, post
 
 
 def test_list_ephemeris():
@@ -28,6 +41,15 @@ def test_list_ephemeris():
             step=timedelta(seconds=30),
         )
     ]
+    assert get(
+        list[Horizon], "/ephemeris/list/satellite/1", params={"step": "PT1M"}
+    ) == [
+        Horizon(
+            start=datetime(2023, 7, 1, tzinfo=timezone.utc),
+            end=datetime(2023, 7, 1, 2, tzinfo=timezone.utc),
+            step=timedelta(seconds=60),
+        )
+    ]
 
 
 def test_compute():
@@ -91,6 +113,28 @@ def test_compute():
         ]
     )
 
+    # strided and interpolated sub-queries, no new horizon should be created
+    for step, size in ((timedelta(seconds=60), 61), (timedelta(seconds=10), 361)):
+        ephemeris = post(
+            EphemerisResponse,
+            "/ephemeris/compute",
+            EphemerisRequest(
+                satellite_ids=[1, 12],
+                horizon=Horizon(
+                    start=datetime(2023, 7, 1, 0, 30, tzinfo=timezone.utc),
+                    end=datetime(2023, 7, 1, 1, 30, tzinfo=timezone.utc),
+                    step=step,
+                ),
+                velocity=True,
+                interpolate=True,
+            ),
+        )
+        x = convert(ephemeris.ephemeris[1].position.x_km)
+        assert x.shape == (size,)
+
+    horizons = get(list[Horizon], "/ephemeris/list/satellite/1")
+    assert len(horizons) == 1
+
     # trigger a new compute
     ephemeris = post(
         EphemerisResponse,
@@ -98,16 +142,16 @@ def test_compute():
         EphemerisRequest(
             satellite_ids=[1, 12],
             horizon=Horizon(
-                start=datetime(2023, 7, 1, tzinfo=timezone.utc),
-                end=datetime(2023, 7, 1, 0, 10, tzinfo=timezone.utc),
+                start=datetime(2023, 7, 1, 2, 10, tzinfo=timezone.utc),
+                end=datetime(2023, 7, 1, 2, 20, tzinfo=timezone.utc),
                 step=timedelta(seconds=10),
             ),
             velocity=True,
         ),
     )
     assert ephemeris.horizon == Horizon(
-        start=datetime(2023, 7, 1, tzinfo=timezone.utc),
-        end=datetime(2023, 7, 1, 0, 10, tzinfo=timezone.utc),
+        start=datetime(2023, 7, 1, 2, 10, tzinfo=timezone.utc),
+        end=datetime(2023, 7, 1, 2, 20, tzinfo=timezone.utc),
         step=timedelta(seconds=10),
     )
 
@@ -119,10 +163,311 @@ def test_compute():
                 end=datetime(2023, 7, 1, 2, tzinfo=timezone.utc),
                 step=timedelta(seconds=30),
             ),
+            Horizon(
+                start=datetime(2023, 7, 1, 2, 10, tzinfo=timezone.utc),
+                end=datetime(2023, 7, 1, 2, 20, tzinfo=timezone.utc),
+                step=timedelta(seconds=10),
+            ),
+        ]
+    )
+
+    # partially cached horizon, only the missing part is propagated and the merged
+    # ephemeris is stored
+    request = EphemerisRequest(
+        satellite_ids=[1, 12],
+        horizon=Horizon(
+            start=datetime(2023, 7, 1, 1, 30, tzinfo=timezone.utc),
+            end=datetime(2023, 7, 1, 2, 30, tzinfo=timezone.utc),
+            step=timedelta(seconds=30),
+        ),
+        velocity=True,
+    )
+    ephemeris = post(EphemerisResponse, "/ephemeris/compute", request)
+    reference = post(
+        EphemerisResponse,
+        "/ephemeris/compute",
+        request.model_copy(update={"cache": False}),
+    )
+    x = convert(ephemeris.ephemeris[1].position.x_km)
+    assert x.shape == (121,)
+    assert np.abs(x - convert(reference.ephemeris[1].position.x_km)).max() < 1e-2
+
+    horizons = get(list[Horizon], "/ephemeris/list/satellite/1")
+    assert len(horizons) == 3
+    assert request.horizon in horizons
+
+
+def test_compact():
+    # the overlapping horizons from test_compute are merged
+    compaction = post(
+        EphemerisCompaction,
+        "/ephemeris/compact",
+        params={"satellite_ids": [1]},
+    )
+    assert compaction == EphemerisCompaction(created=1, removed=2)
+
+    horizons = get(list[Horizon], "/ephemeris/list/satellite/1")
+    assert horizons == unordered(
+        [
             Horizon(
                 start=datetime(2023, 7, 1, tzinfo=timezone.utc),
-                end=datetime(2023, 7, 1, 0, 10, tzinfo=timezone.utc),
+                end=datetime(2023, 7, 1, 2, 30, tzinfo=timezone.utc),
+                step=timedelta(seconds=30),
+            ),
+            Horizon(
+                start=datetime(2023, 7, 1, 2, 10, tzinfo=timezone.utc),
+                end=datetime(2023, 7, 1, 2, 20, tzinfo=timezone.utc),
                 step=timedelta(seconds=10),
             ),
         ]
     )
+
+
+def test_compute_does_not_block(monkeypatch: pytest.MonkeyPatch):
+    # block the propagation until the list of stations has been retrieved
+    started, release = threading.Event(), threading.Event()
+    released: list[bool] = []
+    propagate_parallel = ephemeris_router.propagate_parallel
+
+    def blocking_propagate_parallel(*args: Any, **kwargs: Any):
+        started.set()
+        released.append(release.wait(timeout=10))
+        return propagate_parallel(*args, **kwargs)
+
+    monkeypatch.setattr(
+        ephemeris_router, "propagate_parallel", blocking_propagate_parallel
+    )
+
+    request = EphemerisRequest(
+        satellite_ids=[1],
+        horizon=Horizon(
+            start=datetime(2023, 7, 2, tzinfo=timezone.utc),
+            end=datetime(2023, 7, 2, 1, tzinfo=timezone.utc),
+            step=timedelta(seconds=30),
+        ),
+        cache=False,
+    )
+
+    async def run():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            async with anyio.create_task_group() as tg:
+
+                async def compute():
+                    response = await client.post(
+                        "/ephemeris/compute", content=request.model_dump_json()
+                    )
+                    assert response.status_code == 200
+
+                tg.start_soon(compute)
+                await anyio.to_thread.run_sync(started.wait, 10)
+
+                response = await client.get("/stations/")
+                assert response.status_code == 200
+                release.set()
+
+    anyio.run(run)
+
+    # the propagation was released by the list of stations, not by the timeout
+    assert released == [True]
+
+
+def test_compute_stream():
+    for cache in (True, False):
+        request = EphemerisRequest(
+            satellite_ids=[1, 12],
+            horizon=Horizon(
+                start=datetime(2023, 7, 1, tzinfo=timezone.utc),
+                end=datetime(2023, 7, 1, 1, tzinfo=timezone.utc),
+                step=timedelta(seconds=30),
+            ),
+            velocity=True,
+            cache=cache,
+        )
+
+        response = CLIENT.post(
+            "/ephemeris/compute/stream", content=request.model_dump_json()
+        )
+        assert response.status_code == 200, response.read()
+        assert response.headers["content-type"] == "application/x-ndjson"
+
+        header, *lines = response.text.splitlines()
+        assert EphemerisStreamHeader.model_validate_json(header).horizon == (
+            request.horizon
+        )
+
+        items = [EphemerisStreamItem.model_validate_json(line) for line in lines]
+        reference = post(EphemerisResponse, "/ephemeris/compute", request)
+        assert {item.satellite_id: item.ephemeris for item in items} == (
+            reference.ephemeris
+        )
+
+
+def test_compute_binary():
+    request = EphemerisRequest(
+        satellite_ids=[1, 12],
+        horizon=Horizon(
+            start=datetime(2023, 7, 1, tzinfo=timezone.utc),
+            end=datetime(2023, 7, 1, 1, tzinfo=timezone.utc),
+            step=timedelta(seconds=30),
+        ),
+        velocity=True,
+        format=FloatDataFormat(type="float64", order="F"),
+    )
+
+    response = CLIENT.post(
+        "/ephemeris/compute/binary", content=request.model_dump_json()
+    )
+    assert response.status_code == 200, response.read()
+    assert response.headers["content-type"] == "application/octet-stream"
+
+    content = response.content
+    (size,) = struct.unpack("<I", content[:4])
+    assert (4 + size) % 8 == 0
+    header = EphemerisBinaryHeader.model_validate_json(content[4 : 4 + size])
+    data = content[4 + size :]
+    assert header.samples == 121
+    assert len(header.columns) == 6
+
+    reference = post(EphemerisResponse, "/ephemeris/compute", request)
+    assert {block.satellite_id for block in header.blocks} == {1, 12}
+    for block in header.blocks:
+        assert block.offset % 8 == 0
+        array = np.frombuffer(
+            data, dtype=np.float64, count=block.size // 8, offset=block.offset
+        ).reshape((header.samples, len(header.columns)), order="F")
+
+        position = reference.ephemeris[block.satellite_id].position
+        np.testing.assert_array_equal(
+            array[:, 0], np.frombuffer(base64.b64decode(position.x_km))
+        )
+
+
+def test_compute_czml():
+    request = EphemerisRequest(
+        satellite_ids=[1, 12],
+        horizon=Horizon(
+            start=datetime(2023, 7, 1, tzinfo=timezone.utc),
+            end=datetime(2023, 7, 1, 1, tzinfo=timezone.utc),
+            step=timedelta(seconds=30),
+        ),
+        velocity=True,
+        format=FloatDataFormat(type="float64"),
+    )
+
+    response = CLIENT.post("/ephemeris/czml", content=request.model_dump_json())
+    assert response.status_code == 200, response.read()
+
+    document, *packets = response.json()
+    assert document["id"] == "document"
+    assert document["clock"]["interval"] == "2023-07-01T00:00:00Z/2023-07-01T01:00:00Z"
+
+    reference = post(EphemerisResponse, "/ephemeris/compute", request)
+    assert [packet["id"] for packet in packets] == unordered(
+        ["satellite-1", "satellite-12"]
+    )
+    for packet in packets:
+        position = packet["position"]
+        assert position["epoch"] == "2023-07-01T00:00:00Z"
+
+        samples = np.reshape(position["cartesianVelocity"], (-1, 7))
+        np.testing.assert_array_equal(samples[:, 0], np.arange(121) * 30)
+
+        satellite_id = int(packet["id"].removeprefix("satellite-"))
+        x_km = reference.ephemeris[satellite_id].position.x_km
+        np.testing.assert_allclose(
+            samples[:, 1], np.frombuffer(base64.b64decode(x_km)) * 1000
+        )
+
+    # documents cannot be paged
+    response = CLIENT.post(
+        "/ephemeris/czml",
+        content=request.model_copy(update={"max_samples": 100}).model_dump_json(),
+    )
+    assert response.status_code == 422
+
+
+def test_compute_pages():
+    def convert(data: bytes) -> np.ndarray[tuple[int], np.dtype[np.float32]]:
+        return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+    request = EphemerisRequest(
+        satellite_ids=[1],
+        horizon=Horizon(
+            start=datetime(2023, 7, 1, tzinfo=timezone.utc),
+            end=datetime(2023, 7, 1, 2, tzinfo=timezone.utc),
+            step=timedelta(seconds=30),
+        ),
+    )
+    reference = post(EphemerisResponse, "/ephemeris/compute", request)
+    assert reference.next_cursor is None
+
+    pages: list[EphemerisResponse] = []
+    while not pages or pages[-1].next_cursor is not None:
+        pages.append(
+            post(
+                EphemerisResponse,
+                "/ephemeris/compute",
+                request.model_copy(
+                    update={
+                        "max_samples": 100,
+                        "window_start": pages[-1].next_cursor if pages else None,
+                    }
+                ),
+            )
+        )
+
+    assert [page.horizon.end for page in pages] == [
+        datetime(2023, 7, 1, 0, 49, 30, tzinfo=timezone.utc),
+        datetime(2023, 7, 1, 1, 39, 30, tzinfo=timezone.utc),
+        datetime(2023, 7, 1, 2, tzinfo=timezone.utc),
+    ]
+    np.testing.assert_array_equal(
+        np.concatenate([convert(page.ephemeris[1].position.x_km) for page in pages]),
+        convert(reference.ephemeris[1].position.x_km),
+    )
+
+    # windows must start on a time step of the horizon
+    response = CLIENT.post(
+        "/ephemeris/compute",
+        content=request.model_copy(
+            update={"window_start": datetime(2023, 7, 1, 0, 0, 10, tzinfo=timezone.utc)}
+        ).model_dump_json(),
+    )
+    assert response.status_code == 422
+
+
+def test_compute_quantized():
+    request = EphemerisRequest(
+        satellite_ids=[1],
+        horizon=Horizon(
+            start=datetime(2023, 7, 1, tzinfo=timezone.utc),
+            end=datetime(2023, 7, 1, 2, tzinfo=timezone.utc),
+            step=timedelta(seconds=30),
+        ),
+        format=FloatDataFormat(type="float64"),
+    )
+    reference = post(EphemerisResponse, "/ephemeris/compute", request)
+    x = np.frombuffer(base64.b64decode(reference.ephemeris[1].position.x_km))
+
+    for delta in (False, True):
+        ephemeris = post(
+            EphemerisResponse,
+            "/ephemeris/compute",
+            request.model_copy(
+                update={"format": FloatDataFormat(type="int16", delta=delta)}
+            ),
+        ).ephemeris[1]
+        assert ephemeris.quantization is not None
+
+        quantized = np.frombuffer(
+            base64.b64decode(ephemeris.position.x_km), dtype=np.int16
+        )
+        if delta:
+            quantized = np.cumsum(quantized, dtype=np.int16)
+
+        quantization = ephemeris.quantization["xKm"]
+        assert quantization.max_error < 0.25
+        assert (
+            np.abs(quantization.offset + quantization.scale * quantized - x).max()
+            <= quantization.max_error
+        )
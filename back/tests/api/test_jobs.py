@@ -0,0 +1,37 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from tas.dcc.smartlink.api.schemas.ephemeris import EphemerisRequest, Horizon
+from tas.dcc.smartlink.api.schemas.job import Job
+
+from .client import CLIENT, get, post
+
+
+def test_ephemeris_job():
+    request = EphemerisRequest(
+        satellite_ids=[1, 12],
+        horizon=Horizon(
+            start=datetime(2023, 7, 3, tzinfo=timezone.utc),
+            end=datetime(2023, 7, 3, 1, tzinfo=timezone.utc),
+            step=timedelta(seconds=30),
+        ),
+    )
+
+    job = post(Job, "/jobs/ephemeris", request)
+    assert job.kind == "ephemeris"
+    assert job.total_satellites == 2
+
+    for _ in range(100):
+        job = get(Job, f"/jobs/{job.id}")
+        if job.status in ("done", "failed"):
+            break
+        time.sleep(0.1)
+
+    assert job.status == "done", job.error
+    assert job.completed_satellites == 2
+    assert job.ephemeris is not None
+    assert sorted(job.ephemeris.ephemeris) == [1, 12]
+
+
+def test_job_not_found():
+    assert CLIENT.get("/jobs/unknown").status_code == 404
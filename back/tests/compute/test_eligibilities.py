@@ -0,0 +1,204 @@
+from datetime import datetime, timedelta, timezone
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import ITRS, AltAz, CartesianRepresentation, EarthLocation
+from astropy.time import Time
+
+from tas.dcc.orbits.models import ElevationMask, GroundLocation
+from tas.dcc.smartlink.compute import (
+    StationFrames,
+    compute_eligibilities_matrix,
+    compute_eligibilities_refined,
+)
+from tas.dcc.smartlink.models import Horizon
+
+_START = datetime(2023, 7, 1, tzinfo=timezone.utc)
+
+_LOCATIONS = [
+    GroundLocation(
+        longitude=longitude * u.deg, latitude=latitude * u.deg, height=height * u.m
+    )
+    for longitude, latitude, height in [(1.4, 43.6, 150), (-70.7, -33.4, 500)]
+]
+
+
+def _ephemeris(horizon: Horizon) -> np.ndarray:
+    # circular orbit seen from the rotating Earth, positions in km and velocities in
+    # km/s
+    time = np.arange((horizon.end - horizon.start) // horizon.step + 1)
+    time = time * horizon.step.total_seconds()
+    motion, rate = np.sqrt(398600.4418 / 7000**3), 7.2921e-5
+    anomaly, rotation = motion * time, rate * time
+    inclination = np.radians(53)
+
+    position = 7000 * np.stack(
+        [
+            np.cos(anomaly),
+            np.sin(anomaly) * np.cos(inclination),
+            np.sin(anomaly) * np.sin(inclination),
+        ],
+        axis=-1,
+    )
+    velocity = (
+        7000
+        * motion
+        * np.stack(
+            [
+                -np.sin(anomaly),
+                np.cos(anomaly) * np.cos(inclination),
+                np.cos(anomaly) * np.sin(inclination),
+            ],
+            axis=-1,
+        )
+    )
+
+    cos, sin = np.cos(rotation), np.sin(rotation)
+    x, y = position[:, 0], position[:, 1]
+    return np.stack(
+        [
+            cos * x + sin * y,
+            -sin * x + cos * y,
+            position[:, 2],
+            cos * velocity[:, 0] + sin * velocity[:, 1] + rate * (-sin * x + cos * y),
+            -sin * velocity[:, 0] + cos * velocity[:, 1] - rate * (cos * x + sin * y),
+            velocity[:, 2],
+        ],
+        axis=-1,
+    )
+
+
+def test_compute_azel():
+    horizon = Horizon(
+        start=_START, end=_START + timedelta(hours=2), step=timedelta(seconds=60)
+    )
+    positions = _ephemeris(horizon)[:, :3]
+    azimuths, elevations = StationFrames.from_locations(_LOCATIONS).compute_azel(
+        positions
+    )
+    assert azimuths.shape == elevations.shape == (len(_LOCATIONS), len(positions))
+
+    time = Time(_START) + np.arange(len(positions)) * horizon.step.total_seconds() * u.s
+    satellite = CartesianRepresentation(positions.T * u.km)
+    for location, station_azimuths, station_elevations in zip(
+        _LOCATIONS, azimuths, elevations
+    ):
+        earth_location = EarthLocation.from_geodetic(
+            location.longitude, location.latitude, location.height
+        )
+        topocentric = ITRS(
+            satellite - earth_location.get_itrs(time).cartesian,
+            obstime=time,
+            location=earth_location,
+        ).transform_to(AltAz(obstime=time, location=earth_location))
+
+        np.testing.assert_allclose(
+            station_elevations, topocentric.alt.to_value(u.deg), rtol=0, atol=1e-9
+        )
+        np.testing.assert_allclose(
+            (station_azimuths - topocentric.az.to_value(u.deg) + 180) % 360 - 180,
+            0,
+            atol=1e-9,
+        )
+
+
+def test_compute_eligibilities_matrix():
+    horizon = Horizon(
+        start=_START, end=_START + timedelta(hours=12), step=timedelta(seconds=30)
+    )
+    positions = _ephemeris(horizon)[:, :3]
+    masks = [
+        ElevationMask(azimuths=[0.0] * u.deg, elevations=[10.0] * u.deg),
+        ElevationMask(
+            azimuths=[0.0, 90.0, 180.0, 270.0] * u.deg,
+            elevations=[5.0, 15.0, 10.0, 20.0] * u.deg,
+        ),
+    ]
+    stations = list(zip(_LOCATIONS, masks))
+
+    eligibilities = compute_eligibilities_matrix(
+        positions, horizon, stations, timedelta(seconds=30)
+    )
+
+    assert len(eligibilities) == len(stations)
+    for station, station_eligibilities in zip(stations, eligibilities):
+        assert station_eligibilities
+        assert (
+            station_eligibilities
+            == compute_eligibilities_matrix(
+                positions, horizon, [station], timedelta(seconds=30)
+            )[0]
+        )
+
+        # bounds within an interpolation step of those found on a finer grid
+        fine = compute_eligibilities_matrix(
+            positions, horizon, [station], timedelta(seconds=5)
+        )[0]
+        assert len(fine) == len(station_eligibilities)
+        for (start, end), (fine_start, fine_end) in zip(station_eligibilities, fine):
+            assert start < end
+            assert abs(start - fine_start) < timedelta(seconds=30)
+            assert abs(end - fine_end) < timedelta(seconds=30)
+
+
+def test_compute_eligibilities_matrix_bounds():
+    horizon = Horizon(
+        start=_START, end=_START + timedelta(minutes=2), step=timedelta(seconds=30)
+    )
+    always, never = [
+        (
+            _LOCATIONS[0],
+            ElevationMask(azimuths=[0.0] * u.deg, elevations=[elevation] * u.deg),
+        )
+        for elevation in (-90.0, 90.0)
+    ]
+
+    assert compute_eligibilities_matrix(
+        _ephemeris(horizon)[:, :3], horizon, [always, never], horizon.step
+    ) == [[(horizon.start, horizon.end)], []]
+
+
+def test_compute_eligibilities_refined():
+    horizon = Horizon(
+        start=_START, end=_START + timedelta(hours=6), step=timedelta(seconds=30)
+    )
+    stations = [
+        (location, ElevationMask(azimuths=[0.0] * u.deg, elevations=[mask] * u.deg))
+        for location in _LOCATIONS
+        for mask in (5.0, 30.0, 60.0)
+    ]
+
+    eligibilities = compute_eligibilities_refined(
+        _ephemeris(horizon), horizon, stations, timedelta(seconds=1)
+    )
+
+    # reference from positions sampled every 0.1 seconds
+    fine_horizon = Horizon(
+        start=horizon.start, end=horizon.end, step=timedelta(seconds=0.1)
+    )
+    reference = compute_eligibilities_matrix(
+        _ephemeris(fine_horizon)[:, :3], fine_horizon, stations, fine_horizon.step
+    )
+
+    assert sum(map(len, eligibilities)) > len(stations)
+    assert [len(station) for station in eligibilities] == [
+        len(station) for station in reference
+    ]
+    for station_eligibilities, station_reference in zip(eligibilities, reference):
+        for (start, end), (reference_start, reference_end) in zip(
+            station_eligibilities, station_reference
+        ):
+            assert abs(start - reference_start) < timedelta(milliseconds=10)
+            assert abs(end - reference_end) < timedelta(milliseconds=10)
+
+
+def test_compute_eligibilities_refined_single_sample():
+    horizon = Horizon(start=_START, end=_START, step=timedelta(seconds=30))
+    stations = [
+        (location, ElevationMask(azimuths=[0.0] * u.deg, elevations=[-90.0] * u.deg))
+        for location in _LOCATIONS
+    ]
+
+    assert compute_eligibilities_refined(
+        _ephemeris(horizon), horizon, stations, timedelta(seconds=1)
+    ) == [[], []]
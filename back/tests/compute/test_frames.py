@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import (
+    GCRS,
+    ITRS,
+    CartesianDifferential,
+    CartesianRepresentation,
+)
+
+from tas.dcc.orbits.utils.astropy import astropy_timerange
+from tas.dcc.smartlink.compute import earth_rotation
+from tas.dcc.smartlink.models import Horizon
+
+
+def test_earth_rotation():
+    horizon = Horizon(
+        start=datetime(2023, 7, 1, tzinfo=timezone.utc),
+        end=datetime(2023, 7, 1, 3, tzinfo=timezone.utc),
+        step=timedelta(seconds=60),
+    )
+    time = astropy_timerange(horizon.start, horizon.end, horizon.step)
+
+    angle = 2 * np.pi * np.arange(len(time)) * 60 / 6000
+    position = 7000 * np.stack(
+        [np.cos(angle), 0.6 * np.sin(angle), 0.8 * np.sin(angle)], axis=1
+    )
+    velocity = (
+        7000
+        * 2
+        * np.pi
+        / 6000
+        * np.stack([-np.sin(angle), 0.6 * np.cos(angle), 0.8 * np.cos(angle)], axis=1)
+    )
+
+    itrs = GCRS(
+        CartesianRepresentation(
+            position.T * u.km,
+            differentials=CartesianDifferential(velocity.T * u.km / u.s),
+        ),
+        obstime=time,
+    ).transform_to(ITRS(obstime=time))
+
+    rotation = earth_rotation(horizon)
+    assert earth_rotation(horizon) is rotation
+
+    data = rotation.apply(np.stack([np.concatenate([position, velocity], axis=1)] * 2))
+    assert data.shape == (2, len(time), 6)
+    np.testing.assert_allclose(
+        data[:, :, :3], np.stack([itrs.cartesian.xyz.to_value(u.km).T] * 2), atol=1e-6
+    )
+    np.testing.assert_allclose(
+        data[:, :, 3:],
+        np.stack([itrs.velocity.d_xyz.to_value(u.km / u.s).T] * 2),
+        atol=1e-7,
+    )
@@ -0,0 +1,49 @@
+from dataclasses import replace
+
+import numpy as np
+from astropy.time import Time
+
+from tas.dcc.smartlink.compute.j2 import (
+    j2_secular_rates,
+    mean_semi_major_axis,
+    propagate_j2,
+)
+from tas.dcc.smartlink.compute.kepler import KeplerianElements
+
+
+def _elements(a: float, inc: float) -> KeplerianElements:
+    return KeplerianElements(
+        k=np.array([398600.4418]),
+        a=np.array([a]),
+        ecc=np.array([0.001]),
+        inc=np.radians([inc]),
+        raan=np.radians([20.0]),
+        argp=np.radians([0.0]),
+        nu=np.radians([0.0]),
+        epoch=Time(["2023-07-01T00:00:00"]),
+    )
+
+
+def test_j2_secular_rates_sun_synchronous():
+    raan_rate, _, _ = j2_secular_rates(_elements(7078.0, 98.19))
+
+    # one revolution of the node per year
+    np.testing.assert_allclose(raan_rate, 2 * np.pi / (365.2422 * 86400), rtol=1e-2)
+
+
+def test_propagate_j2_node_drift():
+    elements = _elements(6928.0, 53.0)
+    raan_rate, _, _ = j2_secular_rates(
+        replace(elements, a=mean_semi_major_axis(elements))
+    )
+    dt = np.linspace(0, 3 * 86400, 10)[None, :]
+
+    positions, velocities = propagate_j2(elements, dt)
+
+    # the ascending node is the direction of z x h, with h the angular momentum
+    h = np.cross(positions[0], velocities[0])
+    raan = np.arctan2(h[:, 0], -h[:, 1])
+    np.testing.assert_allclose(
+        np.unwrap(raan), elements.raan[0] + raan_rate[0] * dt[0], atol=1e-9
+    )
+    np.testing.assert_allclose(np.linalg.norm(positions[0], axis=-1), 6928.0, rtol=2e-3)
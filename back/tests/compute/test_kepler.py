@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from astropy.time import Time
+
+from tas.dcc.smartlink.compute.kepler import KeplerianElements, propagate_kepler
+
+
+def _elements(ecc: float) -> KeplerianElements:
+    def values(value: float) -> np.ndarray:
+        return np.array([value, value])
+
+    return KeplerianElements(
+        k=values(398600.4418),
+        a=values(7000.0),
+        ecc=values(ecc),
+        inc=values(np.radians(53)),
+        raan=np.radians([0.0, 90.0]),
+        argp=values(0.0),
+        nu=values(0.0),
+        epoch=Time(["2023-07-01T00:00:00", "2023-07-01T00:00:00"]),
+    )
+
+
+def test_propagate_kepler_circular():
+    elements = _elements(0.0)
+    period = 2 * np.pi * np.sqrt(7000.0**3 / 398600.4418)
+    dt = np.tile(np.linspace(0, period, 50), (2, 1))
+
+    positions, velocities = propagate_kepler(elements, dt)
+
+    assert positions.shape == velocities.shape == (2, 50, 3)
+    np.testing.assert_allclose(np.linalg.norm(positions, axis=-1), 7000.0)
+    np.testing.assert_allclose(
+        np.linalg.norm(velocities, axis=-1), np.sqrt(398600.4418 / 7000.0)
+    )
+
+    # back to the initial state after one period
+    np.testing.assert_allclose(positions[:, -1], positions[:, 0], atol=1e-6)
+
+
+def test_propagate_kepler_energy():
+    positions, velocities = propagate_kepler(
+        _elements(0.3), np.tile(np.linspace(0, 20000, 100), (2, 1))
+    )
+
+    energy = np.linalg.norm(
+        velocities, axis=-1
+    ) ** 2 / 2 - 398600.4418 / np.linalg.norm(positions, axis=-1)
+    np.testing.assert_allclose(energy, -398600.4418 / (2 * 7000.0))
+
+
+def test_propagate_kepler_hyperbolic():
+    with pytest.raises(ValueError):
+        propagate_kepler(_elements(1.5), np.zeros((2, 1)))
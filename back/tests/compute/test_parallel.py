@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+
+import astropy.units as u
+import numpy as np
+from astropy.time import Time
+from poliastro.bodies import Earth
+from poliastro.twobody import Orbit
+
+from tas.dcc.orbits.models import ElevationMask, GroundLocation
+from tas.dcc.orbits.utils.coordinates import celest_gcrs_to_itrs
+from tas.dcc.smartlink.compute import parallel
+from tas.dcc.smartlink.models import Horizon, Satellite, Station
+
+_START = datetime(2023, 7, 1, tzinfo=timezone.utc)
+
+
+def _satellites(n: int) -> list[Satellite]:
+    return [
+        Satellite(
+            orbit=Orbit.from_classical(
+                Earth,
+                7000 * u.km,
+                0 * u.one,
+                53 * u.deg,
+                (index * 36) * u.deg,
+                0 * u.deg,
+                (index * 10) * u.deg,
+                epoch=Time(_START),
+            ),
+            id=index + 1,
+            index=index,
+        )
+        for index in range(n)
+    ]
+
+
+def test_propagate_parallel(monkeypatch):
+    satellites = _satellites(5)
+    horizon = Horizon(
+        start=_START, end=_START + timedelta(hours=2), step=timedelta(seconds=30)
+    )
+
+    serial = parallel.propagate_parallel(
+        "kepler", satellites, horizon, celest_gcrs_to_itrs
+    )
+
+    monkeypatch.setattr(parallel, "compute_workers", 2)
+    monkeypatch.setattr(parallel, "_executor", None)
+    try:
+        sharded = parallel.propagate_parallel(
+            "kepler", satellites, horizon, celest_gcrs_to_itrs
+        )
+    finally:
+        executor = parallel.get_executor()
+        assert executor is not None
+        executor.shutdown()
+
+    assert len(sharded) == len(satellites)
+    for serial_itrs, sharded_itrs in zip(serial, sharded):
+        np.testing.assert_array_equal(serial_itrs.data, sharded_itrs.data)
+
+
+def test_compute_eligibilities_parallel(monkeypatch):
+    satellites = _satellites(6)
+    horizon = Horizon(
+        start=_START, end=_START + timedelta(hours=6), step=timedelta(seconds=30)
+    )
+    stations = [
+        (
+            Station(
+                id=index + 1,
+                city="",
+                country="",
+                location=GroundLocation(
+                    longitude=longitude * u.deg,
+                    latitude=latitude * u.deg,
+                    height=0 * u.m,
+                ),
+            ),
+            ElevationMask(azimuths=[0.0] * u.deg, elevations=[10.0] * u.deg),
+        )
+        for index, (longitude, latitude) in enumerate([(1.4, 43.6), (-70.7, -33.4)])
+    ]
+    satellite_stations = [stations] * len(satellites)
+
+    # default rotation to ITRS (see earth_rotation)
+    ephemeris = parallel.propagate_parallel("kepler", satellites, horizon)
+    serial = [
+        parallel.compute_eligibilities_parallel(
+            satellites,
+            ephemeris,
+            horizon,
+            satellite_stations,
+            None,
+            timedelta(seconds=5),
+            refine=refine,
+        )
+        for refine in (False, True)
+    ]
+    assert any(any(station for station in satellite) for satellite in serial[0])
+
+    monkeypatch.setattr(parallel, "compute_workers", 2)
+    monkeypatch.setattr(parallel, "_executor", None)
+    try:
+        sharded_ephemeris = parallel.propagate_parallel("kepler", satellites, horizon)
+        # ephemeris sent to the workers through shared memory
+        sharded = [
+            parallel.compute_eligibilities_parallel(
+                satellites,
+                sharded_ephemeris,
+                horizon,
+                satellite_stations,
+                None,
+                timedelta(seconds=5),
+                refine=refine,
+            )
+            for refine in (False, True)
+        ]
+    finally:
+        executor = parallel.get_executor()
+        assert executor is not None
+        executor.shutdown()
+
+    for serial_itrs, sharded_itrs in zip(ephemeris, sharded_ephemeris):
+        np.testing.assert_array_equal(serial_itrs.data, sharded_itrs.data)
+    assert sharded == serial
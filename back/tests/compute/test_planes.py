@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.time import Time
+from poliastro.bodies import Earth
+from poliastro.twobody import Orbit
+
+from tas.dcc.smartlink.compute import (
+    KeplerPropagator,
+    group_by_orbit,
+    propagate_many,
+    propagate_phase_shifted,
+)
+from tas.dcc.smartlink.models import Horizon, Satellite
+
+_START = datetime(2023, 7, 1, tzinfo=timezone.utc)
+
+
+def _walker(
+    n_planes: int, n_satellites: int, ecc: float = 0, noise: float = 0
+) -> list[Satellite]:
+    return [
+        Satellite(
+            orbit=Orbit.from_classical(
+                Earth,
+                (7000 + noise * index) * u.km,
+                ecc * u.one,
+                53 * u.deg,
+                (plane * 360 / n_planes) * u.deg,
+                30 * u.deg,
+                (index * 360 / n_satellites + plane * 5) * u.deg,
+                epoch=Time(_START),
+            ),
+            id=plane * n_satellites + index + 1,
+            index=index,
+        )
+        for plane in range(n_planes)
+        for index in range(n_satellites)
+    ]
+
+
+def test_group_by_orbit():
+    assert group_by_orbit(_walker(3, 4)) == [
+        [0, 1, 2, 3],
+        [4, 5, 6, 7],
+        [8, 9, 10, 11],
+    ]
+
+    # numerical noise on the elements
+    assert group_by_orbit(_walker(2, 3, noise=1e-9)) == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_propagate_phase_shifted():
+    satellites = _walker(2, 6, ecc=0.01)
+    horizon = Horizon(
+        start=_START, end=_START + timedelta(hours=3), step=timedelta(seconds=30)
+    )
+
+    shifted = propagate_phase_shifted("kepler", satellites, horizon)
+    expected = propagate_many(
+        KeplerPropagator(horizon.step), satellites, horizon.start, horizon.end
+    )
+
+    assert len(shifted) == len(satellites)
+    for shifted_gcrs, expected_gcrs in zip(shifted, expected):
+        assert len(shifted_gcrs.time) == len(expected_gcrs.time)
+        for name in ("x", "y", "z"):
+            np.testing.assert_allclose(
+                getattr(shifted_gcrs, name).to_value(u.km),
+                getattr(expected_gcrs, name).to_value(u.km),
+                rtol=0,
+                atol=1e-3,
+            )
+        for name in ("d_x", "d_y", "d_z"):
+            np.testing.assert_allclose(
+                getattr(shifted_gcrs, name).to_value(u.km / u.s),
+                getattr(expected_gcrs, name).to_value(u.km / u.s),
+                rtol=0,
+                atol=1e-5,
+            )
+
+
+@pytest.mark.parametrize(
+    "satellites, duration, step",
+    [
+        # step too large for the interpolation
+        (_walker(2, 6), timedelta(hours=1), timedelta(seconds=60)),
+        # two satellites per plane, half a period apart, over less than half a period
+        (_walker(2, 2), timedelta(minutes=20), timedelta(seconds=30)),
+    ],
+)
+def test_propagate_phase_shifted_direct(
+    satellites: list[Satellite], duration: timedelta, step: timedelta
+):
+    horizon = Horizon(start=_START, end=_START + duration, step=step)
+
+    shifted = propagate_phase_shifted("kepler", satellites, horizon)
+    expected = propagate_many(
+        KeplerPropagator(horizon.step), satellites, horizon.start, horizon.end
+    )
+
+    assert len(shifted) == len(satellites)
+    for shifted_gcrs, expected_gcrs in zip(shifted, expected):
+        for name in ("x", "y", "z", "d_x", "d_y", "d_z"):
+            np.testing.assert_array_equal(
+                getattr(shifted_gcrs, name), getattr(expected_gcrs, name)
+            )
+
+
+def test_propagate_phase_shifted_j2():
+    horizon = Horizon(
+        start=_START, end=_START + timedelta(hours=1), step=timedelta(seconds=60)
+    )
+    with pytest.raises(ValueError):
+        propagate_phase_shifted("j2", _walker(1, 2), horizon)
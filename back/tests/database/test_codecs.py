@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from tas.dcc.smartlink.database.codecs import (
+    CHEBYSHEV,
+    QUANTIZED_DELTA_ZLIB,
+    RAW,
+    SHUFFLE_LZMA,
+    SHUFFLE_ZLIB,
+    EphemerisCodec,
+    get_codec,
+)
+
+
+def _ephemeris(
+    n: int = 256, step: float = 30
+) -> np.ndarray[tuple[int, int], np.dtype[np.float64]]:
+    t = np.arange(n) * step
+    w = 2 * np.pi / 6000
+    position = 7000 * np.stack(
+        [np.cos(w * t), 0.8 * np.sin(w * t), 0.6 * np.sin(w * t + 0.1)], axis=1
+    )
+    return np.concatenate([position, np.gradient(position, step, axis=0)], axis=1)
+
+
+@pytest.mark.parametrize("codec", [RAW, SHUFFLE_ZLIB, SHUFFLE_LZMA])
+def test_lossless_codecs(codec: EphemerisCodec):
+    data = _ephemeris()
+    assert get_codec(codec.format) is codec
+    assert np.array_equal(codec.decode(codec.encode(data)), data)
+
+
+def test_quantized_codec():
+    data = _ephemeris()
+    encoded = QUANTIZED_DELTA_ZLIB.encode(data)
+    decoded = QUANTIZED_DELTA_ZLIB.decode(encoded)
+
+    assert decoded.shape == data.shape
+    assert np.abs(decoded[:, :3] - data[:, :3]).max() <= 0.5e-6
+    assert np.abs(decoded[:, 3:] - data[:, 3:]).max() <= 0.5e-9
+    assert len(encoded) < data.nbytes / 2
+
+
+def test_chebyshev_codec():
+    data = _ephemeris(n=21)
+    encoded = CHEBYSHEV.encode(data)
+
+    assert np.abs(CHEBYSHEV.decode(encoded) - data).max() <= 1e-3
+    assert len(encoded) < data.nbytes
+
+    # evaluate between samples, using a finer grid as reference
+    reference = _ephemeris(n=61, step=10)
+    evaluated = CHEBYSHEV.evaluate(encoded, np.arange(61) / 3)
+    assert np.abs(evaluated[:, :3] - reference[:, :3]).max() <= 1e-3
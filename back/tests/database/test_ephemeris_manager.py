@@ -0,0 +1,498 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+import astropy.units as u
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from tas.dcc.orbits.coordinates import ITRS
+from tas.dcc.smartlink import models
+from tas.dcc.smartlink.compute import TWO_BODY, ephemeris_model
+from tas.dcc.smartlink.database.codecs import CHEBYSHEV, RAW
+from tas.dcc.smartlink.database.files import EphemerisFileStore
+from tas.dcc.smartlink.database.managers import (
+    ConstellationManager,
+    EphemerisManager,
+    SatelliteManager,
+    constellations,
+)
+from tas.dcc.smartlink.database.managers.utils import timedelta_to_database
+from tas.dcc.smartlink.database.models import (
+    Constellation,
+    Ephemeris,
+    EphemerisSegment,
+    Plane,
+    Satellite,
+    SatelliteOrbit,
+)
+from tas.dcc.smartlink.database.models.base import Base
+from tas.dcc.smartlink.utils.cache import LRUCache
+
+_START = datetime(2023, 7, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db() -> Iterator[Session]:
+    # in-memory database, so that tests do not depend on (nor modify) the content of
+    # the test database
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    # enforce foreign keys (and ON DELETE CASCADE) like MariaDB
+    event.listen(
+        engine,
+        "connect",
+        lambda connection, _: connection.execute("pragma foreign_keys=on"),
+    )
+    Base.metadata.create_all(engine)
+
+    with Session(engine, expire_on_commit=False) as session:
+        session.add(
+            Constellation(
+                name="test",
+                planes=[
+                    Plane(
+                        index=0,
+                        satellites=[
+                            Satellite(
+                                index=index,
+                                orbit=SatelliteOrbit(
+                                    epoch=_START.replace(tzinfo=None),
+                                    semi_major_axis=7000,
+                                    eccentricity=0,
+                                    inclination=53,
+                                    argument_of_perigee=0,
+                                    true_anomaly=index * 30,
+                                    raan=0,
+                                ),
+                            )
+                            for index in range(4)
+                        ],
+                    )
+                ],
+            )
+        )
+        session.commit()
+        yield session
+
+
+def _data(horizon: models.Horizon, phase: float = 0) -> np.ndarray:
+    # circular orbit, positions in km and velocities in km/s
+    time = np.arange((horizon.end - horizon.start) // horizon.step + 1)
+    time = (
+        time * horizon.step.total_seconds() + (horizon.start - _START).total_seconds()
+    )
+    motion = np.sqrt(398600.4418 / 7000**3)
+    anomaly = motion * time + phase
+    direction = np.array([0, np.cos(np.radians(53)), np.sin(np.radians(53))])
+    return np.concatenate(
+        [
+            7000 * np.cos(anomaly)[:, None] * [1, 0, 0]
+            + 7000 * np.sin(anomaly)[:, None] * direction,
+            -7000 * motion * np.sin(anomaly)[:, None] * [1, 0, 0]
+            + 7000 * motion * np.cos(anomaly)[:, None] * direction,
+        ],
+        axis=-1,
+    )
+
+
+def _ephemeris(
+    satellite: models.Satellite, horizon: models.Horizon, phase: float = 0
+) -> models.Ephemeris:
+    data = _data(horizon, phase)
+    return models.Ephemeris(
+        id=None,
+        satellite=satellite,
+        horizon=horizon,
+        itrs=ITRS(
+            time=None,
+            x=data[:, 0] * u.km,
+            y=data[:, 1] * u.km,
+            z=data[:, 2] * u.km,
+            d_x=data[:, 3] * u.km / u.s,
+            d_y=data[:, 4] * u.km / u.s,
+            d_z=data[:, 5] * u.km / u.s,
+        ),
+    )
+
+
+def _array(ephemeris: models.Ephemeris) -> np.ndarray:
+    itrs = ephemeris.itrs
+    if isinstance(itrs, models.LazyITRS):
+        return np.asarray(itrs.data)
+    return np.stack(
+        [
+            itrs.x.to_value(u.km),
+            itrs.y.to_value(u.km),
+            itrs.z.to_value(u.km),
+            itrs.d_x.to_value(u.km / u.s),
+            itrs.d_y.to_value(u.km / u.s),
+            itrs.d_z.to_value(u.km / u.s),
+        ],
+        axis=-1,
+    )
+
+
+def _cache() -> LRUCache:
+    return LRUCache(64 * 1024 * 1024, size=lambda value: value[1].nbytes)
+
+
+@pytest.mark.parametrize(
+    "n_steps, seconds", [(243, 30), (245, 30), (123, 60), (722, 10)]
+)
+def test_store_chebyshev(db: Session, n_steps: int, seconds: int):
+    step = timedelta(seconds=seconds)
+    satellite = SatelliteManager(db).load(1)
+    assert satellite is not None
+
+    horizon = models.Horizon(start=_START, end=_START + (n_steps - 1) * step, step=step)
+    manager = EphemerisManager(db, codec=CHEBYSHEV, cache=_cache())
+    entry = manager.store(_ephemeris(satellite, horizon))
+
+    # the last segment is too short to be fitted on its own, it must not fallback to
+    # another codec
+    assert entry.format == CHEBYSHEV.format
+
+    for target in (
+        models.Horizon(
+            start=horizon.start, end=horizon.end, step=timedelta(seconds=20)
+        ),
+        models.Horizon(
+            start=horizon.end - 3 * step, end=horizon.end, step=timedelta(seconds=7)
+        ),
+    ):
+        extracted = manager.extract(satellite, target)
+        assert extracted is not None
+        assert extracted.id == entry.id
+        np.testing.assert_allclose(
+            _array(extracted)[:, :3], _data(target)[:, :3], rtol=0, atol=1e-3
+        )
+
+
+def test_compact_other_process(db: Session):
+    satellite = SatelliteManager(db).load(1)
+    assert satellite is not None
+
+    step = timedelta(seconds=30)
+    manager = EphemerisManager(db, cache=_cache())
+    for start in (_START, _START + timedelta(hours=1)):
+        manager.store(
+            _ephemeris(
+                satellite,
+                models.Horizon(start=start, end=start + timedelta(hours=1), step=step),
+            )
+        )
+
+    horizon = models.Horizon(
+        start=_START, end=_START + timedelta(minutes=30), step=step
+    )
+    extracted = manager.extract(satellite, horizon)
+    assert extracted is not None
+
+    # compaction from another process, with its own cache
+    assert EphemerisManager(db, cache=_cache()).compact() == (1, 2)
+    assert db.scalar(select(func.count()).select_from(EphemerisSegment)) == len(
+        db.scalars(select(Ephemeris)).one().segments
+    )
+
+    # the ephemeris cached before compaction refer to a removed entry
+    compacted = manager.extract(satellite, horizon)
+    assert compacted is not None
+    assert compacted.id != extracted.id
+    assert db.get(Ephemeris, compacted.id) is not None
+    np.testing.assert_array_equal(_array(compacted), _array(extracted))
+
+
+def test_store_files(db: Session, tmp_path: Path):
+    files = EphemerisFileStore(tmp_path)
+    satellite = SatelliteManager(db).load(1)
+    assert satellite is not None
+
+    horizon = models.Horizon(
+        start=_START, end=_START + timedelta(hours=1), step=timedelta(seconds=30)
+    )
+    manager = EphemerisManager(db, files=files, cache=_cache())
+
+    # files of entries that are rolled back are removed
+    manager.store(_ephemeris(satellite, horizon), commit=False)
+    assert len(list(tmp_path.iterdir())) == 1
+    db.rollback()
+    assert not list(tmp_path.iterdir())
+
+    entry = manager.store(_ephemeris(satellite, horizon))
+    assert [p.name for p in tmp_path.iterdir()] == [entry.path]
+
+    # entries stored in files are ignored without a file store
+    assert EphemerisManager(db, cache=_cache()).extract(satellite, horizon) is None
+    assert EphemerisManager(db, cache=_cache()).compact() == (0, 0)
+    completed = EphemerisManager(db, cache=_cache()).complete_many(
+        [satellite],
+        horizon,
+        lambda satellites, horizon, progress: [
+            _ephemeris(satellite, horizon).itrs for satellite in satellites
+        ],
+    )
+    assert completed[satellite].id is None
+
+    extracted = manager.extract(satellite, horizon)
+    assert extracted is not None
+    np.testing.assert_array_equal(_array(extracted), _data(horizon))
+
+
+def test_delete_files(db: Session, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    files = EphemerisFileStore(tmp_path)
+    monkeypatch.setattr(constellations, "ephemeris_files", files)
+
+    horizon = models.Horizon(
+        start=_START, end=_START + timedelta(hours=1), step=timedelta(seconds=30)
+    )
+    manager = EphemerisManager(db, files=files, cache=_cache())
+    for satellite_id in (1, 2, 3):
+        satellite = SatelliteManager(db).load(satellite_id)
+        assert satellite is not None
+        manager.store(_ephemeris(satellite, horizon))
+    assert len(list(tmp_path.iterdir())) == 3
+
+    SatelliteManager(db).delete(1)
+    assert len(list(tmp_path.iterdir())) == 2
+
+    ConstellationManager(db).delete(db.scalars(select(Constellation.id)).one())
+    assert not list(tmp_path.iterdir())
+    assert not db.scalars(select(Ephemeris)).all()
+
+
+def test_extract_other_steps(db: Session):
+    satellite = SatelliteManager(db).load(1)
+    assert satellite is not None
+
+    cache = _cache()
+    manager = EphemerisManager(db, cache=cache)
+    entries = {
+        seconds: manager.store(
+            _ephemeris(
+                satellite,
+                models.Horizon(
+                    start=_START,
+                    end=_START + timedelta(hours=2),
+                    step=timedelta(seconds=seconds),
+                ),
+            )
+        )
+        for seconds in (10, 30)
+    }
+
+    # strided view of the largest step dividing the requested one
+    horizon = models.Horizon(
+        start=_START + timedelta(minutes=30),
+        end=_START + timedelta(hours=1),
+        step=timedelta(seconds=60),
+    )
+    extracted = manager.extract(satellite, horizon)
+    assert extracted is not None
+    assert extracted.id == entries[30].id
+    np.testing.assert_allclose(_array(extracted), _data(horizon), rtol=1e-6)
+
+    # interpolation only if allowed, and results are not shared with other managers
+    horizon = models.Horizon(
+        start=_START + timedelta(minutes=30),
+        end=_START + timedelta(hours=1),
+        step=timedelta(seconds=15),
+    )
+    interpolated = EphemerisManager(db, cache=cache, interpolate=True).extract(
+        satellite, horizon
+    )
+    assert interpolated is not None
+    assert interpolated.id == entries[10].id
+    np.testing.assert_allclose(
+        _array(interpolated)[:, :3], _data(horizon)[:, :3], rtol=0, atol=1e-3
+    )
+
+    assert manager.extract(satellite, horizon) is None
+    assert manager.horizons(1, horizon.step) == []
+
+
+def test_extract_many(db: Session, tmp_path: Path):
+    files = EphemerisFileStore(tmp_path)
+    satellites = [
+        SatelliteManager(db).load(satellite_id) for satellite_id in range(1, 5)
+    ]
+    assert all(satellites)
+
+    horizon = models.Horizon(
+        start=_START, end=_START + timedelta(hours=6), step=timedelta(seconds=30)
+    )
+    cache = _cache()
+
+    # segments, Chebyshev polynomials, file and single blob
+    EphemerisManager(db, cache=cache).store(_ephemeris(satellites[0], horizon))
+    EphemerisManager(db, codec=CHEBYSHEV, cache=cache).store(
+        _ephemeris(satellites[1], horizon, phase=1)
+    )
+    EphemerisManager(db, files=files, cache=cache).store(
+        _ephemeris(satellites[2], horizon, phase=2)
+    )
+    db.add(
+        Ephemeris(
+            satellite_id=satellites[3].id,
+            start=horizon.start,
+            end=horizon.end,
+            step=timedelta_to_database(horizon.step),
+            data=RAW.encode(_data(horizon, phase=3)),
+            format=RAW.format,
+            dynamics=ephemeris_model("poliastro"),
+        )
+    )
+    db.commit()
+
+    manager = EphemerisManager(db, files=files, cache=cache)
+    for sub_horizon in (
+        models.Horizon(
+            start=_START + timedelta(hours=1),
+            end=_START + timedelta(hours=3, seconds=30),
+            step=timedelta(seconds=60),
+        ),
+        models.Horizon(
+            start=_START + timedelta(minutes=150),
+            end=_START + timedelta(hours=5),
+            step=timedelta(seconds=30),
+        ),
+    ):
+        # some satellites already in the cache
+        manager.extract(satellites[0], sub_horizon)
+        manager.extract(satellites[2], sub_horizon)
+
+        extracted = manager.extract_many(satellites, sub_horizon)
+
+        reference_manager = EphemerisManager(db, files=files, cache=_cache())
+        assert list(extracted) == satellites
+        for satellite, ephemeris in extracted.items():
+            reference = reference_manager.extract(satellite, sub_horizon)
+            assert ephemeris is not None and reference is not None
+            assert ephemeris.id == reference.id
+            assert ephemeris.horizon == reference.horizon == sub_horizon
+            np.testing.assert_array_equal(_array(ephemeris), _array(reference))
+
+
+def test_complete_many(db: Session):
+    satellites = [
+        SatelliteManager(db).load(satellite_id) for satellite_id in range(1, 5)
+    ]
+    assert all(satellites)
+
+    step = timedelta(seconds=30)
+    horizon = models.Horizon(start=_START, end=_START + timedelta(hours=3), step=step)
+    manager = EphemerisManager(db, cache=_cache())
+
+    # whole horizon, middle of the horizon (two gaps), start of the horizon (one gap,
+    # same as the last gap of the previous one) and nothing
+    for satellite, start, end in (
+        (satellites[0], horizon.start, horizon.end),
+        (satellites[1], _START + timedelta(hours=1), _START + timedelta(hours=2)),
+        (satellites[2], horizon.start, _START + timedelta(hours=2)),
+    ):
+        manager.store(
+            _ephemeris(satellite, models.Horizon(start=start, end=end, step=step))
+        )
+
+    propagated: list[tuple[list[int], models.Horizon]] = []
+
+    def propagate(satellites, horizon, progress):
+        propagated.append(([satellite.id for satellite in satellites], horizon))
+        if progress is not None:
+            progress(len(satellites))
+        return [_ephemeris(satellite, horizon).itrs for satellite in satellites]
+
+    reported: list[int] = []
+    ephemeris = manager.complete_many(satellites, horizon, propagate, reported.append)
+
+    assert [ids for ids, _ in propagated] == [[2], [2, 3], [4]]
+    assert reported == [1, 0, 0, 2, 1]
+
+    for satellite in satellites:
+        np.testing.assert_allclose(
+            _array(ephemeris[satellite]), _data(horizon), rtol=1e-6
+        )
+
+
+def test_complete_many_other_model(db: Session):
+    satellite = SatelliteManager(db).load(1)
+    assert satellite
+
+    horizon = models.Horizon(
+        start=_START, end=_START + timedelta(hours=2), step=timedelta(seconds=30)
+    )
+
+    # stored before the model of the conversion to ITRS was recorded
+    EphemerisManager(db, cache=_cache(), dynamics=TWO_BODY).store(
+        _ephemeris(
+            satellite,
+            models.Horizon(
+                start=horizon.start, end=_START + timedelta(hours=1), step=horizon.step
+            ),
+            phase=1,
+        )
+    )
+
+    propagated: list[models.Horizon] = []
+
+    def propagate(satellites, horizon, progress):
+        propagated.append(horizon)
+        return [_ephemeris(satellite, horizon).itrs for satellite in satellites]
+
+    manager = EphemerisManager(db, cache=_cache())
+    ephemeris = manager.complete_many([satellite], horizon, propagate)
+
+    assert propagated == [horizon]
+    np.testing.assert_allclose(_array(ephemeris[satellite]), _data(horizon), rtol=1e-6)
+
+
+def test_iterate_complete(db: Session):
+    satellites = [
+        SatelliteManager(db).load(satellite_id) for satellite_id in range(1, 5)
+    ]
+    assert all(satellites)
+
+    step = timedelta(seconds=30)
+    horizon = models.Horizon(start=_START, end=_START + timedelta(hours=3), step=step)
+    manager = EphemerisManager(db, cache=_cache())
+
+    # whole horizon, nothing, first time step and nothing
+    for satellite, end in ((satellites[0], horizon.end), (satellites[2], _START)):
+        manager.store(
+            _ephemeris(satellite, models.Horizon(start=_START, end=end, step=step))
+        )
+
+    propagated: list[list[int]] = []
+
+    def propagate(satellites, horizon, progress):
+        propagated.append([satellite.id for satellite in satellites])
+        return [_ephemeris(satellite, horizon).itrs for satellite in satellites]
+
+    extract_many = manager.extract_many
+    extracted: list[int] = []
+
+    def count_extract_many(satellites, horizon):
+        extracted.append(len(satellites))
+        return extract_many(satellites, horizon)
+
+    manager.extract_many = count_extract_many  # type: ignore[method-assign]
+
+    batches = list(manager.iterate_complete(satellites, horizon, propagate, None, 1))
+
+    # satellites are looked up once, and yielded as soon as their chunk is propagated
+    assert extracted == [4]
+    assert propagated == [[2], [4], [3]]
+    assert [[satellite.id for satellite in batch] for batch in batches] == [
+        [1],
+        [2],
+        [4],
+        [3],
+    ]
+    assert batches[0][satellites[0]].id is not None
+    for batch in batches:
+        for satellite, ephemeris in batch.items():
+            np.testing.assert_allclose(_array(ephemeris), _data(horizon), rtol=1e-6)
@@ -0,0 +1,21 @@
+from pathlib import Path
+
+import numpy as np
+
+from tas.dcc.smartlink.database.files import EphemerisFileStore
+
+
+def test_file_store(tmp_path: Path):
+    store = EphemerisFileStore(tmp_path.joinpath("ephemeris"))
+
+    data = np.random.default_rng(0).normal(size=(1000, 6))
+    name = store.write(data)
+    assert [p.name for p in tmp_path.joinpath("ephemeris").iterdir()] == [name]
+
+    mapped = store.read(name)
+    assert isinstance(mapped, np.memmap)
+    assert np.array_equal(mapped, data)
+    assert np.array_equal(mapped[100:200:2], data[100:200:2])
+
+    store.remove(name)
+    assert not list(tmp_path.joinpath("ephemeris").iterdir())
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta, timezone
+
+import astropy.units as u
+import numpy as np
+
+from tas.dcc.orbits.coordinates import ITRS
+from tas.dcc.orbits.utils.astropy import astropy_timerange
+from tas.dcc.smartlink.models import Horizon, LazyITRS
+
+
+def test_lazy_itrs():
+    start = datetime(2023, 7, 1, tzinfo=timezone.utc)
+    horizon = Horizon(
+        start=start, end=start + timedelta(hours=1), step=timedelta(seconds=30)
+    )
+    data = np.random.default_rng(0).normal(size=(121, 6))
+
+    lazy = LazyITRS(data, horizon)
+    eager = ITRS(
+        time=astropy_timerange(horizon.start, horizon.end, horizon.step),
+        x=data[:, 0].copy() * u.km,
+        y=data[:, 1].copy() * u.km,
+        z=data[:, 2].copy() * u.km,
+        d_x=data[:, 3].copy() * u.km / u.s,
+        d_y=data[:, 4].copy() * u.km / u.s,
+        d_z=data[:, 5].copy() * u.km / u.s,
+    )
+
+    # positions do not create the time axis nor the velocities
+    for name in ("x", "y", "z"):
+        np.testing.assert_array_equal(
+            getattr(lazy, name).to_value(u.km), getattr(eager, name).to_value(u.km)
+        )
+    assert not {"time", "d_x", "d_y", "d_z"} & vars(lazy).keys()
+
+    # components are views over the data
+    assert np.shares_memory(lazy.x.value, data)
+
+    for itrs in (lazy, lazy.to_itrs()):
+        assert len(itrs.time) == len(eager.time)
+        assert np.all(itrs.time == eager.time)
+        for name in ("x", "y", "z"):
+            np.testing.assert_array_equal(
+                getattr(itrs, name).to_value(u.km),
+                getattr(eager, name).to_value(u.km),
+            )
+        for name in ("d_x", "d_y", "d_z"):
+            np.testing.assert_array_equal(
+                getattr(itrs, name).to_value(u.km / u.s),
+                getattr(eager, name).to_value(u.km / u.s),
+            )
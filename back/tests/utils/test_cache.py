@@ -0,0 +1,26 @@
+from tas.dcc.smartlink.utils.cache import LRUCache
+
+
+def test_lru_cache():
+    cache: LRUCache[str, bytes] = LRUCache(10, size=len)
+
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+
+    # "b" is the least recently used
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+
+    # too large to be stored
+    cache.put("d", b"d" * 11)
+    assert cache.get("d") is None
+
+    assert cache.invalidate(lambda key: key == "a") == 1
+    assert cache.get("a") is None
+
+    statistics = cache.statistics()
+    assert (statistics.hits, statistics.misses, statistics.evictions) == (3, 3, 1)
+    assert (statistics.entries, statistics.size, statistics.max_size) == (1, 4, 10)
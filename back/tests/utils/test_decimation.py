@@ -0,0 +1,34 @@
+import numpy as np
+
+from tas.dcc.smartlink.utils.decimation import decimate
+
+
+def test_decimate():
+    time = np.arange(2000) * 10.0
+    angle = 2 * np.pi * time / 6000
+    positions = 7000 * np.stack(
+        [np.cos(angle), 0.6 * np.sin(angle), 0.8 * np.sin(angle)], axis=1
+    )
+
+    for tolerance in (1.0, 10.0, 100.0):
+        indices = decimate(positions, tolerance)
+
+        assert indices[0] == 0
+        assert indices[-1] == len(positions) - 1
+        assert (np.diff(indices) > 0).all()
+        assert len(indices) < len(positions)
+
+        interpolated = np.stack(
+            [
+                np.interp(np.arange(len(positions)), indices, positions[indices, axis])
+                for axis in range(3)
+            ],
+            axis=1,
+        )
+        assert np.linalg.norm(interpolated - positions, axis=1).max() <= tolerance
+
+
+def test_decimate_line():
+    positions = np.linspace(0, 1, 50)[:, None] * np.array([[1.0, 2.0, 3.0]])
+    np.testing.assert_array_equal(decimate(positions, 1e-9), [0, 49])
+    np.testing.assert_array_equal(decimate(positions[:2], 1e-9), [0, 1])
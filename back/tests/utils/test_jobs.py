@@ -0,0 +1,29 @@
+import threading
+
+from tas.dcc.smartlink.utils.jobs import Job, JobRegistry
+
+
+def test_job_registry():
+    registry = JobRegistry(max_workers=1, max_finished=1)
+    release = threading.Event()
+
+    def run(job: Job[str]) -> str:
+        job.advance(2)
+        release.wait(timeout=10)
+        return "result"
+
+    job = registry.submit("test", 3, run)
+    assert registry.get(job.id) is job
+    assert job.status in ("pending", "running")
+
+    release.set()
+    failed = registry.submit("test", 1, lambda job: 1 / 0)
+    registry._executor.shutdown(wait=True)
+
+    assert (job.status, job.completed, job.result) == ("done", 3, "result")
+    assert failed.status == "failed"
+    assert failed.error is not None and "ZeroDivisionError" in failed.error
+
+    # only the most recent finished job is kept
+    assert registry.get(job.id) is None
+    assert registry.get(failed.id) is failed